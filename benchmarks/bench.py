@@ -0,0 +1,297 @@
+"""Micro-benchmarks of the parsers and generators, on synthetic threads.
+
+Each component is timed across thread sizes (posts for the parsers and
+master text, snapshots for the master content/meta generators), as is
+importing each entry point and starting the CLI, and the best of several
+runs is kept. Results are compared against a baseline JSON,
+and any component slower than the baseline by more than the threshold is
+reported as a regression (and the exit status is 1).
+
+Run from the repository root (or with `make bench`):
+
+```
+PYTHONPATH=./src python benchmarks/bench.py [--quick] [--save]
+```
+"""
+# Imports
+import argparse
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections.abc import Callable
+
+from bs4 import BeautifulSoup
+
+import synthetic
+
+from web_scraper.parse import codec
+from web_scraper.parse.HTMLToContent import ChanToContent
+from web_scraper.parse.HTMLToContent.ArchiveToContent import ArchiveToContent
+from web_scraper.parse.JSONToContent import SourceToContent
+from web_scraper.parse.MasterContentGenerator import MasterContentGenerator
+from web_scraper.parse.MasterMetaGenerator import MasterMetaGenerator
+from web_scraper.parse.MasterTextGenerator import MasterTextGenerator
+from web_scraper.parse.SnapshotMetaGenerator import SnapshotMetaGenerator
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SRC_DIR: str = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+MAIN_PATH: str = os.path.join(SRC_DIR, "web_scraper", "__main__.py")
+
+POST_SIZES: list[int] = [10, 100, 1000, 10000]
+SNAPSHOT_SIZES: list[int] = [1, 10, 100, 1000]
+QUICK_POST_SIZES: list[int] = [10, 100]
+QUICK_SNAPSHOT_SIZES: list[int] = [1, 10]
+# Posts found by the first scan of a snapshot chain, and new posts found by
+# each later scan
+INITIAL_POSTS: int = 10
+POSTS_PER_SNAPSHOT: int = 1
+
+# Modules whose import is timed, in a fresh interpreter (the scrapers being
+# imported from within the package directory, as the CLI does)
+IMPORT_MODULES: list[str] = [
+    "web_scraper.parse.Reparser",
+    "web_scraper.parse.SiteMetaGenerator",
+    "web_scraper.portion.portion",
+    "scrape_and_parse",
+    "scrape_catalog",
+    "fourchan_scrape_and_parse",
+]
+# CLI commands whose startup is timed
+CLI_COMMANDS: list[list[str]] = [
+    ["scrape", "--help"], ["reparse", "--help"], ["stats", "--help"],
+    ["portion", "--help"],
+]
+# Modules too heavy for the short CLI commands (e.g. recalculating sitewide
+# statistics from cron) to import; any they import fails the benchmarks
+HEAVY_MODULES: list[str] = ["bs4", "lxml", "htmldate", "requests"]
+LIGHT_CLI_COMMANDS: list[list[str]] = [
+    ["stats", "--help"], ["portion", "--help"]]
+
+SCAN_TIME: str = "2024-06-01T00:00:00"
+THREAD_ID: int = 100000
+
+
+def best_time(function: Callable[[], object], repeats: int) -> float:
+    """Returns the fastest of several runs of a function, in seconds.
+
+    Slow runs (over a second) aren't repeated.
+    """
+    times: list[float] = []
+    for _ in range(repeats):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+        if times[-1] > 1:
+            break
+    return min(times)
+
+
+def bench_parsers(
+        post_sizes: list[int], repeats: int) -> dict[str, float]:
+    """Times the HTML and source JSON parsers on threads of each size."""
+    results: dict[str, float] = {}
+    for num_posts in post_sizes:
+        html: str = synthetic.vichan_html(
+            THREAD_ID, num_posts, random.Random(num_posts))
+        source_json: dict = synthetic.fourchan_source_json(
+            THREAD_ID, num_posts, random.Random(num_posts))
+        results[f"ChanToContent/posts={num_posts}"] = best_time(
+            lambda: ChanToContent(
+                SCAN_TIME, BeautifulSoup(html, "html.parser"), "",
+                synthetic.OP_CLASS, synthetic.REPLY_CLASS,
+                synthetic.ROOT_DOMAIN),
+            repeats)
+        results[f"ArchiveToContent/posts={num_posts}"] = best_time(
+            lambda: ArchiveToContent(
+                SCAN_TIME, BeautifulSoup(html, "html.parser"), "",
+                synthetic.OP_CLASS, synthetic.REPLY_CLASS,
+                synthetic.ID_CLASS, synthetic.ROOT_DOMAIN),
+            repeats)
+        results[f"SourceToContent/posts={num_posts}"] = best_time(
+            lambda: SourceToContent("b", source_json, SCAN_TIME), repeats)
+    return results
+
+
+def bench_master_generators(
+        snapshot_sizes: list[int], post_sizes: list[int], repeats: int,
+        work_dir: str) -> dict[str, float]:
+    """Times the master generators on snapshot chains and large threads."""
+    results: dict[str, float] = {}
+    for num_snapshots in snapshot_sizes:
+        thread_dir: str = os.path.join(
+            work_dir, f"snapshots_{num_snapshots}", str(THREAD_ID))
+        content_paths: list[str] = synthetic.write_snapshot_chain(
+            thread_dir, THREAD_ID, num_snapshots, INITIAL_POSTS,
+            POSTS_PER_SNAPSHOT, random.Random(num_snapshots))
+        meta_paths: list[str] = []
+        for content_path in content_paths:
+            snapshot_meta_generator = SnapshotMetaGenerator(content_path)
+            snapshot_meta_generator.meta_dump()
+            meta_paths.append(snapshot_meta_generator.get_path())
+
+        results[f"MasterContentGenerator/snapshots={num_snapshots}"] = (
+            best_time(
+                lambda: MasterContentGenerator(content_paths).content_dump(),
+                repeats))
+        results[f"MasterMetaGenerator/snapshots={num_snapshots}"] = (
+            best_time(
+                lambda: MasterMetaGenerator(meta_paths).master_meta_dump(),
+                repeats))
+
+    for num_posts in post_sizes:
+        site_dir: str = os.path.join(work_dir, f"posts_{num_posts}")
+        thread_posts: list[dict] = synthetic.posts(
+            THREAD_ID, num_posts, random.Random(num_posts))
+        master_content_path: str = os.path.join(
+            site_dir, str(THREAD_ID), f"master_version_{THREAD_ID}.json")
+        os.makedirs(os.path.dirname(master_content_path), exist_ok=True)
+        codec.dump(
+            synthetic.snapshot_content(
+                THREAD_ID, thread_posts, synthetic.START_DATE),
+            master_content_path)
+        results[f"MasterTextGenerator/posts={num_posts}"] = best_time(
+            lambda: MasterTextGenerator(
+                master_content_path, site_dir).write_text(),
+            repeats)
+    return results
+
+
+def bench_imports(repeats: int) -> dict[str, float]:
+    """Times importing each module, and starting the CLI, in a fresh
+    interpreter (including the interpreter's own startup, timed alone)."""
+    env: dict[str, str] = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [SRC_DIR, os.path.join(SRC_DIR, "web_scraper"),
+         os.environ.get("PYTHONPATH", "")]))
+
+    def run(*arguments: str) -> None:
+        subprocess.run(
+            [sys.executable, *arguments], env=env, check=True,
+            stdout=subprocess.DEVNULL)
+
+    results: dict[str, float] = {
+        "import/(interpreter)": best_time(lambda: run("-c", "pass"), repeats)}
+    for module in IMPORT_MODULES:
+        results[f"import/{module}"] = best_time(
+            lambda: run("-c", f"import {module}"), repeats)
+    for command in CLI_COMMANDS:
+        results[f"cli/{" ".join(command)}"] = best_time(
+            lambda: run(MAIN_PATH, *command), repeats)
+    return results
+
+
+def check_import_budget() -> list[str]:
+    """Returns the heavy modules imported by each of the short CLI commands,
+    as `import-budget/<command>: <module>`."""
+    env: dict[str, str] = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [SRC_DIR, os.environ.get("PYTHONPATH", "")]))
+    violations: list[str] = []
+    for command in LIGHT_CLI_COMMANDS:
+        # Each import is reported as "import time: <self> | <cumulative> |
+        # <indented module name>"
+        stderr: str = subprocess.run(
+            [sys.executable, "-X", "importtime", MAIN_PATH, *command],
+            env=env, check=True, stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE, text=True).stderr
+        imported: set[str] = {
+            line.rsplit("|", 1)[-1].strip()
+            for line in stderr.splitlines() if line.startswith("import time:")}
+        for module in HEAVY_MODULES:
+            if module in imported:
+                violations.append(
+                    f"import-budget/{" ".join(command)}: {module}")
+    for violation in violations:
+        print(f"{violation:<45} imported  REGRESSION")
+    return violations
+
+
+def compare(
+        results: dict[str, float], baseline: dict[str, float],
+        threshold: float) -> list[str]:
+    """Prints results next to the baseline, and returns the regressions.
+
+    Args:
+        results (dict[str, float]): Seconds taken by each benchmark.
+        baseline (dict[str, float]): Seconds taken in the baseline.
+        threshold (float): Ratio to the baseline counted as a regression.
+    """
+    regressions: list[str] = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"{name:<45} {seconds:>10.4f}s  (no baseline)")
+            continue
+        ratio: float = seconds / baseline[name] if baseline[name] else 1
+        flag: str = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<45} {seconds:>10.4f}s  "
+            f"{ratio:>6.2f}x baseline{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Times the parsers and generators on synthetic threads and "
+            "compares the results against a baseline."))
+    parser.add_argument(
+        "--quick", action="store_true",
+        help="Only run the smaller sizes.")
+    parser.add_argument(
+        "--repeats", type=int, default=3,
+        help="Runs of each benchmark; the fastest is kept.")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25,
+        help="Ratio to the baseline counted as a regression.")
+    parser.add_argument(
+        "--baseline", type=str, default=BASELINE_PATH,
+        help="Path to the baseline JSON.")
+    parser.add_argument(
+        "--save", action="store_true",
+        help="Save the results as the new baseline.")
+    args = parser.parse_args()
+
+    # The parsers log every post; that's not what's being measured
+    logging.disable(logging.CRITICAL)
+
+    post_sizes: list[int] = QUICK_POST_SIZES if args.quick else POST_SIZES
+    snapshot_sizes: list[int] = (
+        QUICK_SNAPSHOT_SIZES if args.quick else SNAPSHOT_SIZES)
+    work_dir: str = tempfile.mkdtemp(prefix="web_scraper_bench_")
+    try:
+        results: dict[str, float] = bench_parsers(post_sizes, args.repeats)
+        results.update(bench_master_generators(
+            snapshot_sizes, post_sizes, args.repeats, work_dir))
+        results.update(bench_imports(args.repeats))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline: dict[str, float] = {}
+    if os.path.exists(args.baseline):
+        baseline = codec.load(args.baseline)
+    regressions: list[str] = compare(results, baseline, args.threshold)
+    regressions.extend(check_import_budget())
+
+    if args.save or not baseline:
+        # Sizes not run this time keep their baseline
+        codec.dump({**baseline, **results}, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regression(s): {", ".join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":  # used to run script as executable
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Writes a synthetic site corpus, in the layout the pipeline produces.
+
+A site of N threads, each scanned M times and ending with P posts, is
+written to `./data/<site_name>/`: per snapshot, the thread HTML, content
+JSON and meta JSON; per thread, the master content, master text, master
+meta and snapshot hash; per site, a parameters file in `./data/params/`,
+the site meta and (optionally) the site index. Everything but the HTML and
+content is written by the pipeline's own generators.
+
+The corpus is deterministic from the seed: each thread is generated from
+its own seeded random state, so the same seed gives the same corpus
+however many jobs write it.
+
+Run it from the directory whose `./data` should hold the corpus (e.g. a
+scratch directory, to keep it apart from scraped data):
+
+```
+PYTHONPATH=<repo>/src python <repo>/benchmarks/corpus.py <site_name> <threads>
+    [--snapshots M] [--posts P] [--seed S] [--jobs J] [--index]
+```
+"""
+# Imports
+import argparse
+import logging
+import math
+import os
+import random
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+import synthetic
+
+from web_scraper.parse import codec
+from web_scraper.parse.MasterContentGenerator import MasterContentGenerator
+from web_scraper.parse.MasterMetaGenerator import MasterMetaGenerator
+from web_scraper.parse.MasterTextGenerator import MasterTextGenerator
+from web_scraper.parse.SiteIndex import SiteIndex
+from web_scraper.parse.SiteMetaGenerator import dump_site_meta
+from web_scraper.parse.SnapshotDeduplicator import SnapshotDeduplicator
+from web_scraper.parse.SnapshotMetaGenerator import SnapshotMetaGenerator
+from web_scraper.parse.snapshot_delta import write_snapshot_content
+
+logger = logging.getLogger(__name__)
+
+BOARDS: list[str] = ["/b/", "/r9k/", "/soc/", "/adv/", "/lgbt/"]
+FIRST_THREAD_ID: int = 1000000
+# Threads are published at random over this many days from the start date
+PUBLISHING_DAYS: int = 730
+# Number of threads each job is handed at once
+CHUNK_SIZE: int = 64
+
+
+def write_params(site_name: str) -> str:
+    """Writes the parameters file of a synthetic site, returning its path."""
+    params_path: str = os.path.join(
+        "./data", "params", f"{site_name}_params.json")
+    os.makedirs(os.path.dirname(params_path), exist_ok=True)
+    with open(params_path, "w", encoding="utf-8") as file:
+        file.write(codec.dumps({
+            "site_name": site_name,
+            "site_dir": os.path.join("./data", site_name),
+            "hp_url": f"https://{synthetic.ROOT_DOMAIN}/",
+            "domain": synthetic.ROOT_DOMAIN,
+            "container": "thread",
+            "op_class": synthetic.OP_CLASS,
+            "reply_class": synthetic.REPLY_CLASS,
+            "id_class": synthetic.ID_CLASS,
+            "root_domain": synthetic.ROOT_DOMAIN,
+        }, indent=4).decode("utf-8"))
+    return params_path
+
+
+def write_thread(
+        thread_index: int, site_dir: str, num_snapshots: int,
+        num_posts: int, seed: int, delta: bool = False) -> str:
+    """Writes one synthetic thread, snapshots and master files alike.
+
+    The thread is scanned `num_snapshots` times, the last scan finding all
+    `num_posts` of its posts and earlier scans proportionally fewer.
+
+    Returns:
+        The thread's ID.
+    """
+    rng: random.Random = random.Random(f"{seed}:{thread_index}")
+    thread_id: int = FIRST_THREAD_ID + thread_index * num_posts
+    thread_dir: str = os.path.join(site_dir, str(thread_id))
+    board_name: str = rng.choice(BOARDS)
+    title: str = synthetic.sentence(rng, 2, 8)
+    start: datetime = synthetic.START_DATE + timedelta(
+        seconds=rng.randrange(PUBLISHING_DAYS * 86400))
+    thread_posts: list[dict] = synthetic.posts(
+        thread_id, num_posts, rng, start)
+
+    content_paths: list[str] = []
+    meta_paths: list[str] = []
+    scan_time: datetime = start
+    for i in range(num_snapshots):
+        seen_posts: list[dict] = thread_posts[
+            :max(1, math.ceil(num_posts * (i + 1) / num_snapshots))]
+        # Scans are a minute after the newest post, and never at once
+        scan_time = max(
+            scan_time, seen_posts[-1]["date"]) + timedelta(minutes=1)
+        scan_time_str: str = scan_time.strftime(synthetic.DATE_FORMAT)
+        content: dict = synthetic.snapshot_content(
+            thread_id, seen_posts, scan_time, board_name, title)
+
+        snapshot_dir: str = os.path.join(thread_dir, scan_time_str)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        with open(os.path.join(snapshot_dir, f"thread_{thread_id}.html"),
+                  "w", encoding="utf-8") as file:
+            file.write(synthetic.thread_html(
+                thread_id, seen_posts, board_name, title))
+        content_path: str = write_snapshot_content(
+            content, scan_time_str, str(thread_id), site_dir, delta)
+        snapshot_meta_generator = SnapshotMetaGenerator(content_path)
+        snapshot_meta_generator.meta_dump()
+        content_paths.append(content_path)
+        meta_paths.append(snapshot_meta_generator.get_path())
+
+    master_content_generator = MasterContentGenerator(content_paths)
+    master_content_generator.content_dump()
+    MasterTextGenerator(
+        master_content_generator.get_path(), site_dir).write_text()
+    MasterMetaGenerator(meta_paths).master_meta_dump()
+    SnapshotDeduplicator(thread_dir, content).record_hash(scan_time_str)
+    return str(thread_id)
+
+
+def write_corpus(
+        site_name: str, num_threads: int, num_snapshots: int,
+        num_posts: int, seed: int = 0, jobs: int = 1,
+        delta: bool = False, index: bool = False) -> None:
+    """Writes a synthetic site corpus to `./data/<site_name>/`.
+
+    Args:
+        site_name (str): Name of the site data folder.
+        num_threads (int): Number of threads.
+        num_snapshots (int): Number of snapshots of each thread.
+        num_posts (int): Number of posts of each thread (by its last scan).
+        seed (int): Seed the corpus is generated from.
+        jobs (int): Number of worker processes writing threads.
+        delta (bool): Write snapshot content after the first as deltas.
+        index (bool): Build the site index once the threads are written.
+    """
+    site_dir: str = os.path.join("./data", site_name)
+    os.makedirs(site_dir, exist_ok=True)
+    write_params(site_name)
+
+    writer = partial(
+        write_thread, site_dir=site_dir, num_snapshots=num_snapshots,
+        num_posts=num_posts, seed=seed, delta=delta)
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs) as executor:
+            for i, _ in enumerate(executor.map(
+                    writer, range(num_threads), chunksize=CHUNK_SIZE), 1):
+                if i % 10000 == 0:
+                    logger.info(f"{i} of {num_threads} threads written")
+    else:
+        for i in range(num_threads):
+            writer(i)
+            if (i + 1) % 10000 == 0:
+                logger.info(f"{i + 1} of {num_threads} threads written")
+
+    if index:
+        with SiteIndex(site_dir) as site_index:
+            site_index.rebuild()
+    dump_site_meta(site_name)
+    logger.info(
+        f"Synthetic corpus of {num_threads} threads written to {site_dir}")
+
+
+if __name__ == "__main__":  # used to run script as executable
+    parser = argparse.ArgumentParser(
+        description=(
+            "Writes a synthetic site corpus to ./data/<site_name>/, in the "
+            "layout the pipeline produces."))
+    parser.add_argument(
+        "site_name", type=str, help="Name of the site data folder")
+    parser.add_argument(
+        "threads", type=int, help="Number of threads")
+    parser.add_argument(
+        "--snapshots", type=int, default=3,
+        help="Number of snapshots of each thread")
+    parser.add_argument(
+        "--posts", type=int, default=50,
+        help="Number of posts of each thread (by its last snapshot)")
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Seed the corpus is generated from")
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="Number of worker processes writing threads")
+    parser.add_argument(
+        "--delta", action="store_true",
+        help="Write snapshot content after the first as deltas")
+    parser.add_argument(
+        "--index", action="store_true",
+        help="Build the site index once the threads are written")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, stream=sys.stdout,
+        format="%(asctime)s - %(levelname)s - %(message)s")
+    # The generators log every file; only this script's progress is shown
+    logging.getLogger("web_scraper").setLevel(logging.WARNING)
+    write_corpus(
+        args.site_name, args.threads, args.snapshots, args.posts, args.seed,
+        args.jobs, args.delta, args.index)
@@ -0,0 +1,373 @@
+"""Replays the pipeline over already-scraped snapshots, into a scratch directory.
+
+Every saved snapshot of a site (`thread_*.html`, or `source_*.json` for 4chan
+boards) is read from `./data/<site_name>/` and run through the same steps a
+scrape runs once a thread is fetched: parsing, the unchanged-thread check,
+writing the snapshot (HTML or source, content and meta), and generating the
+master content, text and meta, recording everything in a site index.
+Snapshots are replayed in the order they were scraped, across threads, so
+master files grow as they did when the site was scraped.
+
+Nothing is fetched, and everything is written to a scratch directory rather
+than the data tree, so parser and storage changes can be timed on the real
+corpus without touching it. The threads replayed per second, and the wall
+and CPU time of each stage, are printed once done.
+
+Run it from the directory holding `./data` (e.g. the repository root):
+
+```
+PYTHONPATH=<repo>/src python <repo>/benchmarks/replay.py [site_name]
+    [--threads N] [--output DIR] [--json PATH]
+```
+"""
+# Imports
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+
+from web_scraper.log_setup import set_log_context
+from web_scraper.metrics import (
+    MASTER_CONTENT, MASTER_META, MASTER_TEXT, PARSE, POSTS, SKIPPED_THREADS,
+    SNAPSHOT_WRITE, THREADS, RunMetrics)
+from web_scraper.parse import codec
+from web_scraper.parse.HTMLToContent import ChanToContent
+from web_scraper.parse.JSONToContent import SourceToContent
+from web_scraper.parse.MasterContentGenerator import MasterContentGenerator
+from web_scraper.parse.MasterMetaGenerator import MasterMetaGenerator
+from web_scraper.parse.MasterTextGenerator import MasterTextGenerator
+from web_scraper.parse.SiteIndex import SiteIndex, open_site_index
+from web_scraper.parse.SnapshotDeduplicator import SnapshotDeduplicator
+from web_scraper.parse.SnapshotMetaGenerator import SnapshotMetaGenerator
+from web_scraper.parse.post_stream import append_new_posts
+from web_scraper.parse.snapshot_delta import write_snapshot_content
+from web_scraper.write_out import snapshot_dict_to_json, soup_to_html_file
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR: str = "./data"
+# Reading a saved snapshot, in place of fetching it
+READ: str = "read"
+# Stages in the order they're run, as printed
+STAGES: list[str] = [
+    READ, PARSE, SNAPSHOT_WRITE, MASTER_CONTENT, MASTER_TEXT, MASTER_META]
+
+
+def saved_snapshots(
+        site_dir: str, fourchan: bool,
+        num_threads: int | None = None) -> list[tuple[str, str]]:
+    """Returns the scan time and path of every saved snapshot of a site,
+    in the order they were scraped.
+
+    Args:
+        site_dir (str): Path to the site's data subfolder.
+        fourchan (bool): Whether snapshots are saved as source JSONs.
+        num_threads (int): Only the first this many thread folders (by
+            name) are included, if given.
+    """
+    pattern: str = "source_*.json" if fourchan else "thread_*.html"
+    thread_dirs: list[str] = sorted(
+        entry.path for entry in os.scandir(site_dir) if entry.is_dir())
+    if num_threads is not None:
+        thread_dirs = thread_dirs[:num_threads]
+
+    snapshots: list[tuple[str, str]] = []
+    for thread_dir in thread_dirs:
+        for snapshot_path in glob.glob(os.path.join(thread_dir, "*", pattern)):
+            snapshots.append(
+                (os.path.basename(os.path.dirname(snapshot_path)),
+                 snapshot_path))
+    return sorted(snapshots)
+
+
+def replay_snapshot(
+        params: dict, scan_time_str: str, snapshot_path: str, site_dir: str,
+        run_metrics: RunMetrics) -> bool:
+    """Runs a saved snapshot through the pipeline, writing to `site_dir`.
+
+    Returns:
+        Whether the snapshot was written (i.e. the thread had changed since
+        the snapshot replayed before it).
+    """
+    site_name: str = params["site_name"]
+    fourchan: bool = "4chan_" in site_name
+
+    with run_metrics.stage(site_name, READ):
+        if fourchan:
+            source_json: dict = codec.load(snapshot_path)
+        else:
+            with open(snapshot_path, "r", encoding="utf-8") as file:
+                html: str = file.read()
+    with run_metrics.stage(site_name, PARSE):
+        if fourchan:
+            content_parser = SourceToContent(
+                params["board_name"], source_json, scan_time_str)
+        else:
+            soup = BeautifulSoup(html, features="html.parser")
+            content_parser = ChanToContent(
+                scan_time_str,
+                soup,
+                "",
+                params["op_class"],
+                params["reply_class"],
+                params["root_domain"],
+            )
+    thread_id: str = str(content_parser.data["thread_id"])
+    set_log_context(site_name, thread_id)
+    thread_dir: str = os.path.join(site_dir, thread_id)
+
+    # Skip writing a snapshot if the thread hasn't changed since last scan
+    deduplicator: SnapshotDeduplicator = SnapshotDeduplicator(
+        thread_dir, content_parser.data)
+    if deduplicator.is_unchanged():
+        deduplicator.record_unchanged(scan_time_str)
+        run_metrics.count(site_name, SKIPPED_THREADS)
+        return False
+
+    thread_snapshot_path: str = os.path.join(thread_dir, scan_time_str)
+    os.makedirs(thread_snapshot_path, exist_ok=True)
+    content_file_path: str = os.path.join(
+        thread_snapshot_path, f"content_{thread_id}.json")
+
+    with run_metrics.stage(site_name, SNAPSHOT_WRITE):
+        if fourchan:
+            snapshot_dict_to_json(
+                source_json, scan_time_str, thread_id, "source", site_dir)
+            input_file_path: str = os.path.join(
+                thread_snapshot_path, f"source_{thread_id}.json")
+        else:
+            input_file_path = os.path.join(
+                thread_snapshot_path, f"thread_{thread_id}.html")
+            soup_to_html_file(soup, input_file_path)
+
+        write_snapshot_content(
+            content_parser.data,
+            scan_time_str,
+            thread_id,
+            site_dir,
+            params.get("delta_snapshots", False),
+        )
+        snapshot_meta_generator: SnapshotMetaGenerator = SnapshotMetaGenerator(
+            content_file_path)
+        snapshot_meta_generator.meta_dump()
+        site_index: SiteIndex = open_site_index(site_dir)
+        site_index.record_snapshot(
+            content_file_path,
+            snapshot_meta_generator.get_path(),
+            input_file_path,
+            snapshot_meta_generator.metadata,
+        )
+
+    with run_metrics.stage(site_name, MASTER_CONTENT):
+        master_content_generator: MasterContentGenerator = MasterContentGenerator(
+            site_index.content_paths(thread_dir))
+        master_content_generator.content_dump()
+        if params.get("post_stream", False):
+            append_new_posts(
+                site_name,
+                thread_id,
+                master_content_generator.new_posts,
+                scan_time_str,
+                params.get("post_stream_compress", False),
+                stream_dir=os.path.join(os.path.dirname(site_dir), "streams"),
+            )
+
+    with run_metrics.stage(site_name, MASTER_TEXT):
+        master_text_generator: MasterTextGenerator = MasterTextGenerator(
+            master_content_generator.get_path(), site_dir)
+        master_text_generator.write_text()
+
+    with run_metrics.stage(site_name, MASTER_META):
+        master_meta_generator: MasterMetaGenerator = MasterMetaGenerator(
+            site_index.meta_paths(thread_dir))
+        master_meta_generator.master_meta_dump()
+        site_index.record_thread(
+            master_meta_generator.get_path(),
+            master_meta_generator.master_metadata,
+            master_content_generator.get_path(),
+            master_text_generator.master_text_path,
+        )
+
+    deduplicator.record_hash(scan_time_str)
+
+    run_metrics.count(site_name, THREADS)
+    run_metrics.count(site_name, POSTS, 1 + len(content_parser.data["replies"]))
+    run_metrics.count_written(
+        site_name, input_file_path, content_file_path,
+        snapshot_meta_generator.get_path(),
+        master_content_generator.get_path(),
+        master_text_generator.master_text_path,
+        master_meta_generator.get_path())
+    return True
+
+
+def replay_site(
+        params: dict, output_dir: str, data_dir: str = DATA_DIR,
+        num_threads: int | None = None,
+        run_metrics: RunMetrics | None = None) -> dict:
+    """Replays every saved snapshot of a site into `<output_dir>/<site_name>`.
+
+    Args:
+        params (dict): Parameters of the site.
+        output_dir (str): Scratch directory written to, in place of `./data`.
+        data_dir (str): Data directory the snapshots are read from.
+        num_threads (int): Only replay the first this many thread folders.
+        run_metrics (RunMetrics): Metrics the stages are timed in (new ones,
+            if not given).
+
+    Returns:
+        A summary dictionary of the site name, the number of threads and
+        snapshots replayed, snapshots skipped as unchanged or failed, the
+        wall seconds taken, threads and snapshots per second, and every
+        metric of the replay.
+    """
+    site_name: str = params["site_name"]
+    run_metrics = run_metrics if run_metrics is not None else RunMetrics()
+    snapshots: list[tuple[str, str]] = saved_snapshots(
+        os.path.join(data_dir, site_name), "4chan_" in site_name, num_threads)
+
+    # A fresh, complete index, as a site with an index would have
+    site_dir: str = os.path.join(output_dir, site_name)
+    with SiteIndex(site_dir) as site_index:
+        site_index.rebuild()
+
+    thread_ids: set[str] = set()
+    num_written: int = 0
+    num_unchanged: int = 0
+    num_failed: int = 0
+    start: float = time.perf_counter()
+    for scan_time_str, snapshot_path in snapshots:
+        set_log_context(site_name)
+        try:
+            if replay_snapshot(
+                    params, scan_time_str, snapshot_path, site_dir,
+                    run_metrics):
+                num_written += 1
+            else:
+                num_unchanged += 1
+        except Exception as error:
+            logger.error(f"Unable to replay {snapshot_path}: {error}")
+            num_failed += 1
+            continue
+        thread_ids.add(os.path.basename(
+            os.path.dirname(os.path.dirname(snapshot_path))))
+    wall_seconds: float = time.perf_counter() - start
+    set_log_context()
+    open_site_index(site_dir).close()
+
+    return {
+        "site_name": site_name,
+        "num_threads": len(thread_ids),
+        "num_snapshots": num_written,
+        "num_unchanged": num_unchanged,
+        "num_failed": num_failed,
+        "wall_seconds": wall_seconds,
+        "threads_per_second": (
+            len(thread_ids) / wall_seconds if wall_seconds else 0.0),
+        "snapshots_per_second": (
+            (num_written + num_unchanged) / wall_seconds
+            if wall_seconds else 0.0),
+        "metrics": run_metrics.to_dict()["sites"].get(site_name, {}),
+    }
+
+
+def print_summary(summary: dict) -> None:
+    """Prints a site's replay rates and per-stage breakdown."""
+    print(
+        f"{summary["site_name"]}: {summary["num_threads"]} threads, "
+        f"{summary["num_snapshots"]} snapshots written, "
+        f"{summary["num_unchanged"]} unchanged, "
+        f"{summary["num_failed"]} failed in {summary["wall_seconds"]:.2f}s "
+        f"({summary["threads_per_second"]:.1f} threads/s, "
+        f"{summary["snapshots_per_second"]:.1f} snapshots/s)")
+    stages: dict = summary["metrics"].get("stages", {})
+    total_wall: float = sum(
+        timing["wall_seconds"] for timing in stages.values())
+    for stage_name in STAGES:
+        if stage_name not in stages:
+            continue
+        timing: dict = stages[stage_name]
+        share: float = (
+            timing["wall_seconds"] / total_wall if total_wall else 0.0)
+        print(
+            f"  {stage_name:<16}{timing["wall_seconds"]:>10.3f}s wall"
+            f"{timing["cpu_seconds"]:>10.3f}s cpu{share:>8.1%}")
+
+
+def load_site_params(data_dir: str, site_name: str | None) -> list[dict]:
+    """Loads the parameters of a site (or of every site, if not given)
+    whose snapshots are saved in the data directory."""
+    params_paths: list[str] = sorted(glob.glob(os.path.join(
+        data_dir, "params", f"{site_name or ""}*.json")))
+    if site_name is not None:
+        params_paths = params_paths[:1]
+
+    sites: list[dict] = []
+    for params_path in params_paths:
+        with open(params_path, "r") as params_file:
+            params: dict = json.load(params_file)
+        if os.path.isdir(os.path.join(data_dir, params["site_name"])):
+            sites.append(params)
+    return sites
+
+
+if __name__ == "__main__":  # used to run script as executable
+    parser = argparse.ArgumentParser(
+        description=(
+            "Replays the pipeline over already-scraped snapshots, writing to "
+            "a scratch directory. If no site_name is entered, every site is "
+            "replayed."))
+    parser.add_argument(
+        "site_name", type=str, nargs="?", help="Name of the site data folder")
+    parser.add_argument(
+        "--threads", type=int, default=None,
+        help="Only replay the first this many thread folders of each site")
+    parser.add_argument(
+        "--data", type=str, default=DATA_DIR,
+        help="Data directory the snapshots are read from")
+    parser.add_argument(
+        "--output", type=str, default=None,
+        help="Scratch directory to write to, and keep (default: a temporary "
+             "directory, removed once done)")
+    parser.add_argument(
+        "--json", type=str, default=None, metavar="PATH",
+        help="Path to also write the summaries to, as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, stream=sys.stdout,
+        format="%(asctime)s - %(levelname)s - %(message)s")
+    # The generators log every file; only this script's progress is shown
+    logging.getLogger("web_scraper").setLevel(logging.WARNING)
+
+    output_dir: str = args.output or tempfile.mkdtemp(
+        prefix="web_scraper_replay_")
+    data_path: str = os.path.realpath(args.data)
+    if os.path.commonpath(
+            [data_path, os.path.realpath(output_dir)]) == data_path:
+        parser.error("--output must be outside of the data directory")
+
+    sites: list[dict] = load_site_params(args.data, args.site_name)
+    if not sites:
+        parser.error(f"No saved site found in {args.data}")
+    summaries: list[dict] = []
+    try:
+        for params in sites:
+            logger.info(f"Replaying {params["site_name"]} into {output_dir}")
+            summary: dict = replay_site(
+                params, output_dir, args.data, args.threads)
+            print_summary(summary)
+            summaries.append(summary)
+    finally:
+        if args.output is None:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            file.write(codec.dumps(summaries).decode("utf-8"))
@@ -0,0 +1,196 @@
+"""Synthetic threads, in each of the formats the parsers and generators read.
+
+Everything is generated from a seeded `random.Random`, so the same seed
+always gives the same threads.
+"""
+# Imports
+import os
+import random
+
+from datetime import datetime, timedelta
+
+from web_scraper.parse import codec
+
+WORDS: list[str] = (
+    "the quick brown fox jumps over lazy dog anon thread post reply board "
+    "image source archive lurk bump sage green text meme based cope seethe "
+    "original content week month year never always maybe honestly").split()
+
+BOARD_NAME: str = "/b/"
+START_DATE: datetime = datetime(2024, 5, 17, 10, 0, 0)
+DATE_FORMAT: str = "%Y-%m-%dT%H:%M:%S"
+
+# Classes of vichan-style posts (as in a site's parameters file)
+OP_CLASS: str = "post op"
+REPLY_CLASS: str = "post reply"
+ID_CLASS: str = "intro"
+ROOT_DOMAIN: str = "example.org"
+
+
+def sentence(rng: random.Random, min_words: int = 3,
+              max_words: int = 40) -> str:
+    """Returns a random run of words."""
+    return " ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words)))
+
+
+def post_dates(
+        num_posts: int, rng: random.Random,
+        start: datetime = START_DATE) -> list[datetime]:
+    """Returns increasing post dates, from the start date on."""
+    dates: list[datetime] = []
+    date: datetime = start
+    for _ in range(num_posts):
+        dates.append(date)
+        date += timedelta(seconds=rng.randint(1, 600))
+    return dates
+
+
+def posts(
+        thread_id: int, num_posts: int, rng: random.Random,
+        start: datetime = START_DATE) -> list[dict]:
+    """Returns a thread's posts, the original post first.
+
+    Each post is a dict of `post_id` (int), `date` (datetime), `username`,
+    `content` and `replied_to_ids` (ints of earlier posts). Post IDs follow
+    on from the thread ID.
+    """
+    thread_posts: list[dict] = []
+    for i, date in enumerate(post_dates(num_posts, rng, start)):
+        post_id: int = thread_id + i
+        replied_to_ids: list[int] = []
+        if i > 0 and rng.random() < 0.4:
+            replied_to_ids = [thread_id + rng.randrange(i)]
+        thread_posts.append({
+            "post_id": post_id,
+            "date": date,
+            "username": "Anonymous",
+            "content": sentence(rng),
+            "replied_to_ids": replied_to_ids,
+        })
+    return thread_posts
+
+
+def vichan_html(
+        thread_id: int, num_posts: int, rng: random.Random,
+        title: str = "Synthetic thread") -> str:
+    """Returns the HTML of a vichan-style thread page.
+
+    Parses with `ChanToContent`/`ArchiveToContent` given `OP_CLASS`,
+    `REPLY_CLASS`, `ID_CLASS` and `ROOT_DOMAIN`.
+    """
+    return thread_html(
+        thread_id, posts(thread_id, num_posts, rng), title=title)
+
+
+def thread_html(
+        thread_id: int, thread_posts: list[dict],
+        board_name: str = BOARD_NAME,
+        title: str = "Synthetic thread") -> str:
+    """Returns the HTML of a vichan-style thread page of the given posts."""
+    post_html: list[str] = []
+    for i, post in enumerate(thread_posts):
+        links: str = "".join(
+            f'<a href="/b/res/{thread_id}.html#{reply_id}" '
+            f'onclick="highlightReply(\'{reply_id}\');">&gt;&gt;{reply_id}</a><br/>'
+            for reply_id in post["replied_to_ids"])
+        post_class: str = OP_CLASS if i == 0 else REPLY_CLASS
+        element_id: str = (
+            f"op_{post["post_id"]}" if i == 0 else f"reply_{post["post_id"]}")
+        post_html.append(
+            f'<div class="{post_class}" id="{element_id}">'
+            f'<p class="intro" id="{post["post_id"]}">'
+            f'<span class="name">{post["username"]}</span> '
+            f'<time datetime="{post["date"].strftime(DATE_FORMAT)}Z">'
+            f'{post["date"].strftime("%m/%d/%y (%a) %H:%M:%S")}</time> '
+            f'<a class="post_no" id="post_no_{post["post_id"]}">No.</a></p>'
+            f'<div class="body">{links}{post["content"]}</div></div>')
+    return (
+        f"<html><head><title>{board_name} - {title}</title></head><body>"
+        f'<div class="thread" id="thread_{thread_id}">'
+        f'<img class="post-image" src="/b/src/{thread_id}.png"/>'
+        f'{"".join(post_html)}</div></body></html>')
+
+
+def fourchan_source_json(
+        thread_id: int, num_posts: int, rng: random.Random,
+        title: str = "Synthetic thread") -> dict:
+    """Returns a 4chan API thread JSON, as parsed by `SourceToContent`."""
+    source_posts: list[dict] = []
+    for i, post in enumerate(posts(thread_id, num_posts, rng)):
+        comment: str = "".join(
+            f'<a href="#p{reply_id}" class="quotelink">&gt;&gt;{reply_id}</a><br>'
+            for reply_id in post["replied_to_ids"]) + post["content"]
+        source_post: dict = {
+            "no": post["post_id"],
+            "time": int(post["date"].timestamp()),
+            "com": comment,
+            "name": post["username"],
+            "resto": 0 if i == 0 else thread_id,
+        }
+        if i == 0:
+            source_post["sub"] = title
+        source_posts.append(source_post)
+    return {"posts": source_posts}
+
+
+def snapshot_content(
+        thread_id: int, thread_posts: list[dict], scan_time: datetime,
+        board_name: str = BOARD_NAME,
+        title: str = "Synthetic thread") -> dict:
+    """Returns the snapshot content of a thread's posts at a scan."""
+    def post_data(post: dict) -> dict:
+        return {
+            "date_posted": post["date"].strftime(DATE_FORMAT),
+            "post_id": str(post["post_id"]),
+            "post_content": post["content"],
+            "img_links": [],
+            "username": post["username"],
+            "replied_to_ids": [str(reply_id)
+                               for reply_id in post["replied_to_ids"]],
+        }
+
+    return {
+        "board_name": board_name,
+        "thread_title": title,
+        "thread_id": str(thread_id),
+        "url": f"https://{ROOT_DOMAIN}/b/res/{thread_id}.html",
+        "date_published": thread_posts[0]["date"].strftime(DATE_FORMAT),
+        "date_updated": thread_posts[-1]["date"].strftime(DATE_FORMAT),
+        "date_scraped": scan_time.strftime(DATE_FORMAT),
+        "original_post": post_data(thread_posts[0]),
+        "replies": {
+            f"reply_{post["post_id"]}": post_data(post)
+            for post in thread_posts[1:]},
+    }
+
+
+def write_snapshot_chain(
+        thread_dir: str, thread_id: int, num_snapshots: int,
+        initial_posts: int, posts_per_snapshot: int,
+        rng: random.Random) -> list[str]:
+    """Writes the snapshot content JSONs of a thread scanned repeatedly.
+
+    The first scan finds `initial_posts` posts, and each later scan finds
+    `posts_per_snapshot` more than the last.
+
+    Returns:
+        The paths of the snapshot content JSONs, in scan order.
+    """
+    thread_posts: list[dict] = posts(
+        thread_id, initial_posts + (num_snapshots - 1) * posts_per_snapshot,
+        rng)
+    content_paths: list[str] = []
+    for i in range(num_snapshots):
+        seen_posts: list[dict] = thread_posts[
+            :initial_posts + i * posts_per_snapshot]
+        scan_time: datetime = seen_posts[-1]["date"] + timedelta(minutes=1)
+        snapshot_dir: str = os.path.join(
+            thread_dir, scan_time.strftime(DATE_FORMAT))
+        os.makedirs(snapshot_dir, exist_ok=True)
+        content_path: str = os.path.join(
+            snapshot_dir, f"content_{thread_id}.json")
+        codec.dump(
+            snapshot_content(thread_id, seen_posts, scan_time),
+            content_path, machine_only=True)
+        content_paths.append(content_path)
+    return content_paths
@@ -1,73 +1,241 @@
 # Imports
 import argparse
+import functools
+import glob
+import importlib
+import json
 import logging
+import os
+import sys
 
 from datetime import datetime
-from pathlib import Path
-from scrape_and_parse import *
-from scrape_catalog import *
-from fourchan_scrape_and_parse import *
-
-scan_time_str = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")  # ISO format
-
-# Ensure the logs directory exists
-log_dir = Path("./data/logs")
-log_dir.mkdir(parents=True, exist_ok=True)
-
-# Root logger config
-logging.basicConfig(
-    filename=(f"./data/logs/{scan_time_str}.log"),
-    filemode="w",
-    format=("%(asctime)s %(levelname)s : %(message)s"),
-    datefmt="%Y-%m-%dT%H:%M:%S",
-    style="%",
-    level=logging.INFO,  # We can make a lot of the spam-y logs DEBUG
-)
+
+# Each command only imports what it needs once it's been chosen, so short
+# jobs (e.g. recalculating sitewide statistics) don't import the scrapers
+
+# Commands scraping (and parsing) sites, run from this directory
+SCRAPE_COMMANDS: tuple[str] = ("scrape", "catalog", "4chan")
+# Commands run by the package's own modules, with their own arguments
+PACKAGE_COMMANDS: dict[str, str] = {
+    "reparse": "web_scraper.parse.Reparser",
+    "stats": "web_scraper.parse.SiteMetaGenerator",
+    "portion": "web_scraper.portion.portion",
+}
+
 logger = logging.getLogger(__name__)
-logger.info("Root logger configured")
 
 def parse_optional(value):
     if value is None or value.lower() == "none" or value == '':
         return None
     return value
 
-# Arguments
-parser = argparse.ArgumentParser(
-    prog="web_scraper",
-    description=(
-        "A web scraper and parser for (currently) chan-style "
-        "websites, built around a passed parameters file.\n"
-        "By default, URLs are pulled from the homepage specified "
-        "in the provided parameters file, then they are parsed "
-        "in accordance with the README, and saved to the relative "
-        "directory in the passed parameters file."
-    ),
-    formatter_class=argparse.RawTextHelpFormatter,
-)
-
-# Name of the parameters file; a glob search will be used to retrieve locally
-parser.add_argument(
-    "params_name", nargs="?", type= parse_optional, help="Name of the JSON parameters file to be searched and retrieved."
-)
-
-parser.add_argument(
-    "catalog", nargs="?", type=int, default= 0, help="Boolean used to determine whether or not to scrape from catalog"
-)
-
-
-args = parser.parse_args()
-
-if args.params_name is None:
-    if args.catalog != 1:
-        scrape_all(scan_time_str)
+
+def scrape_options() -> argparse.ArgumentParser:
+    """Returns a parser of the options shared by the scraping commands."""
+    parser = argparse.ArgumentParser(add_help=False)
+
+    # Metrics of the run are always written next to the log; this also writes
+    # them out as a Prometheus textfile
+    parser.add_argument(
+        "--prometheus", type=str, default=None, metavar="PATH",
+        help="Path of a Prometheus textfile to write the run's metrics to."
+    )
+
+    # Profiles are written to ./data/logs/, named after the scan time
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Profile the run, writing the profile and a summary of the hottest functions to ./data/logs/."
+    )
+    parser.add_argument(
+        "--profile-thread", type=str, default=None, metavar="THREAD_ID",
+        help="Instead of scraping, profile parsing a saved thread of the site and generating its masters."
+    )
+
+    # Memory traces are written next to the log, named after the scan time
+    parser.add_argument(
+        "--memtrace", action="store_true",
+        help="Trace the peak memory of each stage and thread, and where it's allocated, writing a report next to the log."
+    )
+
+    # Log records are written as JSON lines, tagged with the site and thread ID
+    parser.add_argument(
+        "--log-json", action="store_true",
+        help="Write the log as JSON lines rather than text."
+    )
+    return parser
+
+
+def command_parser() -> argparse.ArgumentParser:
+    """Returns the parser of the commands."""
+    parser = argparse.ArgumentParser(
+        prog="web_scraper",
+        description=(
+            "A web scraper and parser for (currently) chan-style "
+            "websites, built around a passed parameters file.\n"
+            "URLs are pulled from the homepage (or catalog) specified "
+            "in the provided parameters file, then they are parsed "
+            "in accordance with the README, and saved to the relative "
+            "directory in the passed parameters file."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    commands = parser.add_subparsers(
+        dest="command", required=True, metavar="command")
+    options: argparse.ArgumentParser = scrape_options()
+
+    # Name of the parameters file; a glob search will be used to retrieve locally
+    scrape_parser = commands.add_parser(
+        "scrape", parents=[options],
+        help="Scrape and parse the threads linked from a site's homepage.")
+    scrape_parser.add_argument(
+        "params_name", nargs="?", type=parse_optional,
+        help="Name of the JSON parameters file to be searched and retrieved (default: all sites)."
+    )
+    catalog_parser = commands.add_parser(
+        "catalog", parents=[options],
+        help="Scrape and parse the threads listed in a site's catalog.")
+    catalog_parser.add_argument(
+        "params_name", nargs="?", type=parse_optional,
+        help="Name of the JSON parameters file to be searched and retrieved (default: all sites)."
+    )
+    fourchan_parser = commands.add_parser(
+        "4chan", parents=[options],
+        help="Scrape and parse the backlog of a 4chan board, through its API.")
+    fourchan_parser.add_argument(
+        "params_name",
+        help="Name of the JSON parameters file to be searched and retrieved."
+    )
+    # Threads are fetched one by one regardless; more workers fetch ahead
+    fourchan_parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of threads fetched at once, within the API's rate limit."
+    )
+    fourchan_parser.add_argument(
+        "--archive-backfill", action="store_true",
+        help="Instead of the live threads, capture the final state of scraped threads since archived."
+    )
+
+    # Listed for the help message; their arguments are parsed by their modules
+    commands.add_parser(
+        "reparse", add_help=False,
+        help="Reparse saved data (see `reparse --help`).")
+    commands.add_parser(
+        "stats", add_help=False,
+        help="Recalculate sitewide statistics (see `stats --help`).")
+    commands.add_parser(
+        "portion", add_help=False,
+        help="Portion out a random collection of threads (see `portion --help`).")
+    return parser
+
+
+def legacy_parser() -> argparse.ArgumentParser:
+    """Returns the parser of the original arguments, `[params_name] [catalog]`."""
+    parser = argparse.ArgumentParser(
+        prog="web_scraper", parents=[scrape_options()],
+        description="Scrapes and parses sites (run with a command instead; see `scrape --help`).",
+    )
+    parser.add_argument(
+        "params_name", nargs="?", type= parse_optional, help="Name of the JSON parameters file to be searched and retrieved."
+    )
+    parser.add_argument(
+        "catalog", nargs="?", type=int, default= 0, help="Boolean used to determine whether or not to scrape from catalog"
+    )
+    parser.set_defaults(workers=1, archive_backfill=False)
+    return parser
+
+
+def legacy_command(args: argparse.Namespace) -> str:
+    """Returns the command the original arguments amount to."""
+    if args.params_name is None:
+        return "catalog" if args.catalog == 1 else "scrape"
+    if "4chan_" in args.params_name:
+        return "4chan"
+    # A named site was always scraped from its catalog
+    return "catalog"
+
+
+def run_scrape(command: str, args: argparse.Namespace) -> None:
+    """Runs a scraping command, writing out its log, metrics and profile."""
+    from log_setup import configure_logging
+    from metrics import get_run_metrics, metrics_path
+
+    scan_time_str = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")  # ISO format
+    log_path = f"./data/logs/{scan_time_str}.log"
+
+    # Root logger config; records are written out by a separate thread
+    configure_logging(
+        log_path,
+        level=logging.INFO,  # We can make a lot of the spam-y logs DEBUG
+        structured=args.log_json,
+    )
+    logger.info("Root logger configured")
+
+    if command == "scrape":
+        from scrape_and_parse import scrape as scrape_site, scrape_all
+    elif command == "catalog":
+        from scrape_catalog import (
+            catalog_scrape as scrape_site, catalog_scrape_all as scrape_all)
+    else:
+        from fourchan_scrape_and_parse import (
+            fourchan_archive_backfill, fourchan_backlog_scrape)
+        scrape_site = functools.partial(
+            fourchan_archive_backfill if args.archive_backfill
+            else fourchan_backlog_scrape,
+            workers=args.workers)
+
+    def run():
+        if args.params_name is None:
+            scrape_all(scan_time_str)
+        else:
+            scrape_site(args.params_name, scan_time_str)
+
+    run_metrics = get_run_metrics()
+    if args.memtrace:
+        from memtrace import start_memtrace
+        memory_tracer = start_memtrace()
+    try:
+        if args.profile_thread is not None:
+            from profiling import profile_thread
+            if args.params_name is None:
+                sys.exit("--profile-thread needs the thread's params_name")
+            params_file_list = glob.glob(f"./data/params/{args.params_name}*.json")
+            if not params_file_list:
+                sys.exit(f"No parameters file found for {args.params_name}")
+            with open(params_file_list[0], "r") as params_file:
+                profile_thread(
+                    json.load(params_file), args.profile_thread, scan_time_str)
+        elif args.profile:
+            from profiling import profile_run
+            profile_run(command, scan_time_str, run)
+        else:
+            run()
+    finally:
+        run_metrics.write_json(metrics_path(log_path))
+        logger.info(f"Run metrics written to {metrics_path(log_path)}")
+        if args.prometheus:
+            run_metrics.write_prometheus(args.prometheus)
+        if args.memtrace:
+            from memtrace import memtrace_path
+            memory_tracer.write_json(memtrace_path(log_path))
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    command: str | None = argv[0] if argv else None
+    # The package is importable from the parent directory, if it isn't
+    # installed
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    if command in PACKAGE_COMMANDS:
+        module = importlib.import_module(PACKAGE_COMMANDS[command])
+        module.main(argv[1:], prog=f"web_scraper {command}")
+    elif command in SCRAPE_COMMANDS or command in ("-h", "--help"):
+        args = command_parser().parse_args(argv)
+        run_scrape(args.command, args)
     else:
-        catalog_scrape_all(scan_time_str)
-        
-
-elif "4chan_" in args.params_name: 
-    fourchan_backlog_scrape(args.params_name, scan_time_str)
-else:
-    if args.catalog is None:
-        scrape(args.params_name, scan_time_str)
-    else: 
-        catalog_scrape(args.params_name, scan_time_str)
\ No newline at end of file
+        args = legacy_parser().parse_args(argv)
+        run_scrape(legacy_command(args), args)
+
+
+if __name__ == "__main__":  # used to run script as executable
+    main()
@@ -0,0 +1,274 @@
+"""Columnar (Parquet) export of every post, for whole-corpus analytics.
+
+Each thread's master content is flattened into one row per post, and written
+to Parquet files partitioned by site and board (hive-style, so
+`pyarrow.dataset` and most query engines pick the partitions up):
+
+```
+data/exports/posts/
+├─ _export_state.json
+├─ site=<site_name>/
+│  ├─ board=<board_name>/
+│  │  ├─ part-<export time>-<id>.parquet
+```
+
+Rerunning the export only appends the threads whose master content changed
+since they were last exported (tracked in `_export_state.json`). A thread
+that was exported again has its earlier rows left in place, so when
+reading, keep each thread's rows with the latest `exported_at`. `--full`
+discards a site's export and exports every thread again.
+
+Requires pyarrow (`pip install .[export]`).
+"""
+# Imports
+import argparse
+import logging
+import os
+import shutil
+import uuid
+
+from datetime import datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional; only needed to export
+    pyarrow = None
+
+from web_scraper.parse import codec
+from web_scraper.parse.ReparseManifest import hash_file
+from web_scraper.parse.SiteIndex import open_site_index
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR: str = os.path.join("./data", "exports", "posts")
+# Readers of the dataset skip files starting with an underscore
+STATE_FILE_NAME: str = "_export_state.json"
+
+# Number of rows buffered per partition before they're written out
+ROW_GROUP_SIZE: int = 65536
+
+
+def post_schema():
+    """Returns the schema of an exported post row."""
+    return pyarrow.schema([
+        ("thread_id", pyarrow.string()),
+        ("post_id", pyarrow.string()),
+        ("is_original_post", pyarrow.bool_()),
+        ("date_posted", pyarrow.string()),
+        ("username", pyarrow.string()),
+        ("num_words", pyarrow.int32()),
+        ("replied_to_ids", pyarrow.list_(pyarrow.string())),
+        ("post_content", pyarrow.string()),
+        ("exported_at", pyarrow.string()),
+    ])
+
+
+def master_content_to_rows(master_content: dict, exported_at: str) -> list[dict]:
+    """Flattens a thread's master content into one row per post.
+
+    Args:
+        master_content (dict): A thread's master content.
+        exported_at (str): Time of the export.
+    """
+    posts: list[tuple[bool, dict]] = [(True, master_content["original_post"])]
+    posts.extend((False, reply) for reply in master_content["replies"].values())
+    return [
+        {
+            "thread_id": master_content["thread_id"],
+            "post_id": post["post_id"],
+            "is_original_post": is_original_post,
+            "date_posted": post.get("date_posted"),
+            "username": post.get("username"),
+            "num_words": len(post.get("post_content", "").split()),
+            "replied_to_ids": post.get("replied_to_ids", []),
+            "post_content": post.get("post_content"),
+            "exported_at": exported_at,
+        }
+        for is_original_post, post in posts]
+
+
+class _PartitionWriter:
+    """Buffers rows for one site/board partition and writes them out."""
+
+    def __init__(self, partition_dir: str, file_name: str):
+        self.file_path: str = os.path.join(partition_dir, file_name)
+        self.rows: list[dict] = []
+        self.writer = None
+
+    def add(self, rows: list[dict]) -> None:
+        self.rows.extend(rows)
+        if len(self.rows) >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            self.writer = pyarrow.parquet.ParquetWriter(
+                self.file_path, post_schema())
+        self.writer.write_table(
+            pyarrow.Table.from_pylist(self.rows, schema=post_schema()))
+        self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _partition_name(value: str | None) -> str:
+    """Returns a value usable as a partition folder name."""
+    if not value:
+        return "unknown"
+    return value.replace("/", "_")
+
+
+def _is_unchanged(master_content_path: str, record: dict | None) -> bool:
+    """Returns True if a master content file matches its export record.
+
+    The file is only rehashed if its size is unchanged but its modification
+    time isn't; if the hash still matches, the record's stat is refreshed.
+    """
+    if record is None:
+        return False
+    stat: os.stat_result = os.stat(master_content_path)
+    if stat.st_size != record["size"]:
+        return False
+    if stat.st_mtime_ns == record["mtime_ns"]:
+        return True
+    if hash_file(master_content_path) != record["hash"]:
+        return False
+    record["mtime_ns"] = stat.st_mtime_ns
+    return True
+
+
+def _export_record(master_content_path: str) -> dict:
+    """Returns the export record of a master content file."""
+    stat: os.stat_result = os.stat(master_content_path)
+    return {
+        "hash": hash_file(master_content_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def load_state(export_dir: str = EXPORT_DIR) -> dict:
+    """Loads the export state, or an empty state if there's none."""
+    state_path: str = os.path.join(export_dir, STATE_FILE_NAME)
+    if not os.path.exists(state_path):
+        return {}
+    return codec.load(state_path)
+
+
+def save_state(state: dict, export_dir: str = EXPORT_DIR) -> None:
+    """Writes the export state out, replacing the previous one at once."""
+    os.makedirs(export_dir, exist_ok=True)
+    state_path: str = os.path.join(export_dir, STATE_FILE_NAME)
+    codec.dump(state, f"{state_path}.tmp", machine_only=True)
+    os.replace(f"{state_path}.tmp", state_path)
+
+
+def export_site(
+        site_name: str, full: bool = False,
+        export_dir: str = EXPORT_DIR) -> int:
+    """Exports the posts of a site's threads whose master content changed.
+
+    Args:
+        site_name (str): Name of the site data folder.
+        full (bool): Discard the site's previous export and export every
+            thread again.
+        export_dir (str): Directory the export is written to.
+
+    Returns:
+        The number of threads exported.
+    """
+    if pyarrow is None:
+        raise ImportError(
+            "pyarrow is needed for columnar exports: pip install .[export]")
+
+    site_dir: str = os.path.join("./data", site_name)
+    site_export_dir: str = os.path.join(
+        export_dir, f"site={_partition_name(site_name)}")
+    state: dict = load_state(export_dir)
+    if full:
+        shutil.rmtree(site_export_dir, ignore_errors=True)
+        state.pop(site_name, None)
+    site_state: dict = state.setdefault(site_name, {})
+
+    exported_at: str = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")
+    # Exports within the same second mustn't overwrite each other's parts
+    file_name: str = (
+        f"part-{exported_at.replace(":", "")}-{uuid.uuid4().hex[:8]}.parquet")
+    writers: dict[str, _PartitionWriter] = {}
+    exported_records: dict[str, dict] = {}
+
+    site_index = open_site_index(site_dir)
+    for master_content_path in site_index.master_content_paths():
+        thread_dir: str = os.path.dirname(master_content_path)
+        thread_id: str = os.path.basename(thread_dir)
+        try:
+            if _is_unchanged(master_content_path, site_state.get(thread_id)):
+                continue
+            record: dict = _export_record(master_content_path)
+            rows: list[dict] = master_content_to_rows(
+                codec.load(master_content_path), exported_at)
+            board: str = _partition_name(site_index.board_name(thread_dir))
+        except (OSError, KeyError, *codec.DecodeError) as error:
+            logger.error(f"Unable to export {master_content_path}: {error}")
+            continue
+
+        if board not in writers:
+            writers[board] = _PartitionWriter(
+                os.path.join(site_export_dir, f"board={board}"), file_name)
+        writers[board].add(rows)
+        exported_records[thread_id] = record
+
+    for writer in writers.values():
+        writer.close()
+    # Only recorded once every row has been written out
+    site_state.update(exported_records)
+    save_state(state, export_dir)
+    logger.info(f"{len(exported_records)} threads exported for {site_name}")
+    return len(exported_records)
+
+
+def export_all(full: bool = False) -> None:
+    """Exports the posts of every site with a parameters file.
+
+    Args:
+        full (bool): Discard previous exports and export every thread again.
+    """
+    params_directory = os.path.join("./data", "params")
+    for param_file in os.listdir(params_directory):
+        site_name = param_file.replace("_params.json", "")
+        if "archive" in site_name:  # TODO: Remove once archive sites work
+            continue
+        if os.path.isdir(os.path.join("./data", site_name)):
+            export_site(site_name, full)
+
+
+if __name__ == "__main__":  # used to run script as executable
+    parser = argparse.ArgumentParser(
+        description=(
+            "Exports every post of every thread's master content to Parquet "
+            "files partitioned by site and board. If no site_name is "
+            "entered, all sites are exported."))
+    parser.add_argument(
+        "site_name",
+        type=str,
+        nargs="?",
+        help="Name of the site data folder",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Discard the previous export and export every thread again.",
+    )
+    args = parser.parse_args()
+
+    if args.site_name is None:
+        export_all(args.full)
+    else:
+        export_site(args.site_name, args.full)
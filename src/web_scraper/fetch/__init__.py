@@ -1 +1,2 @@
-from .fetcher import fetch_html_content, archive_crawler
\ No newline at end of file
+from .fetcher import fetch_html_content, archive_crawler
+from .rate_limiter import RateLimiter
@@ -47,6 +47,7 @@ def fetch_fourchan_json_content(
         _requests_session = requests.session()
         _requests_session.headers["User-Agent"] = "py-4chan/%s" % "0.6.0"
         response = _requests_session.get(url)
+        response.raise_for_status()  # e.g. a thread pruned since it was listed
         content = json.loads(response.text)
         return content
     except requests.HTTPError as error:
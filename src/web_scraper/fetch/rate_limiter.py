@@ -0,0 +1,31 @@
+# Imports
+import threading
+import time
+
+
+class RateLimiter:
+    """Spaces requests out by a minimum interval, across threads.
+
+    Each caller of `wait()` is given the next free slot, at least `interval`
+    seconds after the one before it, and sleeps until then. Requests made
+    from several threads at once therefore never exceed the rate between
+    them (e.g. the 4chan API's one request per second).
+    """
+
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval (float): Minimum number of seconds between requests.
+        """
+        self.interval: float = interval
+        self._lock: threading.Lock = threading.Lock()
+        self._next_slot: float = 0.0
+
+    def wait(self) -> None:
+        """Waits until a request can next be made."""
+        with self._lock:
+            now: float = time.monotonic()
+            slot: float = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
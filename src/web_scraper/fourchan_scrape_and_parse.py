@@ -4,7 +4,10 @@ import json
 import logging
 import os
 import sys
-import time
+
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from bs4 import BeautifulSoup
 from pathlib import Path
@@ -12,27 +15,39 @@ from pathlib import Path
 from basc_py4chan import *
 
 from fetch.fetcher import fetch_fourchan_json_content
+from fetch.rate_limiter import RateLimiter
 from scrape.board_scraper import BoardScraper
 from parse.MasterTextGenerator import MasterTextGenerator
 from parse.HTMLToContent.BoardToContent import BoardToContent
+from parse.JSONToContent.SourceToContent import SourceToContent
 from parse.MasterContentGenerator import MasterContentGenerator
 from parse.MasterMetaGenerator import MasterMetaGenerator
+from parse.SiteIndex import open_site_index
+from parse.SnapshotDeduplicator import SnapshotDeduplicator, load_date_archived
 from parse.SnapshotMetaGenerator import SnapshotMetaGenerator
+from parse.post_stream import append_new_posts
+from parse.snapshot_delta import write_snapshot_content
 from write_out import *
+from metrics import (
+    FETCH, MASTER_CONTENT, MASTER_META, MASTER_TEXT, PARSE, POSTS,
+    SKIPPED_THREADS, SNAPSHOT_WRITE, THREADS, get_run_metrics)
+from log_setup import set_log_context
 
 from write_out import *
 
 logger = logging.getLogger(__name__)
 
+# The 4chan API asks for no more than one request per second
+REQUEST_INTERVAL: float = 1.0
+# Shared by every request made to the API
+rate_limiter: RateLimiter = RateLimiter(REQUEST_INTERVAL)
 
-def fourchan_backlog_scrape(params_name: str, scan_time_str: str) -> None:
-    """Scrapes and parses data from a specified website.
+
+def load_params(params_name: str) -> dict:
+    """Loads the parameters of a board, exiting if they can't be.
     Args:
         params_name (str): Name of website that corresponds to its respective params file
-        scan_time_str (str): String containing the scan time
     """
-
-    # Parameters
     params_file_list = glob.glob(f"./data/params/{params_name}*.json")
     params_file = params_file_list[0] if params_file_list else None
 
@@ -65,60 +80,103 @@ def fourchan_backlog_scrape(params_name: str, scan_time_str: str) -> None:
         )
         logger.critical("Aborting")
         sys.exit(1)
+    return params
 
-    scraper: BoardScraper = BoardScraper(params["board_name"])
-    list_of_threads: list[Thread] = scraper.all_threads_to_list()
 
-    for thread in list_of_threads:
-        thread: Thread
-        thread_id: int = thread.id
+def fetch_ahead(
+        scraper: BoardScraper, thread_ids: list[int],
+        workers: int) -> Iterator[tuple[int, Future]]:
+    """Fetches threads' API JSONs ahead of them being processed.
 
-        # Processes thread
-        process(params, scan_time_str, thread, thread_id)
+    Up to `workers` threads are fetched at once, within the API's rate
+    limit, and handed back in order as (thread ID, fetch), so only a few
+    threads are ever held at a time.
 
+    Args:
+        scraper (BoardScraper): Scraper of the threads' board
+        thread_ids (list[int]): IDs of the threads to fetch
+        workers (int): Number of threads fetched at once
+    """
+    def fetch(thread_id: int) -> dict:
         # to not overload server
-        time.sleep(1)  # wait 1s before looping again
+        rate_limiter.wait()
+        return fetch_fourchan_json_content(scraper.thread_api_url(thread_id))
 
+    pending: deque[tuple[int, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for thread_id in thread_ids:
+            pending.append((thread_id, executor.submit(fetch, thread_id)))
+            # The oldest thread is processed while the rest are fetched
+            if len(pending) > workers:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+
+def fourchan_backlog_scrape(
+        params_name: str, scan_time_str: str, workers: int = 1) -> None:
+    """Scrapes and parses every thread of a 4chan board, one at a time.
+
+    Only the IDs of the board's threads are listed up front; each thread is
+    then fetched, processed and released in turn, so memory stays flat
+    however big the board is. Up to `workers` threads are fetched ahead of
+    the one being processed, with requests kept within the API's rate limit.
 
-def fourchan_scrape(params_name: str, scan_time_str: str) -> None:
-    """Scrapes and parses data from a specified website.
     Args:
         params_name (str): Name of website that corresponds to its respective params file
         scan_time_str (str): String containing the scan time
+        workers (int): Number of threads fetched at once
     """
-    # Parameters
-    params_file_list = glob.glob(f"./data/params/{params_name}*.json")
-    params_file = params_file_list[0] if params_file_list else None
+    params: dict = load_params(params_name)
 
-    if params_file is None:
-        logger.critical(f"Parameters file name is not valid: {params_name}")
-        logger.critical("Aborting")
-        sys.exit(1)
-    else:
-        logger.debug(f"Parameters file name is valid: {params_name}")
-        logger.debug("Choosing the first file containing the name")
+    scraper: BoardScraper = BoardScraper(params["board_name"])
+    rate_limiter.wait()
+    # Archived threads are final, so they aren't polled again
+    thread_ids: list[int] = [
+        thread_id for thread_id in scraper.thread_ids()
+        if not is_archived(params, thread_id)]
 
-    params_path = Path(params_file)
-    params: dict
+    for thread_id, future in fetch_ahead(scraper, thread_ids, workers):
+        process_fetched(params, scan_time_str, scraper, thread_id, future)
+    logger.info(
+        f"Backlog of {len(thread_ids)} threads of {params["site_name"]} "
+        f"processed")
+
+
+def process_fetched(
+        params: dict, scan_time_str: str, scraper: BoardScraper,
+        thread_id: int, future: Future) -> None:
+    """Processes a thread once it's been fetched, skipping it if it couldn't
+    be (e.g. it was pruned since the board was listed).
+
+    Args:
+        params(dict): Dictionary containing board parameters
+        scan_time_str(str): Time of scan
+        scraper (BoardScraper): Scraper of the thread's board
+        thread_id (int): ID of thread
+        future (Future): Fetch of the thread's API JSON
+    """
+    run_metrics = get_run_metrics()
+    site_name: str = params["site_name"]
+    set_log_context(site_name, thread_id)
     try:
-        with open(params_path, "r") as params_file:
-            params = json.load(params_file)
-        logger.info("Loaded parameters successfully")
-    except FileNotFoundError:
-        logger.critical("Parameters file not found with open")
-        logger.critical("Aborting")
-        sys.exit(1)
-    except json.JSONDecodeError as error:
-        logger.critical(f"Parameters file unable to be decoded: {error}")
-        logger.critical("Aborting")
-        sys.exit(1)
+        with run_metrics.stage(site_name, FETCH):
+            api_data: dict = future.result()
+        thread: Thread = scraper.thread_from_json(api_data, thread_id)
     except Exception as error:
-        # Any other potential errors during file handling
-        logger.critical(
-            f"An unexpected error occurred while loading parameters: {error}"
-        )
-        logger.critical("Aborting")
-        sys.exit(1)
+        logger.warning(f"Skipping thread {thread_id}: {error}")
+        run_metrics.count(site_name, SKIPPED_THREADS)
+        return
+    process(params, scan_time_str, thread, thread_id, api_data)
+
+
+def fourchan_scrape(params_name: str, scan_time_str: str) -> None:
+    """Scrapes and parses data from a specified website.
+    Args:
+        params_name (str): Name of website that corresponds to its respective params file
+        scan_time_str (str): String containing the scan time
+    """
+    params: dict = load_params(params_name)
 
     scraper: BoardScraper = BoardScraper(params["board_name"])
     list_of_threads: list[Thread] = []
@@ -131,87 +189,236 @@ def fourchan_scrape(params_name: str, scan_time_str: str) -> None:
     for thread in list_of_threads:
         thread: Thread
         thread_id: int = thread.id
+        if is_archived(params, thread_id):
+            continue
+
+        # to not overload server
+        rate_limiter.wait()
 
         # Processes thread
         process(params, scan_time_str, thread, thread_id)
 
-        # to not overload server
-        time.sleep(1)  # wait 1s before looping again
+
+def fourchan_archive_backfill(
+        params_name: str, scan_time_str: str, workers: int = 1) -> None:
+    """Captures the final state of threads archived since they were scraped.
+
+    The board's `archive.json` lists the threads archived on it. Those with
+    a thread folder which isn't yet marked as archived are fetched (within
+    the API's rate limit), parsed from their API JSON with
+    `SourceToContent`, and written as a final snapshot. Each is then marked
+    as archived in its master meta, so it isn't polled again.
+
+    Args:
+        params_name (str): Name of website that corresponds to its respective params file
+        scan_time_str (str): String containing the scan time
+        workers (int): Number of threads fetched at once
+    """
+    params: dict = load_params(params_name)
+    site_dir: str = f"./data/{params["site_name"]}"
+    scraper: BoardScraper = BoardScraper(params["board_name"])
+    rate_limiter.wait()
+    archived_thread_ids: list[int] = scraper.archived_thread_ids()
+
+    scraped_thread_ids: set[str] = (
+        {entry.name for entry in os.scandir(site_dir) if entry.is_dir()}
+        if os.path.isdir(site_dir) else set())
+    thread_ids: list[int] = [
+        thread_id for thread_id in archived_thread_ids
+        if str(thread_id) in scraped_thread_ids
+        and not is_archived(params, thread_id)]
+    logger.info(
+        f"{len(thread_ids)} of {len(archived_thread_ids)} archived threads "
+        f"of {params["site_name"]} need their final snapshot")
+
+    run_metrics = get_run_metrics()
+    site_name: str = params["site_name"]
+    for thread_id, future in fetch_ahead(scraper, thread_ids, workers):
+        set_log_context(site_name, thread_id)
+        try:
+            with run_metrics.stage(site_name, FETCH):
+                api_data: dict = future.result()
+            with run_metrics.stage(site_name, PARSE):
+                content_parser: SourceToContent = SourceToContent(
+                    params["board_name"], api_data, scan_time_str)
+        except Exception as error:
+            logger.warning(f"Skipping archived thread {thread_id}: {error}")
+            run_metrics.count(site_name, SKIPPED_THREADS)
+            continue
+
+        # When the thread was archived, as given by the API
+        archived_on: int | None = api_data["posts"][0].get("archived_on")
+        date_archived: str = (
+            format_date(unix_to_datetime(archived_on))
+            if archived_on is not None else scan_time_str)
+        write_thread(
+            params, scan_time_str, thread_id, api_data, content_parser.data,
+            date_archived)
+
+
+def is_archived(params: dict, thread_id: int) -> bool:
+    """Returns whether a thread has been marked as archived (i.e. final).
+    Args:
+        params(dict): Dictionary containing board parameters
+        thread_id (int): ID of thread"""
+    thread_dir: str = os.path.join(
+        f"./data/{params["site_name"]}", str(thread_id))
+    return load_date_archived(thread_dir, str(thread_id)) is not None
 
 
-def process(params: dict, scan_time_str: str, thread: Thread, thread_id: str):
+def process(
+        params: dict, scan_time_str: str, thread: Thread, thread_id: str,
+        api_data: dict | None = None):
     """Performs processing on a given thread
     Args:
         params(dict): Dictionary containing board parameters
         scan_time_str(str): Time of scan
         thread (Thread): 4Chan thread
-        thread_id (str): ID of thread"""
-    
+        thread_id (str): ID of thread
+        api_data (dict): The thread's API JSON, if already fetched"""
+    run_metrics = get_run_metrics()
+    site_name: str = params["site_name"]
+    set_log_context(site_name, thread_id)
+    if api_data is None:
+        with run_metrics.stage(site_name, FETCH):
+            api_data = fetch_fourchan_json_content(thread._api_url)
+    with run_metrics.stage(site_name, PARSE):
+        content_parser: BoardToContent = BoardToContent(
+            params["site_dir"], thread, scan_time_str
+        )
+    write_thread(params, scan_time_str, thread_id, api_data, content_parser.data)
+
+
+def write_thread(
+        params: dict, scan_time_str: str, thread_id: str, api_data: dict,
+        content: dict, date_archived: str | None = None) -> None:
+    """Writes a parsed thread's snapshot, and regenerates its master files
+    Args:
+        params(dict): Dictionary containing board parameters
+        scan_time_str(str): Time of scan
+        thread_id (str): ID of thread
+        api_data (dict): The thread's API JSON, saved as its source
+        content (dict): The thread's parsed snapshot content
+        date_archived (str): When the thread was archived, if it has been"""
+
     # Pathing:
     thread_dir: str = os.path.join(f"./data/{params["site_name"]}", str(thread_id))
+
+    run_metrics = get_run_metrics()
+    site_name: str = params["site_name"]
+
+    # Skip writing a snapshot if the thread hasn't changed since last scan
+    deduplicator: SnapshotDeduplicator = SnapshotDeduplicator(
+        thread_dir, content)
+    if deduplicator.is_unchanged():
+        deduplicator.record_unchanged(scan_time_str)
+        if date_archived is not None:
+            deduplicator.record_archived(date_archived)
+            open_site_index(os.path.dirname(thread_dir)).record_archived(
+                thread_dir, date_archived)
+        run_metrics.count(site_name, SKIPPED_THREADS)
+        return
+
     thread_snapshot_path: str = os.path.join(thread_dir, scan_time_str)
     os.makedirs(thread_snapshot_path, exist_ok=True)
 
     content_file_path: str = os.path.join(
         thread_snapshot_path, f"content_{thread_id}.json"
     )
-
-    # Saves API data as dict:
-    api_data: dict = fetch_fourchan_json_content(thread._api_url)
-    snapshot_dict_to_json(
-        api_data,
-        scan_time_str,
-        thread_id,
-        "source",
-        f"./data/{params["site_name"]}",
+    source_file_path: str = os.path.join(
+        thread_snapshot_path, f"source_{thread_id}.json"
     )
 
-    content_parser: BoardToContent = BoardToContent(
-        params["site_dir"], thread, scan_time_str
-    )
+    with run_metrics.stage(site_name, SNAPSHOT_WRITE):
+        # Saves API data as dict:
+        snapshot_dict_to_json(
+            api_data,
+            scan_time_str,
+            thread_id,
+            "source",
+            f"./data/{params["site_name"]}",
+        )
 
-    # Content JSON creation:
-    snapshot_dict_to_json(
-        content_parser.data,
-        scan_time_str,
-        thread_id,
-        "content",
-        f"./data/{params["site_name"]}",
-    )
-    # TODO: Using the f-string for the data directory instead of
-    # params["site_dir"] for now for testing
+        # Content JSON creation (as a delta, if enabled in the params file):
+        write_snapshot_content(
+            content,
+            scan_time_str,
+            thread_id,
+            f"./data/{params["site_name"]}",
+            params.get("delta_snapshots", False),
+        )
+        # TODO: Using the f-string for the data directory instead of
+        # params["site_dir"] for now for testing
 
-    # Snapshot meta creation:
-    snapshot_meta_generator: SnapshotMetaGenerator = SnapshotMetaGenerator(
-        content_file_path
-    )
-    snapshot_meta_generator.meta_dump()
+        # Snapshot meta creation:
+        snapshot_meta_generator: SnapshotMetaGenerator = SnapshotMetaGenerator(
+            content_file_path
+        )
+        snapshot_meta_generator.meta_dump()
+        site_index = open_site_index(os.path.dirname(thread_dir))
+        site_index.record_snapshot(
+            content_file_path,
+            snapshot_meta_generator.get_path(),
+            source_file_path,
+            snapshot_meta_generator.metadata,
+        )
 
-    # Master content creation:
-    candidate_content_files = os.path.join(thread_dir, "**", "content_*.json")
-    list_of_snapshot_contents: list[str] = list(
-        glob.glob(candidate_content_files, recursive=True)
-    )
-    master_content_generator: MasterContentGenerator = MasterContentGenerator(
-        list_of_snapshot_contents,
-    )
-    master_content_generator.content_dump()
-
-    # Master text creation:
-    master_text_generator: MasterTextGenerator = MasterTextGenerator(
-        os.path.join(
-            thread_dir, f"master_version_{content_parser.data["thread_id"]}.json"
-        ),
-        params["site_dir"],
-    )
-    master_text_generator.write_text()
+    with run_metrics.stage(site_name, MASTER_CONTENT):
+        # Master content creation:
+        list_of_snapshot_contents: list[str] = site_index.content_paths(
+            thread_dir)
+        master_content_generator: MasterContentGenerator = MasterContentGenerator(
+            list_of_snapshot_contents,
+        )
+        master_content_generator.content_dump()
+
+        # Newly seen posts (appended to the site's post stream, if enabled):
+        if params.get("post_stream", False):
+            append_new_posts(
+                params["site_name"],
+                str(thread_id),
+                master_content_generator.new_posts,
+                scan_time_str,
+                params.get("post_stream_compress", False),
+            )
+
+    with run_metrics.stage(site_name, MASTER_TEXT):
+        # Master text creation:
+        master_text_generator: MasterTextGenerator = MasterTextGenerator(
+            os.path.join(
+                thread_dir, f"master_version_{content["thread_id"]}.json"
+            ),
+            params["site_dir"],
+        )
+        master_text_generator.write_text()
+
+    # Recorded before the master meta is generated, so that it (and the
+    # site index) marks the thread as archived
+    if date_archived is not None:
+        deduplicator.record_archived(date_archived)
+
+    with run_metrics.stage(site_name, MASTER_META):
+        # Master meta creation:
+        list_of_snapshot_metas: list[str] = site_index.meta_paths(thread_dir)
+        master_meta_generator: MasterMetaGenerator = MasterMetaGenerator(
+            list_of_snapshot_metas
+        )
+        master_meta_generator.master_meta_dump()
+        site_index.record_thread(
+            master_meta_generator.get_path(),
+            master_meta_generator.master_metadata,
+            master_content_generator.get_path(),
+            master_text_generator.master_text_path,
+        )
 
-    # Master meta creation:
-    candidate_meta_files = os.path.join(thread_dir, "**", "meta_*.json")
-    list_of_snapshot_metas: list[str] = list(
-        glob.glob(candidate_meta_files, recursive=True)
-    )
-    master_meta_generator: MasterMetaGenerator = MasterMetaGenerator(
-        list_of_snapshot_metas
-    )
-    master_meta_generator.master_meta_dump()
+    # Snapshot hash, for comparison against the next scan
+    deduplicator.record_hash(scan_time_str)
+
+    run_metrics.count(site_name, THREADS)
+    run_metrics.count(site_name, POSTS, 1 + len(content["replies"]))
+    run_metrics.count_written(
+        site_name, source_file_path, content_file_path,
+        snapshot_meta_generator.get_path(),
+        master_content_generator.get_path(),
+        master_text_generator.master_text_path,
+        master_meta_generator.get_path())
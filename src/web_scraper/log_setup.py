@@ -0,0 +1,139 @@
+"""Logging configuration of a run.
+
+Records are handed to a queue by the thread logging them, and written to the
+log file (and any other handlers) by a listener thread, so log I/O happens
+off the main thread. Each record is tagged with the site and thread being
+processed, as set with `set_log_context()`, and can optionally be written as
+one JSON object per line instead of text.
+"""
+# Imports
+import atexit
+import logging
+import os
+import queue
+
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+try:  # Imported as part of the package
+    from .parse import codec
+except ImportError:  # Imported by the drivers, from within the package
+    from parse import codec
+
+TEXT_FORMAT: str = "%(asctime)s %(levelname)s : %(message)s"
+DATE_FORMAT: str = "%Y-%m-%dT%H:%M:%S"
+
+# Site name and thread ID being processed, tagged onto every record
+_log_context: ContextVar[tuple[str | None, str | None]] = ContextVar(
+    "log_context", default=(None, None))
+_listener: QueueListener | None = None
+
+
+def set_log_context(
+        site_name: str | None = None, thread_id: str | None = None) -> None:
+    """Sets the site and thread that records logged from now on are about."""
+    _log_context.set(
+        (site_name, str(thread_id) if thread_id is not None else None))
+
+
+def get_log_context() -> tuple[str | None, str | None]:
+    """Returns the site name and thread ID records are currently tagged with."""
+    return _log_context.get()
+
+
+class ContextFilter(logging.Filter):
+    """Tags records with the site name and thread ID of the log context."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.site_name, record.thread_id = _log_context.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "site_name": getattr(record, "site_name", None),
+            "thread_id": getattr(record, "thread_id", None),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return codec.dumps(entry, indent=None).decode("utf-8")
+
+
+def configure_logging(
+        log_path: str, level: int = logging.INFO, structured: bool = False,
+        stream=None) -> QueueListener:
+    """Configures the root logger to log through a queue to a file.
+
+    Args:
+        log_path (str): Path of the log file, written over if it exists.
+        level (int): Lowest level logged.
+        structured (bool): Write records as JSON lines rather than text.
+        stream: Stream to also log to (e.g. `sys.stdout`), if any.
+
+    Returns:
+        The listener writing records out; it is stopped (writing out any
+        queued records) by `stop_logging()`, or when the interpreter exits.
+    """
+    global _listener
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    formatter: logging.Formatter = (
+        JSONFormatter() if structured
+        else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    handlers: list[logging.Handler] = [
+        logging.FileHandler(log_path, mode="w", encoding="utf-8")]
+    if stream is not None:
+        handlers.append(logging.StreamHandler(stream))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # The context is read by the thread logging the record, not the listener
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler: QueueHandler = QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    root_logger: logging.Logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(level)
+
+    stop_logging()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Writes out any queued records and stops the listener, if running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _log_directly() -> None:
+    """Swaps the queue for the listener's handlers, in a forked process.
+
+    The listener thread isn't forked along with the process, so worker
+    processes (e.g. of a parallel reparse) write their records themselves.
+    """
+    if _listener is None:
+        return
+    root_logger: logging.Logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root_logger.removeHandler(handler)
+    for handler in _listener.handlers:
+        handler.addFilter(ContextFilter())
+        root_logger.addHandler(handler)
+
+
+atexit.register(stop_logging)
+if hasattr(os, "register_at_fork"):  # Not available on Windows
+    os.register_at_fork(after_in_child=_log_directly)
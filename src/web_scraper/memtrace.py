@@ -0,0 +1,332 @@
+"""Memory tracing of a run, per stage and per thread.
+
+Once `start_memtrace()` is called, every stage timed by the run's metrics
+(see `metrics.py`) also records the peak memory allocated by Python
+(through tracemalloc) and the peak resident set size of the process while it
+ran, along with how much more memory was held once it finished. Peaks are
+also kept per thread, as tagged by the log context (see `log_setup.py`).
+
+Whenever a stage finishes holding more memory than any stage before it, the
+allocations still held are snapshotted, so the report names where the
+memory went (e.g. soups that are still referenced, or master metas growing
+with every snapshot), along with what grew the most over the whole run.
+The report is written next to the run's log as `<scan time>.memtrace.json`.
+
+Tracing slows a run down severalfold, and only traces the process it's
+started in (e.g. not the workers of a parallel reparse).
+"""
+# Imports
+import logging
+import os
+import tracemalloc
+
+from contextlib import contextmanager, nullcontext
+
+try:  # Imported as part of the package
+    from .log_setup import get_log_context
+    from .parse import codec
+except ImportError:  # Imported by the drivers, from within the package
+    from log_setup import get_log_context
+    from parse import codec
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Stage traced per thread of a reparse (whose stage is the whole site)
+REPARSE_THREAD: str = "reparse_thread"
+
+# Frames kept of each allocation's traceback
+MAX_FRAMES: int = 25
+# Number of allocation sites listed in the report
+TOP_N: int = 25
+# Memory held must grow by this much before it's snapshotted again
+SNAPSHOT_STEP: int = 1024 * 1024
+
+PACKAGE_DIR: str = os.path.dirname(os.path.abspath(__file__))
+# Allocations made by tracing itself aren't reported
+_SNAPSHOT_FILTERS: list[tracemalloc.Filter] = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+class MemoryTracer:
+    """Peak memory per site and stage, and per thread.
+
+    Attributes:
+        stages (dict): Site name -> stage -> `count` (of times the stage
+            ran), `peak_traced_bytes`, `peak_rss_bytes` and
+            `retained_bytes` (memory still held after the stage, summed
+            over every time it ran).
+        threads (dict): Site name -> thread ID -> `peak_traced_bytes` and
+            `peak_rss_bytes` over every stage of the thread.
+    """
+
+    def __init__(self, max_frames: int = MAX_FRAMES, top_n: int = TOP_N):
+        self.max_frames: int = max_frames
+        self.top_n: int = top_n
+        self.stages: dict[str, dict[str, dict]] = {}
+        self.threads: dict[str, dict[str, dict]] = {}
+        self._stack: list[dict] = []
+        self._start_snapshot: tracemalloc.Snapshot | None = None
+        self._held_snapshot: tracemalloc.Snapshot | None = None
+        self._held_stage: tuple[str, str, str | None] | None = None
+        self._held_bytes: int = 0
+        # Memory taken up by the snapshots themselves, which isn't counted
+        self._snapshot_bytes: dict[str, int] = {"start": 0, "held": 0}
+        self._peak_traced: int = 0
+        self._peak_rss: int = 0
+
+    def start(self) -> None:
+        """Starts tracing allocations."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.max_frames)
+        self._start_snapshot = self._snapshot("start")
+
+    def stop(self) -> None:
+        """Stops tracing allocations, freeing the traces."""
+        tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, site_name: str, stage_name: str):
+        """Records the peak memory of the block within as a stage of a site.
+
+        Stages may be nested; the peak of a stage includes those of the
+        stages within it.
+        """
+        current, peak = self._traced_memory()
+        if self._stack:
+            parent: dict = self._stack[-1]
+            parent["peak_traced"] = max(parent["peak_traced"], peak)
+            parent["peak_rss"] = max(parent["peak_rss"], peak_rss())
+        tracemalloc.reset_peak()
+        reset_peak_rss()
+        frame: dict = {
+            "start_traced": current, "peak_traced": current, "peak_rss": 0}
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            current, peak = self._traced_memory()
+            frame["peak_traced"] = max(frame["peak_traced"], peak)
+            frame["peak_rss"] = max(frame["peak_rss"], peak_rss())
+            if self._stack:
+                parent = self._stack[-1]
+                parent["peak_traced"] = max(
+                    parent["peak_traced"], frame["peak_traced"])
+                parent["peak_rss"] = max(parent["peak_rss"], frame["peak_rss"])
+            self._record(site_name, stage_name, frame, current)
+
+    def _record(
+            self, site_name: str, stage_name: str, frame: dict,
+            current: int) -> None:
+        """Adds a finished stage to the peaks of its site and thread."""
+        peaks: dict = self.stages.setdefault(site_name, {}).setdefault(
+            stage_name, {"count": 0, "peak_traced_bytes": 0,
+                         "peak_rss_bytes": 0, "retained_bytes": 0})
+        peaks["count"] += 1
+        peaks["peak_traced_bytes"] = max(
+            peaks["peak_traced_bytes"], frame["peak_traced"])
+        peaks["peak_rss_bytes"] = max(peaks["peak_rss_bytes"], frame["peak_rss"])
+        peaks["retained_bytes"] += current - frame["start_traced"]
+        self._peak_traced = max(self._peak_traced, frame["peak_traced"])
+        self._peak_rss = max(self._peak_rss, frame["peak_rss"])
+
+        thread_id: str | None = get_log_context()[1]
+        if thread_id is not None:
+            thread_peaks: dict = self.threads.setdefault(
+                site_name, {}).setdefault(
+                thread_id, {"peak_traced_bytes": 0, "peak_rss_bytes": 0})
+            thread_peaks["peak_traced_bytes"] = max(
+                thread_peaks["peak_traced_bytes"], frame["peak_traced"])
+            thread_peaks["peak_rss_bytes"] = max(
+                thread_peaks["peak_rss_bytes"], frame["peak_rss"])
+
+        # Snapshotting is slow, so it's only redone once notably more is held
+        if current >= self._held_bytes + SNAPSHOT_STEP:
+            self._held_snapshot = None
+            self._held_snapshot = self._snapshot("held")
+            self._held_stage = (site_name, stage_name, thread_id)
+            self._held_bytes = current
+
+    def _snapshot(self, kind: str) -> tracemalloc.Snapshot:
+        """Returns a snapshot of the allocations currently held, noting how
+        much memory the snapshot itself takes up."""
+        before: int = tracemalloc.get_traced_memory()[0]
+        snapshot: tracemalloc.Snapshot = _snapshot()
+        self._snapshot_bytes[kind] = max(
+            0, tracemalloc.get_traced_memory()[0] - before)
+        return snapshot
+
+    def _traced_memory(self) -> tuple[int, int]:
+        """Returns the memory currently allocated, and the peak since it was
+        last reset, other than by the snapshots."""
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot_bytes: int = sum(self._snapshot_bytes.values())
+        return max(0, current - snapshot_bytes), max(0, peak - snapshot_bytes)
+
+    def to_dict(self) -> dict:
+        """Returns the report, as written out to the memtrace JSON."""
+        current, peak = self._traced_memory()
+        report: dict = {
+            "peak_traced_bytes": max(self._peak_traced, peak),
+            "peak_rss_bytes": max(self._peak_rss, peak_rss()),
+            "traced_bytes": current,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "sites": {
+                site_name: {
+                    "stages": {
+                        stage_name: dict(peaks) for stage_name, peaks
+                        in self.stages.get(site_name, {}).items()},
+                    # Threads are listed from the one needing the most memory
+                    "threads": dict(sorted(
+                        self.threads.get(site_name, {}).items(),
+                        key=lambda item: item[1]["peak_traced_bytes"],
+                        reverse=True)),
+                }
+                for site_name in sorted(set(self.stages) | set(self.threads))},
+            "most_held": None,
+            "most_grown": [],
+        }
+        if self._held_snapshot is not None:
+            site_name, stage_name, thread_id = self._held_stage
+            report["most_held"] = {
+                "site_name": site_name,
+                "stage": stage_name,
+                "thread_id": thread_id,
+                "held_bytes": self._held_bytes,
+                "allocations": [
+                    _statistic(statistic) for statistic in
+                    self._held_snapshot.statistics("traceback")[:self.top_n]],
+            }
+        if self._start_snapshot is not None and tracemalloc.is_tracing():
+            differences = _snapshot().compare_to(
+                self._start_snapshot, "traceback")
+            report["most_grown"] = [
+                _statistic(difference) for difference in differences
+                if difference.size_diff > 0][:self.top_n]
+        return report
+
+    def write_json(self, file_path: str) -> None:
+        """Writes the report out to a JSON file, logging its largest sites."""
+        report: dict = self.to_dict()
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        codec.dump(report, file_path)
+        logger.info(
+            "Memory trace written to %s; peak traced %d bytes, peak RSS %d "
+            "bytes", file_path, report["peak_traced_bytes"],
+            report["peak_rss_bytes"])
+        if report["most_held"] is not None:
+            for allocation in report["most_held"]["allocations"][:5]:
+                logger.info(
+                    "Held %d bytes in %d blocks allocated from %s",
+                    allocation["size_bytes"], allocation["blocks"],
+                    allocation["package_frame"] or allocation["frame"])
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    """Returns a snapshot of the allocations currently held."""
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _statistic(statistic) -> dict:
+    """Returns an allocation site's statistic (or difference) as a dict.
+
+    Besides the frame that made the allocation, the innermost frame within
+    the package is given, since allocations are mostly made from libraries
+    (e.g. bs4) on the package's behalf.
+    """
+    frames: list[tracemalloc.Frame] = list(statistic.traceback)
+    package_frames: list[tracemalloc.Frame] = [
+        frame for frame in frames if frame.filename.startswith(PACKAGE_DIR)]
+    entry: dict = {
+        "size_bytes": statistic.size,
+        "blocks": statistic.count,
+        "frame": _frame(frames[-1]) if frames else None,
+        "package_frame": (
+            _frame(package_frames[-1]) if package_frames else None),
+        "traceback": [_frame(frame) for frame in frames],
+    }
+    if isinstance(statistic, tracemalloc.StatisticDiff):
+        entry["size_diff_bytes"] = statistic.size_diff
+        entry["blocks_diff"] = statistic.count_diff
+    return entry
+
+
+def _frame(frame: tracemalloc.Frame) -> str:
+    """Returns a frame as `path:line`, relative to the package if within."""
+    file_name: str = frame.filename
+    if file_name.startswith(PACKAGE_DIR):
+        file_name = os.path.relpath(file_name, os.path.dirname(PACKAGE_DIR))
+    return f"{file_name}:{frame.lineno}"
+
+
+def peak_rss() -> int:
+    """Returns the peak resident set size of the process, in bytes.
+
+    On Linux this is the peak since it was last reset by `reset_peak_rss()`;
+    elsewhere it's the peak over the life of the process (or 0, if unknown).
+    """
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    max_rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Given in kilobytes, other than on macOS
+    return max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+
+
+def reset_peak_rss() -> None:
+    """Resets the peak resident set size to the current size, on Linux."""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:  # Not Linux, or not permitted
+        pass
+
+
+_memory_tracer: MemoryTracer | None = None
+
+
+def start_memtrace(
+        max_frames: int = MAX_FRAMES, top_n: int = TOP_N) -> MemoryTracer:
+    """Starts tracing the memory of the run's stages."""
+    global _memory_tracer
+    _memory_tracer = MemoryTracer(max_frames, top_n)
+    _memory_tracer.start()
+    return _memory_tracer
+
+
+def stop_memtrace() -> None:
+    """Stops tracing memory, if it's being traced."""
+    global _memory_tracer
+    if _memory_tracer is not None:
+        _memory_tracer.stop()
+        _memory_tracer = None
+
+
+def get_memory_tracer() -> MemoryTracer | None:
+    """Returns the run's memory tracer, if memory is being traced."""
+    return _memory_tracer
+
+
+def traced(site_name: str, stage_name: str):
+    """Returns a context recording the memory of a stage, if it's traced."""
+    if _memory_tracer is None:
+        return nullcontext()
+    return _memory_tracer.stage(site_name, stage_name)
+
+
+def memtrace_path(log_path: str) -> str:
+    """Returns the path of the memory trace written next to a run's log."""
+    return f"{os.path.splitext(log_path)[0]}.memtrace.json"
@@ -0,0 +1,209 @@
+"""Per-site, per-stage timings and counters of a run.
+
+Drivers time each stage of processing a thread with `stage()` and count
+what they handle with `count()`; at the end of a run, everything is written
+out next to the run's log as `<scan time>.metrics.json`, and optionally as a
+Prometheus textfile (for node_exporter's textfile collector).
+
+A run's metrics are shared through `get_run_metrics()`, so every module of
+the run adds to the same ones.
+"""
+# Imports
+import os
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+try:  # Imported as part of the package
+    from .memtrace import traced
+    from .parse import codec
+except ImportError:  # Imported by the drivers, from within the package
+    from memtrace import traced
+    from parse import codec
+
+# Stages timed per thread
+FETCH: str = "fetch"
+PARSE: str = "parse"
+SNAPSHOT_WRITE: str = "snapshot_write"
+MASTER_CONTENT: str = "master_content"
+MASTER_TEXT: str = "master_text"
+MASTER_META: str = "master_meta"
+SITE_STATS: str = "site_stats"
+REPARSE: str = "reparse"
+
+# Counters kept per site
+THREADS: str = "threads"
+POSTS: str = "posts"
+BYTES_FETCHED: str = "bytes_fetched"
+BYTES_WRITTEN: str = "bytes_written"
+SKIPPED_THREADS: str = "skipped_threads"
+
+
+class RunMetrics:
+    """Wall and CPU time per site and stage, plus counters per site.
+
+    Attributes:
+        started (str): When the run started.
+        stages (dict): Site name -> stage -> `wall_seconds`, `cpu_seconds`
+            and `count` (of times the stage ran).
+        counters (dict): Site name -> counter name -> value.
+        errors (dict): Site name -> exception type name -> count.
+    """
+
+    def __init__(self):
+        self.started: str = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")
+        self._start_wall: float = time.perf_counter()
+        self._start_cpu: float = time.process_time()
+        self.stages: dict[str, dict[str, dict]] = defaultdict(
+            lambda: defaultdict(
+                lambda: {"wall_seconds": 0.0, "cpu_seconds": 0.0, "count": 0}))
+        self.counters: dict[str, dict[str, int]] = defaultdict(
+            lambda: defaultdict(int))
+        self.errors: dict[str, dict[str, int]] = defaultdict(
+            lambda: defaultdict(int))
+
+    @contextmanager
+    def stage(self, site_name: str, stage_name: str):
+        """Times the block within as a stage of a site.
+
+        An exception escaping the block is counted as an error of the site
+        (and raised on). If memory is being traced, the stage's peak memory
+        is recorded too.
+        """
+        start_wall: float = time.perf_counter()
+        start_cpu: float = time.process_time()
+        try:
+            with traced(site_name, stage_name):
+                yield
+        except Exception as error:
+            self.error(site_name, error)
+            raise
+        finally:
+            timing: dict = self.stages[site_name][stage_name]
+            timing["wall_seconds"] += time.perf_counter() - start_wall
+            timing["cpu_seconds"] += time.process_time() - start_cpu
+            timing["count"] += 1
+
+    def count(self, site_name: str, counter: str, value: int = 1) -> None:
+        """Adds to a counter of a site."""
+        self.counters[site_name][counter] += value
+
+    def error(self, site_name: str, error: Exception | str) -> None:
+        """Counts an error of a site by its exception type (or type name)."""
+        type_name: str = (
+            error if isinstance(error, str) else type(error).__name__)
+        self.errors[site_name][type_name] += 1
+
+    def count_written(self, site_name: str, *file_paths: str | None) -> None:
+        """Adds the sizes of files written to the site's bytes written."""
+        for file_path in file_paths:
+            if file_path is not None and os.path.exists(file_path):
+                self.count(site_name, BYTES_WRITTEN, os.path.getsize(file_path))
+
+    def to_dict(self) -> dict:
+        """Returns every metric, as written out to the metrics JSON."""
+        sites: set[str] = set(self.stages) | set(self.counters) | set(
+            self.errors)
+        return {
+            "started": self.started,
+            "wall_seconds": time.perf_counter() - self._start_wall,
+            "cpu_seconds": time.process_time() - self._start_cpu,
+            "sites": {
+                site_name: {
+                    "stages": {
+                        stage_name: dict(timing) for stage_name, timing
+                        in self.stages.get(site_name, {}).items()},
+                    "counters": dict(self.counters.get(site_name, {})),
+                    "errors": dict(self.errors.get(site_name, {})),
+                }
+                for site_name in sorted(sites)},
+        }
+
+    def to_prometheus(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        metrics: dict = self.to_dict()
+        lines: list[str] = []
+
+        def family(name: str, help_text: str, metric_type: str) -> None:
+            lines.append(f"# HELP web_scraper_{name} {help_text}")
+            lines.append(f"# TYPE web_scraper_{name} {metric_type}")
+
+        family("run_wall_seconds", "Wall time of the run.", "gauge")
+        lines.append(f"web_scraper_run_wall_seconds {metrics["wall_seconds"]}")
+        family("run_cpu_seconds", "CPU time of the run.", "gauge")
+        lines.append(f"web_scraper_run_cpu_seconds {metrics["cpu_seconds"]}")
+
+        for key, help_text in (
+                ("wall_seconds", "Wall time spent in a stage."),
+                ("cpu_seconds", "CPU time spent in a stage."),
+                ("count", "Number of times a stage ran.")):
+            family(f"stage_{key}", help_text, "gauge")
+            for site_name, site in metrics["sites"].items():
+                for stage_name, timing in site["stages"].items():
+                    lines.append(
+                        f"web_scraper_stage_{key}{{site={_label(site_name)},"
+                        f"stage={_label(stage_name)}}} {timing[key]}")
+
+        counter_names: set[str] = {
+            counter for site in metrics["sites"].values()
+            for counter in site["counters"]}
+        for counter in sorted(counter_names):
+            family(f"{counter}_total", f"Number of {counter}.", "counter")
+            for site_name, site in metrics["sites"].items():
+                if counter in site["counters"]:
+                    lines.append(
+                        f"web_scraper_{counter}_total"
+                        f"{{site={_label(site_name)}}} "
+                        f"{site["counters"][counter]}")
+
+        family("errors_total", "Number of errors by type.", "counter")
+        for site_name, site in metrics["sites"].items():
+            for type_name, num_errors in site["errors"].items():
+                lines.append(
+                    f"web_scraper_errors_total{{site={_label(site_name)},"
+                    f"type={_label(type_name)}}} {num_errors}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, file_path: str) -> None:
+        """Writes every metric out to a JSON file."""
+        _replace(file_path, codec.dumps(self.to_dict()))
+
+    def write_prometheus(self, file_path: str) -> None:
+        """Writes every metric out to a Prometheus textfile.
+
+        The file is replaced at once, so a collector never reads half of it.
+        """
+        _replace(file_path, self.to_prometheus().encode("utf-8"))
+
+
+def _label(value: str) -> str:
+    """Returns a quoted, escaped Prometheus label value."""
+    escaped: str = (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+    return f'"{escaped}"'
+
+
+def _replace(file_path: str, data: bytes) -> None:
+    """Writes a file out through a temporary file which then replaces it."""
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(f"{file_path}.tmp", "wb") as file:
+        file.write(data)
+    os.replace(f"{file_path}.tmp", file_path)
+
+
+_run_metrics: RunMetrics | None = None
+
+
+def get_run_metrics() -> RunMetrics:
+    """Returns the metrics of the current run, starting them if need be."""
+    global _run_metrics
+    if _run_metrics is None:
+        _run_metrics = RunMetrics()
+    return _run_metrics
+
+
+def metrics_path(log_path: str) -> str:
+    """Returns the path of the metrics JSON written next to a run's log."""
+    return f"{os.path.splitext(log_path)[0]}.metrics.json"
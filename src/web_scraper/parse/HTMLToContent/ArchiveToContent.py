@@ -5,7 +5,6 @@ import os
 import re
 
 from bs4 import BeautifulSoup, Tag
-from htmldate import find_date  # Used for finding date published and date updated
 from datetime import datetime
 
 from .exceptions import *
@@ -252,6 +251,10 @@ class ArchiveToContent:
             BoardNameAndTitleNotFoundError: If a board name/title isn't found.
         """
         self.logger.debug("Searching for publish and update dates")
+        # Imported here rather than with the module, as htmldate is slow to
+        # import and only needed once a thread is parsed
+        from htmldate import find_date
+
         html = str(self.thread_soup)  # Retrieves HTML from soup object
         # Uses htmldate lib to find original and update dates
         date_published = find_date(
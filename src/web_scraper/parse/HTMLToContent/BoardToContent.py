@@ -18,11 +18,6 @@ class BoardToContent:
         self.site_dir_path: str = site_dir_path
         thread_id: str = str(self.thread.id)
 
-        # Pathing:
-        thread_dir: str = os.path.join(self.site_dir_path, thread_id)
-        thread_snapshot_path: str = os.path.join(thread_dir, self.scrape_time)
-        os.makedirs(thread_snapshot_path, exist_ok=True)
-
         # Data:
         board_name = str(self.thread._board)
         board_name = re.sub('[<>]', '', board_name)
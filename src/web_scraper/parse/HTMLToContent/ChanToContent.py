@@ -5,7 +5,6 @@ import os
 import re
 
 from bs4 import BeautifulSoup, Tag
-from htmldate import find_date  # Used for finding date published and date updated
 from datetime import datetime
 
 from .exceptions import *
@@ -35,6 +34,10 @@ class ChanToContent:
     TODO: Add tripcode collection functionality
     """
 
+    # Bump whenever a change to this class changes the data it extracts, so
+    # the Reparser knows previously reparsed snapshots need reparsing again
+    PARSER_VERSION: str = "1"
+
     def __init__(
         self,
         date_scraped: str,
@@ -116,7 +119,7 @@ class ChanToContent:
                     self.get_date_published_and_updated()[
                         "date_updated"])
             except DateNotFoundError as error:
-                logger.error(f"Error when trying to initialize: {error}")
+                logger.error("Error when trying to initialize: %s", error)
                 logger.error(
                     "Date published will be set to OP post date; "
                     "date updated will be set to last reply's post date")
@@ -146,15 +149,15 @@ class ChanToContent:
             self.data: dict = self.collect_all_data()
 
         except Exception as error:
-            logger.error(f"Error when trying to initialize: {error}")
+            logger.error("Error when trying to initialize: %s", error)
             raise ContentInitError(
                 f"Error when trying to initialize: {error}"
             ) from error
         # End of initialization
         logger.info(
             "Successfully extracted and collected all content data from the "
-            f"snapshot of thread {self.thread_id}"
-        )
+            "snapshot of thread %s",
+            self.thread_id)
 
     def get_board_name_and_thread_title(self) -> dict:
         """Extracts a board name/title from the initialized soup object.
@@ -190,8 +193,7 @@ class ChanToContent:
                 board = board_and_title[0]
                 title = board_and_title[1]
                 logger.debug(
-                    "Board and title successfully found:" f"{board}, {title}"
-                )
+                    "Board and title successfully found:%s, %s", board, title)
 
                 return {"board": board, "title": title}
             else:
@@ -218,7 +220,7 @@ class ChanToContent:
         try:
             thread_id = self.thread_soup.find(class_="intro").get("id")
         except Exception as error:
-            logger.error(f"Thread ID unable to be located: {error}")
+            logger.error("Thread ID unable to be located: %s", error)
             raise TagNotFoundError(f"Thread ID unable to be located: {error}")
         if thread_id is None:
             try:
@@ -229,7 +231,7 @@ class ChanToContent:
                     .replace("post_no_", "")
                     .replace("op_", "")
                 )
-                logger.debug(f"ID successfully found: {thread_id}")
+                logger.debug("ID successfully found: %s", thread_id)
 
                 return thread_id
             except:
@@ -243,10 +245,10 @@ class ChanToContent:
                     
                     return thread_id
                 except Exception as error:
-                    logger.error(f"Thread ID unable to be located: {error}")
+                    logger.error("Thread ID unable to be located: %s", error)
                     raise TagNotFoundError(f"Thread ID unable to be located {error}")
         else:
-            logger.debug(f"ID successfully found: {thread_id}")
+            logger.debug("ID successfully found: %s", thread_id)
             # TODO: The thread_id for wizchan content kept having op_ pop up 
             # in them, (i.e op_12345) added that to a replace, but in the 
             # future we could look into regex or looping through a dict 
@@ -268,6 +270,10 @@ class ChanToContent:
             BoardNameAndTitleNotFoundError: If a board name/title isn't found.
         """
         logger.debug("Searching for publish and update dates")
+        # Imported here rather than with the module, as htmldate is slow to
+        # import and only needed once a thread is parsed
+        from htmldate import find_date
+
         html = str(self.thread_soup)  # Retrieves HTML from soup object
         # Uses htmldate lib to find original and update dates
         date_published = find_date(
@@ -289,9 +295,8 @@ class ChanToContent:
             logger.error("Date updated not found.")
             raise DateNotFoundError("Date updated not found.")
         logger.debug(
-            "Date published and date updated successfully "
-            f"found: {date_published}, {date_updated}"
-        )
+            "Date published and date updated successfully found: %s, %s",
+            date_published, date_updated)
 
         return {
             "date_published": date_published, 
@@ -319,7 +324,7 @@ class ChanToContent:
 
                 return original_post
         except Exception as error:
-            logger.error(f"Original post not found: {error}")
+            logger.error("Original post not found: %s", error)
             raise TagNotFoundError(f"Original post not found: {error}")
 
     def get_reply_posts(self) -> list[Tag]:
@@ -342,12 +347,11 @@ class ChanToContent:
                 logger.debug("No reply post(s) found")
             else:
                 logger.debug(
-                    f"Reply post(s) successfully found: {len(reply_posts)}"
-                )
+                    "Reply post(s) successfully found: %s", len(reply_posts))
 
                 return reply_posts
         except Exception as error:
-            logger.error(f"Reply post(s) not found: {error}")
+            logger.error("Reply post(s) not found: %s", error)
             raise TagNotFoundError(f"Reply post(s) not found: {error}")
 
     def get_original_post_data(self, original_post: Tag) -> dict:
@@ -409,7 +413,7 @@ class ChanToContent:
 
             return original_post_data
         except Exception as error:
-            logger.error(f"Error in post data: {error}")
+            logger.error("Error in post data: %s", error)
             raise DataArrangementError(f"Error in post data: {error}")
 
     def get_reply_post_data(self, reply_post: Tag) -> dict:
@@ -467,7 +471,7 @@ class ChanToContent:
 
             return reply_post_data
         except Exception as error:
-            logger.error(f"Error in post data: {error}")
+            logger.error("Error in post data: %s", error)
             raise DataArrangementError(f"Error in post data: {error}")
 
     def get_post_date(self, post_tag: Tag) -> str:
@@ -499,11 +503,11 @@ class ChanToContent:
                 # Formats object to be more uniform
                 date_formatted = date_datetime.strftime("%Y-%m-%dT%H:%M:%S")
                 logger.debug(
-                    f"Post date successfully found: {date_formatted}")
+                    "Post date successfully found: %s", date_formatted)
 
                 return date_formatted
         except Exception as error:
-            logger.error(f"Post date not found: {error}")
+            logger.error("Post date not found: %s", error)
             raise TagNotFoundError(f"Post date not found: {error}")
 
     def get_post_id(self, post_tag: Tag) -> str:
@@ -543,11 +547,11 @@ class ChanToContent:
 
                     return post_id
             else:
-                logger.debug(f"Post ID successfully found: {post_id}")
+                logger.debug("Post ID successfully found: %s", post_id)
 
                 return post_id
         except Exception as error:
-            logger.error(f"Post ID not found: {error}")
+            logger.error("Post ID not found: %s", error)
             raise TagNotFoundError(f"Post ID not found: {error}")
 
     def get_post_content(self, post_tag: Tag) -> str:
@@ -582,7 +586,7 @@ class ChanToContent:
 
                 return post_text
         except Exception as error:
-            logger.error(f"Post content not found: {error}")
+            logger.error("Post content not found: %s", error)
             raise TagNotFoundError(f"Post content not found: {error}")
 
     def get_post_image_links(self, post_tag: Tag) -> list[str]:
@@ -620,14 +624,12 @@ class ChanToContent:
                 if image_source:
                     image_links.append(f"{self.root_domain}{image_source}")
                     logger.debug(
-                        "Image link within post successfully found: "
-                        f"{self.root_domain}{image_source}"
-                    )
+                        "Image link within post successfully found: %s%s",
+                        self.root_domain, image_source)
 
             return image_links
         except Exception as error:
-            logger.error(
-                f"Unexpected error when collecting images: {error}")
+            logger.error("Unexpected error when collecting images: %s", error)
             raise Exception(
                 f"Unexpected error when collecting images: {error}")
 
@@ -657,8 +659,9 @@ class ChanToContent:
             )
             if thread_tag is None:
                 logger.warning(
-                    f"Thread tag with ID 'thread_{self.thread_id}' not found."
-                    " No thread image link available.")
+                    "Thread tag with ID 'thread_%s' not found. No thread "
+                    "image link available.",
+                    self.thread_id)
                 return ""
 
             # Find the first image within the thread_tag
@@ -679,7 +682,7 @@ class ChanToContent:
 
                 return image_link
         except Exception as error:
-            logger.error(f"Thread image link not found: {error}")
+            logger.error("Thread image link not found: %s", error)
             raise TagNotFoundError(f"Thread image link not found: {error}")
 
     def get_post_username(self, post_tag: Tag) -> str:
@@ -705,7 +708,7 @@ class ChanToContent:
 
                 return formatted_post_username
         except Exception as error:
-            logger.error(f"Post username not found: {error}")
+            logger.error("Post username not found: %s", error)
             raise TagNotFoundError(f"Post username not found: {error}")
 
     def get_post_replied_to_ids(self, post_tag: Tag) -> list[str]:
@@ -739,8 +742,7 @@ class ChanToContent:
             return post_links
         except Exception as error:
             logger.error(
-                f"Unexpected error when extracting replied-to IDs: {error}"
-            )
+                "Unexpected error when extracting replied-to IDs: %s", error)
             raise Exception(
                 f"Unexpected error when extracting replied-to IDs: {error}")
         
@@ -883,7 +885,7 @@ class ChanToContent:
             return all_snapshot_data
         except Exception as error:
             logger.error(
-                f"Error during final collection of thread data: {error}")
+                "Error during final collection of thread data: %s", error)
             raise DataArrangementError(
                 f"Error during final collection of thread data: {error}"
             )
@@ -6,6 +6,10 @@ logger = logging.getLogger(__name__)
 
 
 class SourceToContent:
+    # Bump whenever a change to this class changes the data it extracts, so
+    # the Reparser knows previously reparsed snapshots need reparsing again
+    PARSER_VERSION: str = "1"
+
     def __init__(self, board_name, source_json: dict, scan_time_str):
         """Reparses thread data from a 4chan API JSON."""
         logger.info(f"Accessing API data.")
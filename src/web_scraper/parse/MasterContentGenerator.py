@@ -1,8 +1,10 @@
 # Imports
-import json
 import logging
 import os
 
+from . import codec
+from .snapshot_delta import is_delta
+
 logger = logging.getLogger(__name__)
 
 class MasterContentGenerator:
@@ -34,6 +36,9 @@ class MasterContentGenerator:
             # Establishes sets for all post ids and lost post ids
             self.all_post_ids: set = set()
 
+            # Posts first seen in the latest snapshot
+            self.new_posts: list[dict] = []
+
             # Populates master thread content with data
             self.master_contents = {
                 "thread_id": "",
@@ -56,9 +61,7 @@ class MasterContentGenerator:
             for i, snapshot_content_path in enumerate(
                 self.list_of_content_paths):
                 logger.debug(f"Snapshot path: {snapshot_content_path}")
-                with open(snapshot_content_path, "r") as file:
-                    data = json.load(file)
-                snapshot_content = data
+                snapshot_content = codec.load(snapshot_content_path)
                 # General board/thread info
                 if i == 0:
                     thread_id: str = snapshot_content["thread_id"]
@@ -93,9 +96,20 @@ class MasterContentGenerator:
                 # run into KeyErrors for the call below (if the passed
                 # data is outdated)
 
-                replies: dict = snapshot_content["replies"]
+                # Delta snapshots only hold new and changed replies, which
+                # is all that's needed to update the master
+                replies: dict
+                if is_delta(snapshot_content):
+                    replies = {
+                        **snapshot_content["added_posts"],
+                        **snapshot_content["changed_posts"]}
+                else:
+                    replies = snapshot_content["replies"]
                 logger.debug(f"Replies retrieved.")
 
+                if i == len(self.list_of_content_paths) - 1:
+                    self.new_posts = self._find_new_posts(
+                        original_post, replies)
                 self._gather_all_post_ids(original_post, replies)
                 logger.debug(f"All post ids gathered from snapshot.")
 
@@ -161,6 +175,18 @@ class MasterContentGenerator:
             logger.error(f"Error when gathering IDs: {error}")
             raise Exception(f"Error when gathering IDs: {error}")
 
+    def _find_new_posts(self, original_post: dict, replies: dict) -> list:
+        """Returns the passed posts whose IDs haven't been gathered yet.
+
+        Args:
+            original_post (dict): Dictionary containing the original post.
+            replies (dict): Dictionary containing all replies.
+        """
+        posts: list[dict] = [original_post, *replies.values()]
+        return [
+            post for post in posts
+            if post.get("post_id") not in self.all_post_ids]
+
     def content_dump(self) -> None:
         """Dumps master contents into a JSON file."""
         try:
@@ -179,9 +205,7 @@ class MasterContentGenerator:
             self.master_content_filepath = os.path.join(
                 thread_folder_path, file_name)
 
-            with open(
-                self.master_content_filepath, "w", encoding="utf-8") as file:
-                    json.dump(contents, file, indent=2, ensure_ascii=False)
+            codec.dump(contents, self.master_content_filepath)
         except Exception as error:
             logging.error(f"Error when dumping master content: {error}")
             raise Exception(f"Error when dumping master content: {error}")
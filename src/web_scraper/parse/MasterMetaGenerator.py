@@ -1,8 +1,10 @@
 from datetime import datetime
-import json
 import logging
 import os
 
+from . import codec
+from .SnapshotDeduplicator import load_hash_record
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,10 +63,19 @@ class MasterMetaGenerator:
         thread_folder_path = os.path.dirname(self.snapshot_folder_path)
         self.master_meta_filepath = os.path.join(thread_folder_path, file_name)
 
-        with open(self.master_meta_filepath, "w", encoding="utf-8") as f:
-            json.dump(master_meta, f, indent=2, ensure_ascii=False)
+        # Scans which found the thread unchanged don't have a snapshot meta,
+        # and whether the thread's been archived is only known to its record
+        record: dict = load_hash_record(
+            os.path.join(thread_folder_path, f"snapshot_hash_{thread_id}.json"))
+        master_meta["seen_unchanged_dates"] = record.get(
+            "seen_unchanged_dates", [])
+        master_meta["archived"] = "date_archived" in record
+        master_meta["date_archived"] = record.get("date_archived")
+
+        codec.dump(master_meta, self.master_meta_filepath)
 
-        logger.info(f"Master metadata for thread {thread_id} has been updated.")
+        logger.info(
+            "Master metadata for thread %s has been updated.", thread_id)
 
     def get_path(self) -> str:
         """Retrieves master meta filepath; currently unused."""
@@ -73,9 +84,7 @@ class MasterMetaGenerator:
     def find_recent_word_count(self) -> int:
         """Finds word count from the most recent snapshot."""
         most_recent_snapshot = max(self.list_of_meta_paths, key=os.path.getmtime)
-        with open(most_recent_snapshot, "r") as file:
-                data = json.load(file)
-        snapshot_meta = data
+        snapshot_meta = codec.load(most_recent_snapshot)
         num_words_most_recent: int = int(snapshot_meta["num_all_words"])
         return num_words_most_recent
 
@@ -101,9 +110,7 @@ class MasterMetaGenerator:
         num_lost_post_ids = 0
 
         for i, snapshot_meta_path in enumerate(self.list_of_meta_paths):
-            with open(snapshot_meta_path, "r") as file:
-                data = json.load(file)
-            snapshot_meta = data
+            snapshot_meta = codec.load(snapshot_meta_path)
 
             # General board/thread info
             if i == 0:
@@ -121,38 +128,38 @@ class MasterMetaGenerator:
 
             # Aggregate sets
             logger.debug(
-                f"Updated master all_update_dates with {snapshot_meta["date_updated"]} from: {snapshot_meta_path}"
-            )
+                "Updated master all_update_dates with %s from: %s",
+                snapshot_meta["date_updated"], snapshot_meta_path)
             # All post IDs:
             self.master_metadata["unique_post_ids"].update(
                 snapshot_meta["all_post_ids"]
             )
             logger.debug(
-                f"Updated master unique_post_ids to {snapshot_meta["all_post_ids"]} from: {snapshot_meta_path}"
-            )
+                "Updated master unique_post_ids to %s from: %s",
+                snapshot_meta["all_post_ids"], snapshot_meta_path)
             # Finds lost IDs & updates master
             lost_post_ids: set = set(self.find_lost_ids(snapshot_meta))
             self.master_metadata["lost_post_ids"].update(lost_post_ids)
             num_lost_post_ids += len(lost_post_ids)
             logger.debug(
-                f"Updated master lost_post_ids with {lost_post_ids} from: {snapshot_meta_path}"
-            )
+                "Updated master lost_post_ids with %s from: %s",
+                lost_post_ids, snapshot_meta_path)
 
             # All post dates:
             self.master_metadata["all_post_dates"].update(
                 snapshot_meta["all_post_dates"]
             )
             logger.debug(
-                f"Updated master all_post_dates with {snapshot_meta["all_post_dates"]} from: {snapshot_meta_path}"
-            )
+                "Updated master all_post_dates with %s from: %s",
+                snapshot_meta["all_post_dates"], snapshot_meta_path)
 
             # All update dates:
             self.master_metadata["all_update_dates"].update(
                 [snapshot_date_updated]
             )
             logger.debug(
-                f"Updated master all_post_dates with {snapshot_date_updated} from: {snapshot_meta_path}"
-            )
+                "Updated master all_post_dates with %s from: %s",
+                snapshot_date_updated, snapshot_meta_path)
 
 
             # All scrape dates:
@@ -160,16 +167,17 @@ class MasterMetaGenerator:
                 ([snapshot_date_scraped])
             )
             logger.debug(
-                f"Updated master all_scrape_dates with {snapshot_date_scraped} from: {snapshot_meta_path}"
-            )
+                "Updated master all_scrape_dates with %s from: %s",
+                snapshot_date_scraped, snapshot_meta_path)
 
             # Update snapshot history:
             self.master_metadata["snapshot_history"].update(
                 {snapshot_date_scraped: snapshot_meta["all_post_ids"]}
             )
             logger.debug(
-                f"Updated master snapshot_history with { {snapshot_date_scraped: snapshot_meta["all_post_ids"]}} from: {snapshot_meta_path}"
-            )
+                "Updated master snapshot_history with %s from: %s",
+                {snapshot_date_scraped: snapshot_meta["all_post_ids"]},
+                snapshot_meta_path)
 
             # Convert snapshot dates to datetime objs for comparison
             snapshot_updated_datetime_obj = datetime.strptime(
@@ -192,16 +200,16 @@ class MasterMetaGenerator:
                     "date_updated"
                 ]
                 logger.debug(
-                    f"Updated master most_recent_update_date to {snapshot_date_updated} from: {snapshot_meta_path}"
-                )
+                    "Updated master most_recent_update_date to %s from: %s",
+                    snapshot_date_updated, snapshot_meta_path)
 
             if snapshot_scraped_datetime_obj > master_scraped_datetime_obj:
                 self.master_metadata["most_recent_scrape_date"] = snapshot_meta[
                     "date_scraped"
                 ]
                 logger.debug(
-                    f"Updated master most_recent_scrape_date to {snapshot_date_scraped} from: {snapshot_meta_path}"
-                )
+                    "Updated master most_recent_scrape_date to %s from: %s",
+                    snapshot_date_scraped, snapshot_meta_path)
 
                 # Adds # of snapshot ids to # of total post IDs (allows for overcounting)
                 num_aggregate_post_ids += snapshot_meta["num_all_post_ids"]
@@ -213,8 +221,8 @@ class MasterMetaGenerator:
                 )
                 self.master_metadata["num_unique_post_ids"] = latest_post_count
                 logger.debug(
-                    f"Updated master num_unique_post_ids to {latest_post_count} from: {snapshot_meta_path}"
-                )
+                    "Updated master num_unique_post_ids to %s from: %s",
+                    latest_post_count, snapshot_meta_path)
 
                 # Word count:
                 latest_num_count: int = max(
@@ -223,19 +231,18 @@ class MasterMetaGenerator:
                 )
                 self.master_metadata["num_aggregate_words"] = latest_num_count
                 logger.debug(
-                    f"Updated master num_aggregate_words to {latest_num_count} from: {snapshot_meta_path}"
-                )
+                    "Updated master num_aggregate_words to %s from: %s",
+                    latest_num_count, snapshot_meta_path)
 
             # Updates count after iterating through all snapshot metas
             self.master_metadata["num_aggregate_post_ids"] = num_aggregate_post_ids
             logger.debug(
-                f"Updated master num_aggregate_post_ids to {num_aggregate_post_ids}"
-            )
+                "Updated master num_aggregate_post_ids to %s",
+                num_aggregate_post_ids)
 
             self.master_metadata["num_lost_post_ids"] = num_lost_post_ids
             logger.debug(
-                f"Updated master num_lost_post_ids to {num_lost_post_ids}"
-            )
+                "Updated master num_lost_post_ids to %s", num_lost_post_ids)
 
         #Convert sets to lists:
         self.master_metadata ["all_post_dates"] =  list(self.master_metadata ["all_post_dates"])
@@ -1,11 +1,12 @@
 # Imports
-import json
 import logging
 import os
 import textwrap  # Used for indentation
 
 from datetime import datetime
 
+from . import codec
+
 class MasterTextGenerator:
     """Given a master content JSON, a human-readable file is made.
     
@@ -42,8 +43,7 @@ class MasterTextGenerator:
 
         try:
             # Load master content data
-            with open(master_content_path, "r") as file:
-                data = json.load(file)
+            data = codec.load(master_content_path)
             self.content = data
             # Paths
             thread_id = self.content["thread_id"]
@@ -68,7 +68,9 @@ class MasterTextGenerator:
         # Open and write to text file
         separator: str = "\n\n<*><*><*><*><*><*><*><*><*>\n"
         try:
-            with open(self.master_text_path, "w") as master_text:
+            # Written to a temporary file which then replaces the text
+            # file, so hardlinked portions of it keep their text
+            with open(f"{self.master_text_path}.tmp", "w") as master_text:
                 # ~~ Thread ID header ~~
                 master_text.write(
                     f"Thread ID: {self.content["thread_id"]}")
@@ -159,6 +161,7 @@ class MasterTextGenerator:
                     master_text.write(separator)
                 # End
                 master_text.write("\nEND.")
+            os.replace(f"{self.master_text_path}.tmp", self.master_text_path)
 
         except Exception as error:
             self.logger.error(f"Error writing text: {error}")
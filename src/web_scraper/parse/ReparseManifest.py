@@ -0,0 +1,143 @@
+# Imports
+import hashlib
+import logging
+import os
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+
+class ReparseManifest:
+    """Tracks which snapshots of a thread need to be reparsed.
+
+    For every snapshot input file (a `thread_*.html` or `source_*.json`) that
+    has been reparsed, the manifest records a hash of the input, the version
+    of the parser used, and hashes of the files generated from it (snapshot
+    content and meta). A snapshot only needs to be reparsed again if its input
+    or the parser version changed, or if a generated file was changed or
+    removed since.
+
+    Every file's size and modification time are recorded alongside its hash,
+    so a file only needs to be rehashed if those changed.
+
+    The manifest is saved in the thread folder as `reparse_manifest.json`.
+
+    Attributes:
+        manifest_path (str): Path to the thread's manifest.
+        snapshots (dict): Manifest entries, keyed by input path relative to
+            the thread folder.
+    """
+
+    FILE_NAME: str = "reparse_manifest.json"
+
+    def __init__(self, thread_folder_path: str):
+        """Loads a thread's reparse manifest, if one exists.
+
+        Args:
+            thread_folder_path (str): Path to the thread folder.
+        """
+        self.thread_folder_path: str = thread_folder_path
+        self.manifest_path: str = os.path.join(
+            thread_folder_path, self.FILE_NAME)
+        self.snapshots: dict = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                self.snapshots = codec.load(self.manifest_path)["snapshots"]
+            except (*codec.DecodeError, KeyError) as error:
+                logger.warning(
+                    f"Ignoring unreadable manifest {self.manifest_path}: "
+                    f"{error}")
+
+    def is_current(self, input_path: str, parser_version: str) -> bool:
+        """Returns True if a snapshot doesn't need to be reparsed.
+
+        Args:
+            input_path (str): Path to the snapshot's HTML/source JSON.
+            parser_version (str): Version of the parser that would be used.
+        """
+        entry: dict | None = self.snapshots.get(self._key(input_path))
+        if entry is None or entry["parser_version"] != parser_version:
+            return False
+        if not _file_matches(input_path, entry["input"]):
+            return False
+        return all(
+            _file_matches(
+                os.path.join(self.thread_folder_path, output_key),
+                file_record)
+            for output_key, file_record in entry["outputs"].items())
+
+    def record(
+            self, input_path: str, parser_version: str,
+            output_paths: list[str]) -> None:
+        """Records a snapshot as reparsed.
+
+        Args:
+            input_path (str): Path to the snapshot's HTML/source JSON.
+            parser_version (str): Version of the parser used.
+            output_paths (list[str]): Paths of the files generated from it.
+        """
+        self.snapshots[self._key(input_path)] = {
+            "parser_version": parser_version,
+            "input": _file_record(input_path),
+            "outputs": {
+                self._key(output_path): _file_record(output_path)
+                for output_path in output_paths},
+        }
+
+    def refresh_outputs(self) -> None:
+        """Rerecords every generated file, after they were rewritten.
+
+        E.g. after a thread's snapshot content is converted to deltas.
+        """
+        for entry in self.snapshots.values():
+            for output_key in entry["outputs"]:
+                output_path: str = os.path.join(
+                    self.thread_folder_path, output_key)
+                if os.path.exists(output_path):
+                    entry["outputs"][output_key] = _file_record(output_path)
+
+    def save(self) -> None:
+        """Writes the manifest out to the thread folder."""
+        codec.dump(
+            {"snapshots": self.snapshots}, self.manifest_path,
+            machine_only=True)
+
+    def _key(self, path: str) -> str:
+        """Returns a path relative to the thread folder."""
+        return os.path.relpath(path, self.thread_folder_path)
+
+
+def hash_file(file_path: str) -> str:
+    """Returns the SHA-256 hash of a file's contents."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _file_record(file_path: str) -> dict:
+    """Returns the hash, size and modification time of a file."""
+    stat: os.stat_result = os.stat(file_path)
+    return {
+        "hash": hash_file(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def _file_matches(file_path: str, file_record: dict) -> bool:
+    """Returns True if a file still matches its recorded hash.
+
+    The file is only rehashed if its modification time changed.
+    """
+    try:
+        stat: os.stat_result = os.stat(file_path)
+    except FileNotFoundError:
+        return False
+    if stat.st_size != file_record["size"]:
+        return False
+    if stat.st_mtime_ns == file_record["mtime_ns"]:
+        return True
+    return hash_file(file_path) == file_record["hash"]
@@ -6,16 +6,30 @@ import logging
 import os
 import sys
 
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+
 from bs4 import BeautifulSoup
 
 # Imports if running through terminal
 from ..write_out import *
-from . import MasterTextGenerator
+from ..metrics import (
+    REPARSE, SKIPPED_THREADS, THREADS, get_run_metrics, metrics_path)
+from ..profiling import profile_run, profile_thread
+from ..log_setup import configure_logging, set_log_context
+from ..memtrace import (
+    REPARSE_THREAD, get_memory_tracer, memtrace_path, start_memtrace, traced)
+from .MasterTextGenerator import MasterTextGenerator
+from . import codec
 from .HTMLToContent.ChanToContent import ChanToContent
 from .JSONToContent.SourceToContent import SourceToContent
+from .SnapshotDeduplicator import SnapshotDeduplicator
 from .SnapshotMetaGenerator import SnapshotMetaGenerator
+from .snapshot_delta import convert_thread, load_full_content
 from .MasterContentGenerator import MasterContentGenerator
 from .MasterMetaGenerator import MasterMetaGenerator
+from .ReparseManifest import ReparseManifest
+from .SiteIndex import open_site_index
 
 # Imports if running debugger
 # from web_scraper.write_out import *
@@ -28,28 +42,28 @@ from .MasterMetaGenerator import MasterMetaGenerator
 
 
 scan_time_str = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")  # ISO format
+log_path = f"./data/logs/{scan_time_str}.log"
 
-log_dir = Path("./data/logs")
-log_dir.mkdir(parents=True, exist_ok=True)
-
-# Root logger config
-logging.basicConfig(
-    filename=(f"./data/logs/{scan_time_str}.log"),
-    filemode="w",
-    format=("%(asctime)s %(levelname)s : %(message)s"),
-    datefmt="%Y-%m-%dT%H:%M:%S",
-    style="%",
-    level=logging.INFO,  # We can make a lot of the spam-y logs DEBUG
-)
-logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
 logger = logging.getLogger(__name__)
-logger.info("Root logger configured")
 
 
 class Reparser:
-    def __init__(self):
-        """Reparses data within data subfolder"""
-        pass
+    def __init__(
+            self, jobs: int = 1, force: bool = False,
+            masters_only: bool = False):
+        """Reparses data within data subfolder
+
+        Args:
+            jobs (int): Number of worker processes to reparse threads across.
+            force (bool): Reparse every snapshot, even if its thread's reparse
+                manifest shows neither its input nor the parser has changed.
+            masters_only (bool): Don't reparse any snapshots; only rebuild
+                each thread's master content, text and meta from its existing
+                snapshot content and meta files.
+        """
+        self.jobs: int = jobs
+        self.force: bool = force
+        self.masters_only: bool = masters_only
 
     def regenerate_masters(self, thread_folder_path: str, params: dict) -> None:
         """Regenerates master_content and master_meta files
@@ -58,13 +72,11 @@ class Reparser:
             params (dict): Parameters, used in master_text_generation
         """
 
+        site_index = open_site_index(os.path.dirname(thread_folder_path))
+
         # Find all of thread's content JSONs
-        candidate_content_files = os.path.join(
-            thread_folder_path, "**", "content_*.json"
-        )
-        list_of_content_paths: list[str] = list(
-            glob.glob(candidate_content_files, recursive=True)
-        )
+        list_of_content_paths: list[str] = site_index.content_paths(
+            thread_folder_path)
 
         # Regenerate thread's master content
         master_content_generator = MasterContentGenerator(list_of_content_paths)
@@ -85,16 +97,29 @@ class Reparser:
         logger.info(f"+ MASTER CONTENT GENERATED FOR PATH {thread_folder_path} +")
 
         # Find all of thread's meta JSONs
-        candidate_meta_files = os.path.join(thread_folder_path, "**", "meta_*.json")
-        list_of_meta_paths: list[str] = list(
-            glob.glob(candidate_meta_files, recursive=True)
-        )
+        list_of_meta_paths: list[str] = site_index.meta_paths(
+            thread_folder_path)
 
         # Regenerate thread's master meta
         master_meta_generator = MasterMetaGenerator(list_of_meta_paths)
         master_meta_generator.master_meta_dump()
         logger.info(
             f"+ MASTER META GENERATED FOR PATH {thread_folder_path} +")  # Log message
+        site_index.record_thread(
+            master_meta_generator.get_path(),
+            master_meta_generator.master_metadata,
+            master_content_generator.get_path(),
+            master_text_generator.master_text_path)
+
+        # Refresh the snapshot hash so the next scrape compares against the
+        # reparsed content of the most recent snapshot
+        latest_content_path: str = max(
+            list_of_content_paths,
+            key=lambda path: os.path.basename(os.path.dirname(path)))
+        latest_content: dict = load_full_content(latest_content_path)
+        deduplicator = SnapshotDeduplicator(thread_folder_path, latest_content)
+        deduplicator.record_hash(
+            os.path.basename(os.path.dirname(latest_content_path)))
 
     def generate_content(
         self, html: str, site_name: str, scan_time: str, params: dict
@@ -170,152 +195,362 @@ class Reparser:
         )
         return content_filepath
 
-    def reparse_site(self, site_search):
-        """Processes existing files present within a site's data subfolder."""
-        try:
-            # Param retrieval
-            params_file_list = glob.glob(f"./data/params/{site_search}*.json")
-            params_path = params_file_list[0]
-            with open(params_path, "r") as params_file:
-                params = json.load(params_file)
+    def reparse_site(self, site_search) -> dict | None:
+        """Processes existing files present within a site's data subfolder.
+
+        Returns:
+            A summary of the reparse (see `reparse_thread_folders()`), or None
+            if the site's parameters or data folder couldn't be found.
+        """
+        params: dict | None = self._load_params(site_search)
+        if params is None:
+            return None
+
+        logger.info(
+            f"+++ REPARSING EXISTING THREADS "
+            f"ASSOCIATED WITH {params["site_name"]} +++")  # Log message
+        return self.reparse_thread_folders(params, fourchan=False)
 
-            # Pathing
-            site_name: str = params["site_name"]
-            site_directory = f"./data/{site_name}"
+    def reparse_thread(self, thread_folder_path: str, params: dict) -> bool:
+        """Reparses every HTML snapshot in a thread folder, then its masters.
 
-            html_pattern = "*.html"  # Look for an html file
+        Args:
+            thread_folder_path (str): Path to the thread folder.
+            params (dict): Parameters of the site the thread belongs to.
+
+        Snapshots whose HTML and parser version are unchanged since they were
+        last reparsed (according to the thread's reparse manifest) are
+        skipped, and masters are only regenerated if a snapshot was reparsed.
+
+        Returns:
+            True if the thread had HTML snapshots that needed reparsing.
+        """
+        site_name: str = params["site_name"]
+        site_index = open_site_index(os.path.dirname(thread_folder_path))
+        matching_html_files: list[str] = site_index.html_paths(
+            thread_folder_path)
+
+        manifest = ReparseManifest(thread_folder_path)
+        if not self.force:
+            matching_html_files = [
+                html_file_path for html_file_path in matching_html_files
+                if not manifest.is_current(
+                    html_file_path, ChanToContent.PARSER_VERSION)]
+
+        if len(matching_html_files) == 0:
+            return False
+
+        # Reparse all snapshots to fit new format
+        logger.info(
+            f"++ REPARSING {len(matching_html_files)} HTML "
+            f"FILES IN {thread_folder_path} ++")
+
+        for html_file_path in matching_html_files:
+            html_dir_name: str = os.path.dirname(html_file_path)
+            html_scan_time: str = os.path.basename(
+                html_dir_name
+            )  # assumption that html is stored in a scan_time subfolder
+            with open(html_file_path, "r", encoding="utf-8") as f:
+                html_content = f.read()
+
+            # Generate content and then pass to SnapshotMetaGenerator
+            content_path: str = self.generate_content(
+                html_content, site_name, html_scan_time, params
+            )
             logger.info(
-                f"+++ REPARSING EXISTING THREADS "
-                f"ASSOCIATED WITH {site_name} +++")  # Log message
-
-            for thread_folder in os.listdir(site_directory):
-                thread_folder_path = os.path.join(site_directory, thread_folder)
-
-                # If the thread folder is a directory, find its .html and 
-                # meta file and use that to reprocess the thread.
-                if os.path.isdir(thread_folder_path):
-                    html_search_path = os.path.join(
-                        thread_folder_path, "**", html_pattern
-                    )
-
-                    matching_html_files = glob.glob(html_search_path, recursive=True)
-
-                    if len(matching_html_files) > 0:
-                        # Reparse all snapshots to fit new format
-                        logger.info(
-                            f"++ REPARSING {len(matching_html_files)} HTML "
-                            f"FILES IN {thread_folder_path} ++")
-                        
-                        for html_file_path in matching_html_files:
-                            html_dir_name: str = os.path.dirname(html_file_path)
-                            html_scan_time: str = os.path.basename(
-                                html_dir_name
-                            )  # assumption that html is stored in a scan_time subfolder
-                            with open(html_file_path, "r", encoding="utf-8") as f:
-                                html_content = f.read()
-
-                            # Generate content and then pass to SnapshotMetaGenerator
-                            content_path: str = self.generate_content(
-                                html_content, site_name, html_scan_time, params
-                            )
-                            logger.info(
-                                f"+ SNAPSHOT CONTENT GENERATED FOR HTML PATH {html_file_path} +"
-                            )  # Log message # Snapshot meta creation:]
-                            meta_generator = SnapshotMetaGenerator(content_path)
-                            meta_generator.meta_dump()
-                            logger.info(
-                                f"+ SNAPSHOT META GENERATED FOR CONTENT PATH {content_path} +"
-                            )  # Log message
-
-                        # Regenerates masters
-                        self.regenerate_masters(thread_folder_path, params)
-                        # Logging messages are in method itself
-                        
-        except FileNotFoundError as error:
-            logger.error(f"Error while reparsing: {error}")
-            pass
-        except Exception as error:
-            logger.error(f"Error while reparsing: {error}")
-            pass
+                f"+ SNAPSHOT CONTENT GENERATED FOR HTML PATH {html_file_path} +"
+            )  # Log message # Snapshot meta creation:]
+            meta_generator = SnapshotMetaGenerator(content_path)
+            meta_generator.meta_dump()
+            logger.info(
+                f"+ SNAPSHOT META GENERATED FOR CONTENT PATH {content_path} +"
+            )  # Log message
+            site_index.record_snapshot(
+                content_path, meta_generator.get_path(), html_file_path,
+                meta_generator.metadata)
+            manifest.record(
+                html_file_path,
+                ChanToContent.PARSER_VERSION,
+                [content_path, meta_generator.get_path()])
+
+        # Reparsed snapshots are written in full
+        if params.get("delta_snapshots", False):
+            convert_thread(thread_folder_path, to_delta=True)
+            manifest.refresh_outputs()
+
+        # Regenerates masters
+        self.regenerate_masters(thread_folder_path, params)
+        # Logging messages are in method itself
+        manifest.save()
+        return True
+
+    def reparse_all(self) -> list[dict]:
+        """Reparses all data for all sites
 
-    def reparse_all(self):
-        """Reparses all data for all sites"""
+        Returns:
+            A list of summaries, one per site that could be reparsed.
+        """
         params_directory = os.path.join("./data", "params")
         params_files: list[str] = os.listdir(params_directory)
+        summaries: list[dict] = []
         # Iterates through all availiable sites and reparses the respective site data
         for param_file in params_files:
             site_name = param_file.replace("_params.json", "")
             if ("4chan_" in  site_name):
-                self.reparse_fourchan(site_name)
+                summary = self.reparse_fourchan(site_name)
+            else:
+                summary = self.reparse_site(site_name)
+            if summary is not None:
+                summaries.append(summary)
+        return summaries
+
+    def reparse_fourchan(self, board_search) -> dict | None:
+        """Reparses data for /lgbt/
+
+        Returns:
+            A summary of the reparse (see `reparse_thread_folders()`), or None
+            if the board's parameters or data folder couldn't be found.
+        """
+        params: dict | None = self._load_params(board_search)
+        if params is None:
+            return None
+
+        logger.info("Processing existing threads")  # Log message
+        return self.reparse_thread_folders(params, fourchan=True)
+
+    def reparse_fourchan_thread(
+            self, thread_folder_path: str, params: dict) -> bool:
+        """Reparses every source JSON snapshot in a thread, then its masters.
+
+        Args:
+            thread_folder_path (str): Path to the thread folder.
+            params (dict): Parameters of the board the thread belongs to.
+
+        Snapshots whose source JSON and parser version are unchanged since
+        they were last reparsed (according to the thread's reparse manifest)
+        are skipped, and masters are only regenerated if a snapshot was
+        reparsed.
+
+        Returns:
+            True if the thread had source JSON snapshots that needed reparsing.
+        """
+        site_name: str = params["site_name"]
+        site_index = open_site_index(os.path.dirname(thread_folder_path))
+        matching_source_files: list[str] = site_index.source_paths(
+            thread_folder_path)
+
+        manifest = ReparseManifest(thread_folder_path)
+        if not self.force:
+            matching_source_files = [
+                source_file_path for source_file_path in matching_source_files
+                if not manifest.is_current(
+                    source_file_path, SourceToContent.PARSER_VERSION)]
+
+        if len(matching_source_files) == 0:
+            return False
+
+        # Reparse all snapshots to fit new format
+        for source_file_path in matching_source_files:
+            source_dir_name: str = os.path.dirname(source_file_path)
+            source_scan_time: str = os.path.basename(
+                source_dir_name
+            )  # assumption that html is stored in a scan_time subfolder
+
+            source_content: dict = codec.load(source_file_path)
+
+            # Generate content and then pass to SnapshotMetaGenerator
+            content_path: str = self.generate_fourchan_content(
+                source_content, site_name, source_scan_time, params
+            )
+            logger.debug(
+                f"Snapshot content has been generated for HTML path: {source_file_path}"
+            )  # Log message # Snapshot meta creation:]
+            meta_generator = SnapshotMetaGenerator(content_path)
+            meta_generator.meta_dump()
+            logger.debug(
+                f"Snapshot meta has been generated for content path: {content_path}"
+            )  # Log message
+            site_index.record_snapshot(
+                content_path, meta_generator.get_path(), source_file_path,
+                meta_generator.metadata)
+            manifest.record(
+                source_file_path,
+                SourceToContent.PARSER_VERSION,
+                [content_path, meta_generator.get_path()])
+
+        # Reparsed snapshots are written in full
+        if params.get("delta_snapshots", False):
+            convert_thread(thread_folder_path, to_delta=True)
+            manifest.refresh_outputs()
+
+        # Regenerates masters
+        self.regenerate_masters(thread_folder_path, params)
+        manifest.save()
+        return True
+
+    def rebuild_thread_masters(
+            self, thread_folder_path: str, params: dict) -> bool:
+        """Regenerates a thread's masters without reparsing any snapshots.
+
+        Args:
+            thread_folder_path (str): Path to the thread folder.
+            params (dict): Parameters of the site the thread belongs to.
+
+        Returns:
+            True if the thread had snapshot content to rebuild masters from.
+        """
+        site_index = open_site_index(os.path.dirname(thread_folder_path))
+        if not site_index.content_paths(thread_folder_path):
+            return False
+        self.regenerate_masters(thread_folder_path, params)
+        return True
+
+    def reparse_thread_folders(
+            self, params: dict, fourchan: bool) -> dict | None:
+        """Reparses every thread folder of a site, in parallel if requested.
+
+        With `jobs` > 1, thread folders are handed out to a pool of worker
+        processes, each of which receives the site's parameters once. A
+        thread which fails to reparse is recorded in the summary, rather
+        than stopping the rest of the site from being reparsed.
+
+        Args:
+            params (dict): Parameters of the site being reparsed.
+            fourchan (bool): Whether threads are reparsed from source JSONs.
+
+        Returns:
+            A summary dictionary with the site name, the number of threads
+            reparsed/failed, and a `failures` dictionary of thread folder
+            paths to error messages, or None if the site has no data folder.
+        """
+        site_directory: str = f"./data/{params["site_name"]}"
+        if not os.path.isdir(site_directory):
+            logger.error(
+                f"No data folder found for {params["site_name"]} "
+                f"at {site_directory}; skipping")
+            return None
+        thread_folder_paths: list[str] = [
+            os.path.join(site_directory, thread_folder)
+            for thread_folder in os.listdir(site_directory)
+            if os.path.isdir(os.path.join(site_directory, thread_folder))]
+
+        run_metrics = get_run_metrics()
+        results: list[tuple[str, bool, str | None]]
+        with run_metrics.stage(params["site_name"], REPARSE):
+            if self.jobs > 1:
+                with ProcessPoolExecutor(
+                        max_workers=self.jobs,
+                        initializer=_init_worker,
+                        initargs=(self, params, fourchan)) as executor:
+                    results = list(executor.map(
+                        _reparse_thread_worker,
+                        thread_folder_paths,
+                        chunksize=max(
+                            1, len(thread_folder_paths) // (self.jobs * 4))))
+            else:
+                results = [
+                    self._reparse_thread_safely(
+                        thread_folder_path, params, fourchan)
+                    for thread_folder_path in thread_folder_paths]
+
+        summary: dict = {
+            "site_name": params["site_name"],
+            "num_threads_reparsed": 0,
+            "num_threads_unchanged": 0,
+            "num_threads_failed": 0,
+            "failures": {},
+        }
+        for thread_folder_path, reparsed, error in results:
+            if error is not None:
+                summary["num_threads_failed"] += 1
+                summary["failures"][thread_folder_path] = error
+                # Errors are recorded as "<exception type>: <message>"
+                run_metrics.error(params["site_name"], error.split(":")[0])
+            elif reparsed:
+                summary["num_threads_reparsed"] += 1
             else:
-                self.reparse_site(site_name)
+                summary["num_threads_unchanged"] += 1
+
+        run_metrics.count(
+            params["site_name"], THREADS, summary["num_threads_reparsed"])
+        run_metrics.count(
+            params["site_name"], SKIPPED_THREADS,
+            summary["num_threads_unchanged"])
 
-    def reparse_fourchan(self, board_search):
-        """Reparses data for /lgbt/"""
+        logger.info(
+            f"+++ REPARSED {summary["num_threads_reparsed"]} THREADS "
+            f"ASSOCIATED WITH {params["site_name"]}; "
+            f"{summary["num_threads_unchanged"]} UNCHANGED; "
+            f"{summary["num_threads_failed"]} FAILED +++")
+        for thread_folder_path, error in summary["failures"].items():
+            logger.error(f"Failed to reparse {thread_folder_path}: {error}")
+        return summary
+
+    def _reparse_thread_safely(
+            self, thread_folder_path: str, params: dict,
+            fourchan: bool) -> tuple[str, bool, str | None]:
+        """Reparses a thread, catching any error so the site can continue.
+
+        Returns:
+            The thread folder path, whether it was reparsed, and an error
+            message (or None).
+        """
+        set_log_context(
+            params["site_name"], os.path.basename(thread_folder_path))
+        try:
+            with traced(params["site_name"], REPARSE_THREAD):
+                if self.masters_only:
+                    reparsed = self.rebuild_thread_masters(
+                        thread_folder_path, params)
+                elif fourchan:
+                    reparsed = self.reparse_fourchan_thread(
+                        thread_folder_path, params)
+                else:
+                    reparsed = self.reparse_thread(thread_folder_path, params)
+            return thread_folder_path, reparsed, None
+        except Exception as error:
+            logger.error(f"Error while reparsing {thread_folder_path}: {error}")
+            return thread_folder_path, False, f"{type(error).__name__}: {error}"
+
+    def _load_params(self, site_search: str) -> dict | None:
+        """Loads the first parameters file matching `site_search`."""
         try:
             # Param retrieval
-            params_file_list = glob.glob(f"./data/params/{board_search}*.json")
+            params_file_list = glob.glob(f"./data/params/{site_search}*.json")
             params_path = params_file_list[0]
             with open(params_path, "r") as params_file:
-                params = json.load(params_file)
-
-            # Pathing
-            site_name: str = params["site_name"]
-            board_name: str = params["board_name"]
-            site_directory = f"./data/{site_name}"
-
-            source_pattern = "source*.json"  # Look for an html file
-            logger.info("Processing existing threads")  # Log message
-
-            for thread_folder in os.listdir(site_directory):
-                thread_folder_path = os.path.join(site_directory, thread_folder)
-
-                # If the thread folder is a directory, find its source .json and meta file and use that to reprocess the thread.
-                if os.path.isdir(thread_folder_path):
-                    source_search_path = os.path.join(
-                        thread_folder_path, "**", source_pattern
-                    )
-
-                    matching_source_files = glob.glob(
-                        source_search_path, recursive=True
-                    )
-
-                    if len(matching_source_files) > 0:
-                        # Reparse all snapshots to fit new format
-                        for source_file_path in matching_source_files:
-                            source_dir_name: str = os.path.dirname(source_file_path)
-                            source_scan_time: str = os.path.basename(
-                                source_dir_name
-                            )  # assumption that html is stored in a scan_time subfolder
-
-                            with open(source_file_path, "r", encoding="utf-8") as file:
-                                source_content: dict = json.load(file)
-
-                            # Generate content and then pass to SnapshotMetaGenerator
-                            content_path: str = self.generate_fourchan_content(
-                                source_content, site_name, source_scan_time, params
-                            )
-                            logger.debug(
-                                f"Snapshot content has been generated for HTML path: {source_file_path}"
-                            )  # Log message # Snapshot meta creation:]
-                            meta_generator = SnapshotMetaGenerator(content_path)
-                            meta_generator.meta_dump()
-                            logger.debug(
-                                f"Snapshot meta has been generated for content path: {content_path}"
-                            )  # Log message
-
-                        # Regenerates masters
-                        self.regenerate_masters(thread_folder_path, params)
-        except FileNotFoundError as error:
-            logger.error(f"Error while reparsing: {error}")
-            pass
-        except Exception as error:
-            logger.error(f"Error while reparsing: {error}")
-            pass
+                return json.load(params_file)
+        except (IndexError, OSError, json.JSONDecodeError) as error:
+            logger.error(
+                f"Error while loading parameters for {site_search}: {error}")
+            return None
 
 
-if __name__ == "__main__":  # used to run script as executable
+# Worker process state, set once per worker by `_init_worker()`
+_worker_reparser: Reparser | None = None
+_worker_params: dict = {}
+_worker_fourchan: bool = False
+
+
+def _init_worker(reparser: Reparser, params: dict, fourchan: bool) -> None:
+    """Gives a reparse worker process its settings and the site parameters."""
+    global _worker_reparser, _worker_params, _worker_fourchan
+    _worker_reparser = reparser
+    _worker_params = params
+    _worker_fourchan = fourchan
+
+
+def _reparse_thread_worker(
+        thread_folder_path: str) -> tuple[str, bool, str | None]:
+    """Reparses a single thread folder within a worker process."""
+    return _worker_reparser._reparse_thread_safely(
+        thread_folder_path, _worker_params, _worker_fourchan)
+
+
+def main(argv: list[str] | None = None, prog: str | None = None):
+    """Reparses data, as run from the command line."""
     parser = argparse.ArgumentParser(
+        prog=prog,
         description="Reparses data. If no site_name is entered, all data is reparsed."
     )
     parser.add_argument(
@@ -324,14 +559,107 @@ if __name__ == "__main__":  # used to run script as executable
         nargs="?",
         help="Name of the site data folder",
     )
-    args = parser.parse_args()
-    reparser = Reparser()
-
-    if args.site_name is None:
-        reparser.reparse_all()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes thread folders are reparsed across.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reparse every snapshot, ignoring the threads' reparse manifests.",
+    )
+    parser.add_argument(
+        "--masters-only",
+        action="store_true",
+        help=(
+            "Only rebuild master content, text and meta from the existing "
+            "snapshot content and meta files, without reparsing any HTML."),
+    )
+    parser.add_argument(
+        "--prometheus",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Path of a Prometheus textfile to write the run's metrics to.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Profile the reparse, writing the profile and a summary of the "
+            "hottest functions to ./data/logs/."),
+    )
+    parser.add_argument(
+        "--profile-thread",
+        type=str,
+        default=None,
+        metavar="THREAD_ID",
+        help=(
+            "Instead of reparsing, profile reparsing a single thread of the "
+            "site (in a scratch copy of its folder)."),
+    )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Write the log as JSON lines rather than text.",
+    )
+    parser.add_argument(
+        "--memtrace",
+        action="store_true",
+        help=(
+            "Trace the peak memory of each stage and thread, and where it's "
+            "allocated, writing a report next to the log (use with --jobs 1)."),
+    )
+    args = parser.parse_args(argv)
+
+    # Root logger config; records are written out by a separate thread
+    configure_logging(
+        log_path,
+        level=logging.INFO,  # We can make a lot of the spam-y logs DEBUG
+        structured=args.log_json,
+        stream=sys.stdout,
+    )
+    logger.info("Root logger configured")
+    reparser = Reparser(
+        jobs=args.jobs, force=args.force, masters_only=args.masters_only)
+
+    def run():
+        if args.site_name is None:
+            reparser.reparse_all()
+
+        elif "4chan_" in args.site_name:
+            reparser.reparse_fourchan(args.site_name)
+
+        else:
+            reparser.reparse_site(args.site_name)
+
+    run_metrics = get_run_metrics()
+    if args.memtrace:
+        if args.jobs > 1:
+            logger.warning(
+                "Only the main process is traced; worker processes aren't")
+        start_memtrace()
+    try:
+        if args.profile_thread is not None:
+            if args.site_name is None:
+                parser.error("--profile-thread needs the thread's site_name")
+            params: dict | None = reparser._load_params(args.site_name)
+            if params is None:
+                sys.exit(1)
+            profile_thread(params, args.profile_thread, scan_time_str)
+        elif args.profile:
+            profile_run("reparse", scan_time_str, run)
+        else:
+            run()
+    finally:
+        run_metrics.write_json(metrics_path(log_path))
+        if args.prometheus:
+            run_metrics.write_prometheus(args.prometheus)
+        if get_memory_tracer() is not None:
+            get_memory_tracer().write_json(memtrace_path(log_path))
 
-    elif "4chan_" in args.site_name:
-        reparser.reparse_fourchan(args.site_name)
 
-    else:
-        reparser.reparse_site(args.site_name)
+if __name__ == "__main__":  # used to run script as executable
+    main()
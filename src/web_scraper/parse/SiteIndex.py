@@ -0,0 +1,527 @@
+# Imports
+import argparse
+import glob
+import logging
+import os
+import sqlite3
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+
+class SiteIndex:
+    """A SQLite index of a site's threads, snapshots and their files.
+
+    Searching a site's data subfolder for files (e.g. every
+    `thread_meta_*.json`) means walking the whole tree, which dominates
+    runtime once a site has tens of thousands of threads. Instead, everything
+    that writes snapshot or master files records them in this index as they
+    are persisted, and everything that needs to find those files queries it.
+
+    The index is only trusted once it has been fully built from disk (see
+    `rebuild()`); until then, it is still written to, but the readers below
+    fall back to searching the data subfolder like before.
+
+    The index is saved in the site's data subfolder as `site_index.sqlite`.
+    File paths are stored relative to the site's data subfolder.
+
+    Attributes:
+        site_dir (str): Path to the site's data subfolder.
+        index_path (str): Path to the SQLite database.
+    """
+
+    FILE_NAME: str = "site_index.sqlite"
+
+    SCHEMA: str = """
+        CREATE TABLE IF NOT EXISTS threads (
+            thread_id TEXT PRIMARY KEY,
+            board_name TEXT,
+            thread_title TEXT,
+            date_published TEXT,
+            most_recent_update_date TEXT,
+            most_recent_scrape_date TEXT,
+            num_aggregate_post_ids INTEGER,
+            num_unique_post_ids INTEGER,
+            num_aggregate_words INTEGER,
+            num_words_most_recent INTEGER,
+            master_content_path TEXT,
+            master_text_path TEXT,
+            master_meta_path TEXT,
+            date_archived TEXT
+        );
+        CREATE TABLE IF NOT EXISTS snapshots (
+            thread_id TEXT NOT NULL,
+            scan_time TEXT NOT NULL,
+            input_path TEXT,
+            content_path TEXT,
+            meta_path TEXT,
+            date_updated TEXT,
+            num_all_post_ids INTEGER,
+            num_all_words INTEGER,
+            PRIMARY KEY (thread_id, scan_time)
+        );
+        CREATE TABLE IF NOT EXISTS index_info (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS totals (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    # Sitewide totals, and the thread columns summed into them (the number
+    # of threads is the number of thread rows)
+    TOTAL_COLUMNS: dict[str, str | None] = {
+        "num_sitewide_threads": None,
+        "num_sitewide_total_posts": "num_aggregate_post_ids",
+        "num_sitewide_dist_posts": "num_unique_post_ids",
+        "num_sitewide_aggregate_words": "num_aggregate_words",
+    }
+
+    def __init__(self, site_dir: str):
+        """Opens (creating, if needed) the index of a site's data subfolder.
+
+        Args:
+            site_dir (str): Path to the site's data subfolder.
+        """
+        self.site_dir: str = site_dir
+        self.index_path: str = os.path.join(site_dir, self.FILE_NAME)
+        os.makedirs(site_dir, exist_ok=True)
+        # Several reparse workers may write to the same index at once
+        self.connection: sqlite3.Connection = sqlite3.connect(
+            self.index_path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self) -> None:
+        """Adds the columns added to the schema since an index was made."""
+        columns: set[str] = {
+            row[1] for row in self.connection.execute(
+                "PRAGMA table_info(threads)")}
+        if "date_archived" not in columns:
+            try:
+                self.connection.execute(
+                    "ALTER TABLE threads ADD COLUMN date_archived TEXT")
+            except sqlite3.OperationalError:  # Added by another worker
+                pass
+
+    def close(self) -> None:
+        """Closes the connection to the index."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def is_complete(self) -> bool:
+        """Returns True if the index has been fully built from disk."""
+        row = self.connection.execute(
+            "SELECT value FROM index_info WHERE key = 'complete'").fetchone()
+        return row is not None and row[0] == "1"
+
+    # Writers:
+    def record_snapshot(
+            self, content_path: str, meta_path: str,
+            input_path: str | None = None,
+            snapshot_meta: dict | None = None) -> None:
+        """Records a thread snapshot's files once they have been written.
+
+        Args:
+            content_path (str): Path to the snapshot content JSON.
+            meta_path (str): Path to the snapshot meta JSON.
+            input_path (str): Path to the snapshot HTML/source JSON, if any.
+            snapshot_meta (dict): The snapshot's meta data, if at hand.
+        """
+        snapshot_dir: str = os.path.dirname(content_path)
+        thread_id: str = os.path.basename(os.path.dirname(snapshot_dir))
+        scan_time: str = os.path.basename(snapshot_dir)
+        snapshot_meta = snapshot_meta or {}
+        with self.connection:
+            self.connection.execute(
+                """
+                INSERT INTO snapshots (
+                    thread_id, scan_time, input_path, content_path,
+                    meta_path, date_updated, num_all_post_ids, num_all_words)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (thread_id, scan_time) DO UPDATE SET
+                    input_path = COALESCE(
+                        excluded.input_path, snapshots.input_path),
+                    content_path = excluded.content_path,
+                    meta_path = excluded.meta_path,
+                    date_updated = excluded.date_updated,
+                    num_all_post_ids = excluded.num_all_post_ids,
+                    num_all_words = excluded.num_all_words
+                """,
+                (
+                    thread_id,
+                    scan_time,
+                    self._relative(input_path),
+                    self._relative(content_path),
+                    self._relative(meta_path),
+                    snapshot_meta.get("date_updated"),
+                    snapshot_meta.get("num_all_post_ids"),
+                    snapshot_meta.get("num_all_words"),
+                ),
+            )
+
+    def record_thread(
+            self, master_meta_path: str, master_meta: dict,
+            master_content_path: str | None = None,
+            master_text_path: str | None = None) -> None:
+        """Records a thread's master files once they have been written.
+
+        The sitewide totals are updated by the difference between the
+        thread's new counts and those previously recorded for it.
+
+        Args:
+            master_meta_path (str): Path to the master meta JSON.
+            master_meta (dict): The thread's master meta data.
+            master_content_path (str): Path to the master content JSON.
+            master_text_path (str): Path to the master text TXT.
+        """
+        thread_id: str = os.path.basename(os.path.dirname(master_meta_path))
+        # Older master metas use older key names
+        num_aggregate_post_ids: int = master_meta.get(
+            "num_aggregate_post_ids", master_meta.get("num_total_posts", 0))
+        num_unique_post_ids: int = master_meta.get(
+            "num_unique_post_ids", master_meta.get("num_dist_posts", 0))
+        num_aggregate_words: int = master_meta.get("num_aggregate_words", 0)
+
+        with self.connection:
+            # Lock the index before reading the thread's previous counts, so
+            # concurrent writers can't both apply a difference to one total
+            self.connection.execute("BEGIN IMMEDIATE")
+            previous = self.connection.execute(
+                "SELECT num_aggregate_post_ids, num_unique_post_ids, "
+                "num_aggregate_words FROM threads WHERE thread_id = ?",
+                (thread_id,)).fetchone()
+            if previous is None:
+                differences: tuple[int] = (
+                    1, num_aggregate_post_ids, num_unique_post_ids,
+                    num_aggregate_words)
+            else:
+                differences = (
+                    0,
+                    num_aggregate_post_ids - (previous[0] or 0),
+                    num_unique_post_ids - (previous[1] or 0),
+                    num_aggregate_words - (previous[2] or 0))
+            self.connection.executemany(
+                "INSERT INTO totals (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+                zip(self.TOTAL_COLUMNS, differences))
+
+            self.connection.execute(
+                """
+                INSERT INTO threads (
+                    thread_id, board_name, thread_title, date_published,
+                    most_recent_update_date, most_recent_scrape_date,
+                    num_aggregate_post_ids, num_unique_post_ids,
+                    num_aggregate_words, num_words_most_recent,
+                    master_content_path, master_text_path, master_meta_path,
+                    date_archived)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (thread_id) DO UPDATE SET
+                    board_name = excluded.board_name,
+                    thread_title = excluded.thread_title,
+                    date_published = excluded.date_published,
+                    most_recent_update_date =
+                        excluded.most_recent_update_date,
+                    most_recent_scrape_date =
+                        excluded.most_recent_scrape_date,
+                    num_aggregate_post_ids = excluded.num_aggregate_post_ids,
+                    num_unique_post_ids = excluded.num_unique_post_ids,
+                    num_aggregate_words = excluded.num_aggregate_words,
+                    num_words_most_recent = excluded.num_words_most_recent,
+                    master_content_path = COALESCE(
+                        excluded.master_content_path,
+                        threads.master_content_path),
+                    master_text_path = COALESCE(
+                        excluded.master_text_path, threads.master_text_path),
+                    master_meta_path = excluded.master_meta_path,
+                    date_archived = COALESCE(
+                        excluded.date_archived, threads.date_archived)
+                """,
+                (
+                    thread_id,
+                    master_meta.get("board_name"),
+                    master_meta.get("thread_title"),
+                    master_meta.get("date_published"),
+                    master_meta.get("most_recent_update_date"),
+                    master_meta.get("most_recent_scrape_date"),
+                    num_aggregate_post_ids,
+                    num_unique_post_ids,
+                    num_aggregate_words,
+                    master_meta.get("num_words_most_recent"),
+                    self._relative(master_content_path),
+                    self._relative(master_text_path),
+                    self._relative(master_meta_path),
+                    master_meta.get("date_archived"),
+                ),
+            )
+
+    def record_archived(self, thread_dir: str, date_archived: str) -> None:
+        """Records that a thread has been archived, without its master files
+        having been regenerated.
+
+        Args:
+            thread_dir (str): Path to the thread folder.
+            date_archived (str): When the thread was archived.
+        """
+        with self.connection:
+            self.connection.execute(
+                "UPDATE threads SET date_archived = ? WHERE thread_id = ?",
+                (date_archived, os.path.basename(thread_dir)))
+
+    def rebuild(self) -> None:
+        """Rebuilds the whole index from the files in the site's subfolder.
+
+        This is the only walk of the full data subfolder; once it's done,
+        the index is marked as complete and readers start querying it.
+        """
+        logger.info(f"Rebuilding site index for {self.site_dir}")
+        with self.connection:
+            self.connection.execute("DELETE FROM threads")
+            self.connection.execute("DELETE FROM snapshots")
+            self.connection.execute("DELETE FROM totals")
+            self.connection.execute(
+                "DELETE FROM index_info WHERE key = 'complete'")
+
+        num_threads: int = 0
+        for entry in os.scandir(self.site_dir):
+            if entry.is_dir():
+                self._rebuild_thread(entry.path)
+                num_threads += 1
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO index_info (key, value) "
+                "VALUES ('complete', '1')")
+        logger.info(
+            f"Site index for {self.site_dir} rebuilt with "
+            f"{num_threads} thread folders")
+
+    def _rebuild_thread(self, thread_dir: str) -> None:
+        """Records every snapshot and master file of a thread folder."""
+        thread_id: str = os.path.basename(thread_dir)
+        master_paths: dict[str, str] = {}
+        for entry in os.scandir(thread_dir):
+            if entry.is_file():
+                master_paths[entry.name] = entry.path
+                continue
+            files: dict[str, str] = {
+                snapshot_entry.name: snapshot_entry.path
+                for snapshot_entry in os.scandir(entry.path)}
+            content_path: str | None = files.get(f"content_{thread_id}.json")
+            meta_path: str | None = files.get(f"meta_{thread_id}.json")
+            if content_path is None or meta_path is None:
+                continue
+            input_path: str | None = (
+                files.get(f"thread_{thread_id}.html")
+                or files.get(f"source_{thread_id}.json"))
+            self.record_snapshot(
+                content_path, meta_path, input_path, _load_json(meta_path))
+
+        master_meta_path: str | None = master_paths.get(
+            f"thread_meta_{thread_id}.json")
+        if master_meta_path is not None:
+            self.record_thread(
+                master_meta_path,
+                _load_json(master_meta_path),
+                master_paths.get(f"master_version_{thread_id}.json"),
+                master_paths.get(f"master_text_{thread_id}.txt"))
+
+    def get_totals(self) -> dict[str, int]:
+        """Returns the running sitewide totals of the recorded threads.
+
+        These only cover the whole site once the index is complete.
+        """
+        totals: dict[str, int] = dict.fromkeys(self.TOTAL_COLUMNS, 0)
+        totals.update(self.connection.execute(
+            "SELECT key, value FROM totals").fetchall())
+        return totals
+
+    # Readers (which fall back to searching the data subfolder):
+    def content_paths(self, thread_dir: str) -> list[str]:
+        """Returns a thread's snapshot content paths in scan-time order."""
+        return self._snapshot_paths(
+            thread_dir, "content_path", "content_*.json")
+
+    def meta_paths(self, thread_dir: str) -> list[str]:
+        """Returns a thread's snapshot meta paths in scan-time order."""
+        return self._snapshot_paths(thread_dir, "meta_path", "meta_*.json")
+
+    def html_paths(self, thread_dir: str) -> list[str]:
+        """Returns a thread's snapshot HTML paths in scan-time order."""
+        return self._snapshot_paths(
+            thread_dir, "input_path", "*.html", suffix=".html")
+
+    def source_paths(self, thread_dir: str) -> list[str]:
+        """Returns a thread's snapshot source JSON paths in scan-time order."""
+        return self._snapshot_paths(
+            thread_dir, "input_path", "source*.json", suffix=".json")
+
+    def master_meta_paths(self) -> list[str]:
+        """Returns the master meta path of every thread in the site."""
+        if not self.is_complete():
+            search_pattern = os.path.join(
+                self.site_dir, "**/thread_meta_*.json")
+            return glob.glob(search_pattern, recursive=True)
+        rows = self.connection.execute(
+            "SELECT master_meta_path FROM threads "
+            "WHERE master_meta_path IS NOT NULL ORDER BY thread_id")
+        return [self._absolute(row[0]) for row in rows]
+
+    def master_content_paths(self) -> list[str]:
+        """Returns the master content path of every thread in the site."""
+        if not self.is_complete():
+            search_pattern = os.path.join(
+                self.site_dir, "*", "master_version_*.json")
+            return sorted(glob.glob(search_pattern))
+        rows = self.connection.execute(
+            "SELECT master_content_path FROM threads "
+            "WHERE master_content_path IS NOT NULL ORDER BY thread_id")
+        return [self._absolute(row[0]) for row in rows]
+
+    def thread_summaries(self) -> list[dict]:
+        """Returns the board, publish date and post count of every thread.
+
+        Each summary holds `thread_id`, `board_name`, `date_published` and
+        `num_unique_post_ids`, in thread ID order. Until the index is
+        complete, every master meta JSON is read instead.
+        """
+        if not self.is_complete():
+            summaries: list[dict] = []
+            for master_meta_path in self.master_meta_paths():
+                master_meta: dict = _load_json(master_meta_path)
+                summaries.append({
+                    "thread_id": os.path.basename(
+                        os.path.dirname(master_meta_path)),
+                    "board_name": master_meta.get("board_name"),
+                    "date_published": master_meta.get("date_published"),
+                    "num_unique_post_ids": master_meta.get(
+                        "num_unique_post_ids",
+                        master_meta.get("num_dist_posts", 0)),
+                })
+            return sorted(
+                summaries, key=lambda summary: summary["thread_id"])
+        columns: tuple[str] = (
+            "thread_id", "board_name", "date_published", "num_unique_post_ids")
+        rows = self.connection.execute(
+            f"SELECT {", ".join(columns)} FROM threads "
+            "WHERE master_meta_path IS NOT NULL ORDER BY thread_id")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def board_name(self, thread_dir: str) -> str | None:
+        """Returns a thread's board name, or None if it has no master meta."""
+        if not self.is_complete():
+            found: list[str] = glob.glob(
+                os.path.join(thread_dir, "thread_meta_*.json"))
+            return _load_json(found[0]).get("board_name") if found else None
+        row = self.connection.execute(
+            "SELECT board_name FROM threads WHERE thread_id = ?",
+            (os.path.basename(thread_dir),)).fetchone()
+        return row[0] if row is not None else None
+
+    def date_archived(self, thread_dir: str) -> str | None:
+        """Returns when a thread was archived, or None if it hasn't been (or
+        isn't indexed)."""
+        row = self.connection.execute(
+            "SELECT date_archived FROM threads WHERE thread_id = ?",
+            (os.path.basename(thread_dir),)).fetchone()
+        return row[0] if row is not None else None
+
+    def master_text_path(self, thread_dir: str) -> str | None:
+        """Returns a thread's master text path, or None if it has none."""
+        if not self.is_complete():
+            found: list[str] = glob.glob(
+                os.path.join(thread_dir, "master_text_*.txt"))
+            return found[0] if found else None
+        row = self.connection.execute(
+            "SELECT master_text_path FROM threads WHERE thread_id = ?",
+            (os.path.basename(thread_dir),)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return self._absolute(row[0])
+
+    def _snapshot_paths(
+            self, thread_dir: str, column: str, pattern: str,
+            suffix: str = "") -> list[str]:
+        """Queries (or searches for) a kind of snapshot file of a thread."""
+        if not self.is_complete():
+            search_path = os.path.join(thread_dir, "**", pattern)
+            return sorted(glob.glob(search_path, recursive=True))
+        rows = self.connection.execute(
+            f"SELECT {column} FROM snapshots "
+            f"WHERE thread_id = ? AND {column} LIKE ? ORDER BY scan_time",
+            (os.path.basename(thread_dir), f"%{suffix}"))
+        return [self._absolute(row[0]) for row in rows]
+
+    def _relative(self, path: str | None) -> str | None:
+        """Returns a path relative to the site's data subfolder."""
+        if path is None:
+            return None
+        return os.path.relpath(path, self.site_dir)
+
+    def _absolute(self, relative_path: str) -> str:
+        """Returns a path stored in the index joined to the site's subfolder."""
+        return os.path.join(self.site_dir, relative_path)
+
+
+# Open indexes, by process and site, so each worker process of a reparse opens
+# its own connection once rather than once per thread
+_open_indexes: dict[tuple[int, str], SiteIndex] = {}
+
+
+def open_site_index(site_dir: str) -> SiteIndex:
+    """Returns this process's open index of a site's data subfolder.
+
+    Args:
+        site_dir (str): Path to the site's data subfolder.
+    """
+    key: tuple[int, str] = (os.getpid(), os.path.normpath(site_dir))
+    if key not in _open_indexes:
+        _open_indexes[key] = SiteIndex(site_dir)
+    return _open_indexes[key]
+
+
+def _load_json(file_path: str) -> dict:
+    """Loads a JSON file, or returns an empty dict if it can't be read."""
+    try:
+        return codec.load(file_path)
+    except (OSError, *codec.DecodeError) as error:
+        logger.warning(f"Unable to read {file_path} for site index: {error}")
+        return {}
+
+
+if __name__ == "__main__":  # used to run script as executable
+    parser = argparse.ArgumentParser(
+        description=(
+            "Rebuilds the site index from the files on disk. If no site_name "
+            "is entered, the indexes of all sites are rebuilt."))
+    parser.add_argument(
+        "site_name",
+        type=str,
+        nargs="?",
+        help="Name of the site data folder",
+    )
+    args = parser.parse_args()
+
+    if args.site_name is None:
+        site_names: list[str] = [
+            param_file.replace("_params.json", "")
+            for param_file in os.listdir(os.path.join("./data", "params"))]
+    else:
+        site_names = [args.site_name]
+
+    for site_name in site_names:
+        site_dir: str = os.path.join("./data", site_name)
+        if not os.path.isdir(site_dir):
+            continue
+        with SiteIndex(site_dir) as site_index:
+            site_index.rebuild()
@@ -2,22 +2,41 @@ import argparse
 import glob
 import json
 import logging
+import multiprocessing
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 import sys
+from datetime import datetime
+
+from . import codec
+from .SiteIndex import open_site_index
+from ..metrics import SITE_STATS, get_run_metrics, metrics_path
 
 logger = logging.getLogger(__name__)
 
 
-def get_site_stats(site_name) -> dict:
+def get_site_stats(
+        site_name, verify: bool = False,
+        executor: ProcessPoolExecutor | None = None) -> dict:
     """
-    Iterates through a list of master meta paths found in the site data subdirectory, and returns a dictionary of site-wide statistics to be dumped into a JSON.
+    Returns a dictionary of site-wide statistics to be dumped into a JSON.
+
+    The statistics are the running totals kept in the site index, which are
+    updated as each thread's master meta is written. If the index hasn't
+    been built yet, or when verifying, they are instead recalculated from
+    every master meta found in the site data subdirectory.
+
+    Args:
+        site_name (str): Name of site
+        verify (bool): Recalculate the statistics from every master meta,
+            logging any differences from the site index's running totals.
+        executor (ProcessPoolExecutor): Pool to recalculate across, if any.
     """
     params = parameters_search(site_name)
-    master_meta_pattern = "**/thread_meta_*.json"
     site_dir = os.path.join("./data", site_name)
-    search_pattern = os.path.join(site_dir, master_meta_pattern)
-    list_of_master_metas: list[str] = glob.glob(search_pattern, recursive=True)
+    site_index = open_site_index(site_dir)
 
     # if len(list_of_master_metas) > 0:
     #     first_found_meta_path = list_of_master_metas[0]
@@ -33,7 +52,17 @@ def get_site_stats(site_name) -> dict:
         # "keywords": "",
     }
 
-    stats: dict = calculate_stats(list_of_master_metas)
+    stats: dict
+    if site_index.is_complete() and not verify:
+        stats = site_index.get_totals()
+    else:
+        # Master metas sit directly in thread folders, so there's no need to
+        # search the snapshot folders within them
+        search_pattern = os.path.join(site_dir, "*", "thread_meta_*.json")
+        list_of_master_metas: list[str] = glob.glob(search_pattern)
+        stats = calculate_stats(list_of_master_metas, executor)
+        if verify and site_index.is_complete():
+            _log_total_differences(site_name, site_index.get_totals(), stats)
     masterdata.update(stats)
     return masterdata
     # else:
@@ -41,39 +70,101 @@ def get_site_stats(site_name) -> dict:
     #     raise IndexError("No master_meta paths found.")
 
 
-def calculate_stats(list_of_master_metas: list[str]) -> dict:
+# Master meta keys summed into sitewide stats, along with their old names
+COUNT_KEYS: tuple[tuple[str, str | None]] = (
+    ("num_aggregate_post_ids", "num_total_posts"),
+    ("num_unique_post_ids", "num_dist_posts"),
+    ("num_aggregate_words", None),
+)
+
+# Matches a top-level count in a master meta without decoding the rest of it
+# (a key inside a string value would have its quotes escaped)
+_COUNT_PATTERNS: dict[str, re.Pattern] = {
+    key: re.compile(rb'(?<!\\)"' + key.encode() + rb'":\s*(-?\d+)')
+    for key_names in COUNT_KEYS for key in key_names if key is not None}
+
+# Number of master metas handed to a worker process at a time
+CHUNK_SIZE: int = 1000
+# Number of sites recalculated at once, when recalculating across a pool
+SITE_WORKERS: int = 8
+
+
+def read_master_meta_counts(master_meta_path: str) -> tuple[int, int, int]:
+    """Reads the counts summed into sitewide stats from a master meta.
+
+    Master metas carry large lists (e.g. `snapshot_history`) that aren't
+    needed here, so the counts are searched for in the raw file rather than
+    decoding all of it. If a count can't be found that way, the file is
+    decoded in full.
+
+    Args:
+        master_meta_path (str): Path to a master meta JSON.
+
+    Returns:
+        The thread's aggregate post IDs, unique post IDs and aggregate words.
+    """
+    with open(master_meta_path, "rb") as file:
+        raw: bytes = file.read()
+
+    counts: list[int] = []
+    for key, old_key in COUNT_KEYS:
+        match = _COUNT_PATTERNS[key].search(raw)
+        if match is None and old_key is not None:
+            match = _COUNT_PATTERNS[old_key].search(raw)
+        if match is None:
+            return _decode_master_meta_counts(raw)
+        counts.append(int(match.group(1)))
+    return tuple(counts)
+
+
+def _decode_master_meta_counts(raw: bytes) -> tuple[int, int, int]:
+    """Decodes a whole master meta and returns its counts."""
+    master_meta: dict = codec.loads(raw)
+    counts: list[int] = []
+    for key, old_key in COUNT_KEYS:
+        if key in master_meta:
+            counts.append(master_meta[key])
+        elif old_key is not None:
+            counts.append(master_meta[old_key])
+        else:
+            counts.append(0)
+    return tuple(counts)
+
+
+def _sum_master_meta_counts(list_of_master_metas: list[str]) -> list[int]:
+    """Sums the counts of a list of master metas."""
+    sums: list[int] = [0, 0, 0]
+    for master_meta_path in list_of_master_metas:
+        for i, count in enumerate(read_master_meta_counts(master_meta_path)):
+            sums[i] += count
+    return sums
+
+
+def calculate_stats(
+        list_of_master_metas: list[str],
+        executor: ProcessPoolExecutor | None = None) -> dict:
     """Calculates sitewide stats by iterating through every master meta within the site's data subfolder.
     Args:
         list_of_master_metas (list[str]): List containing filepaths to each master meta within the site's data subfolder
+        executor (ProcessPoolExecutor): Pool to read the master metas across,
+            in chunks. They're read in this process if None.
     """
     num_sitewide_threads: int = len(
         list_of_master_metas
     )  # Assumption that number of sitewide threads should correlate with the number of master_thread metas found within a site's data subfolder.
-    num_sitewide_total_posts: int = 0
-    num_sitewide_dist_posts: int = 0
-    num_sitewide_aggregate_words: int = 0
 
-    # Updates values for num_sitewide_total_posts and num_sitewide_dist_posts
-    for master_meta_path in list_of_master_metas:
-        with open(master_meta_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        master_meta = data
-        try:
-            num_sitewide_total_posts += master_meta["num_aggregate_post_ids"]
-        except KeyError:
-            # Old meta key
-            num_sitewide_total_posts += master_meta["num_total_posts"]
-
-        try:
-            num_sitewide_dist_posts += master_meta["num_unique_post_ids"]
-        except KeyError:
-            # Old meta key
-            num_sitewide_dist_posts += master_meta["num_dist_posts"]
-
-        try:
-            num_sitewide_aggregate_words += master_meta["num_aggregate_words"]
-        except KeyError:
-            continue
+    if executor is None:
+        sums: list[int] = _sum_master_meta_counts(list_of_master_metas)
+    else:
+        chunks: list[list[str]] = [
+            list_of_master_metas[i:i + CHUNK_SIZE]
+            for i in range(0, len(list_of_master_metas), CHUNK_SIZE)]
+        sums = [0, 0, 0]
+        for chunk_sums in executor.map(_sum_master_meta_counts, chunks):
+            for i, count in enumerate(chunk_sums):
+                sums[i] += count
+    (num_sitewide_total_posts, num_sitewide_dist_posts,
+     num_sitewide_aggregate_words) = sums
 
     return {
         "num_sitewide_threads": num_sitewide_threads,
@@ -83,34 +174,79 @@ def calculate_stats(list_of_master_metas: list[str]) -> dict:
     }
 
 
-def dump_site_meta(site_name):
+def _log_total_differences(
+        site_name: str, index_totals: dict, stats: dict) -> None:
+    """Logs any site index totals that differ from recalculated stats."""
+    differences: dict = {
+        key: (index_totals[key], value)
+        for key, value in stats.items() if index_totals.get(key) != value}
+    if differences:
+        for key, (index_total, value) in differences.items():
+            logger.warning(
+                f"{site_name} {key}: site index total {index_total} "
+                f"differs from recalculated {value}")
+    else:
+        logger.info(f"{site_name} site index totals verified")
+
+
+def dump_site_meta(
+        site_name, verify: bool = False,
+        executor: ProcessPoolExecutor | None = None):
     """
     Recalculates and saves the current site statistics to its respective site folder.
     Args:
         site_name (str): Name of site
+        verify (bool): Recalculate from every master meta, checking the
+            site index's running totals.
+        executor (ProcessPoolExecutor): Pool to recalculate across, if any.
     """
     site_meta_file_path = os.path.join(
         "./data", site_name, f"{site_name}_meta.json")
-    masterdata: dict = get_site_stats(site_name)
+    with get_run_metrics().stage(site_name, SITE_STATS):
+        masterdata: dict = get_site_stats(site_name, verify, executor)
 
     os.makedirs(os.path.dirname(site_meta_file_path), exist_ok=True)
-    with open(site_meta_file_path, "w") as json_file:
-        json.dump(masterdata, json_file, indent=2)
+    codec.dump(masterdata, site_meta_file_path)
 
 
-def dump_all():
+def dump_all(
+        verify: bool = False,
+        executor: ProcessPoolExecutor | None = None):
     """
     Recalculates and saves up-to-date site statistics for all sites.
+
+    With a pool, several sites are recalculated at once, each handing its
+    master metas to the shared pool in chunks, so that a run over many
+    small sites keeps every worker busy too.
+
+    Args:
+        verify (bool): Recalculate from every master meta, checking the
+            site indexes' running totals.
+        executor (ProcessPoolExecutor): Pool to recalculate across, if any.
+            Its workers may be started from the sites' threads, so it
+            shouldn't fork them (i.e. use the "spawn" context).
     """
     params_directory = os.path.join("./data", "params")
     params_files: list[str] = os.listdir(params_directory)
-    # Iterates through all availiable sites and recalculates their stats
+    site_names: list[str] = []
     for param_file in params_files:
         site_name = param_file.replace("_params.json", "")
         if "archive" in site_name:  # TODO: Remove once archive sites work
             continue
         else:
-            dump_site_meta(site_name)
+            site_names.append(site_name)
+
+    # Iterates through all availiable sites and recalculates their stats
+    if executor is None:
+        for site_name in site_names:
+            dump_site_meta(site_name, verify)
+        return
+    with ThreadPoolExecutor(max_workers=SITE_WORKERS) as site_executor:
+        futures = [
+            site_executor.submit(dump_site_meta, site_name, verify, executor)
+            for site_name in site_names]
+        for future in futures:
+            future.result()
 
 
 def parameters_search(params_name) -> dict:
@@ -151,8 +287,10 @@ def parameters_search(params_name) -> dict:
     return params
 
 
-if __name__ == "__main__":  # used to run script as executable
+def main(argv: list[str] | None = None, prog: str | None = None):
+    """Recalculates sitewide statistics, as run from the command line."""
     parser = argparse.ArgumentParser(
+        prog=prog,
         description="Recalculates sitewide statistics. If no site_name is entered, all sites are recalculated."
     )
     parser.add_argument(
@@ -161,10 +299,55 @@ if __name__ == "__main__":  # used to run script as executable
         nargs="?",
         help="Name of the site data folder",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help=(
+            "Recalculate from every master meta rather than using the site "
+            "index's running totals, logging any differences between them."),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Number of worker processes to read master metas across, when "
+            "recalculating (default: 1)"),
+    )
+    parser.add_argument(
+        "--prometheus",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Path of a Prometheus textfile to write the run's metrics to.",
+    )
+    args = parser.parse_args(argv)
+    scan_time_str = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")
 
-    if args.site_name is None:
-        dump_all()
+    executor: ProcessPoolExecutor | None = None
+    if args.jobs > 1:
+        # Workers are started as sites are recalculated, from their threads,
+        # which forking isn't safe to do
+        executor = ProcessPoolExecutor(
+            max_workers=args.jobs,
+            mp_context=multiprocessing.get_context("spawn"))
 
-    else:
-        dump_site_meta(args.site_name)
+    try:
+        if args.site_name is None:
+            dump_all(args.verify, executor)
+
+        else:
+            dump_site_meta(args.site_name, args.verify, executor)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        # Written where a log of the run would be
+        run_metrics = get_run_metrics()
+        run_metrics.write_json(
+            metrics_path(f"./data/logs/{scan_time_str}.log"))
+        if args.prometheus:
+            run_metrics.write_prometheus(args.prometheus)
+
+
+if __name__ == "__main__":  # used to run script as executable
+    main()
@@ -0,0 +1,177 @@
+# Imports
+import hashlib
+import json
+import logging
+import os
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotDeduplicator:
+    """Detects thread snapshots whose content hasn't changed since last scan.
+
+    A hash of the (normalised) snapshot content dictionary is kept in a small
+    record file within the thread folder, alongside the scan time of the
+    snapshot it was computed from. If a newly scraped thread hashes to the same
+    value, the thread hasn't changed, so the snapshot folder doesn't need to be
+    written and the master files don't need to be rebuilt. Instead, the scan
+    time is recorded as having "seen the thread unchanged".
+
+    The record file is named `snapshot_hash_{thread_id}.json`, so it isn't
+    picked up by any of the `content_*.json`/`meta_*.json` searches.
+
+    Attributes:
+        content_hash (str): Hash of the passed snapshot content.
+        record_path (str): Path to the thread's snapshot hash record.
+    """
+
+    # Keys ignored when hashing, as they change on every scan
+    IGNORED_KEYS: tuple[str] = ("date_scraped",)
+
+    def __init__(self, thread_dir: str, content: dict):
+        """Hashes the passed snapshot content for the given thread folder.
+
+        Args:
+            thread_dir (str): Path to the thread folder.
+            content (dict): Snapshot content data (i.e. `ChanToContent.data`).
+        """
+        self.thread_dir: str = thread_dir
+        self.thread_id: str = str(content["thread_id"])
+        self.content_hash: str = hash_content(content)
+        self.record_path: str = os.path.join(
+            thread_dir, f"snapshot_hash_{self.thread_id}.json")
+        self.record: dict = load_hash_record(self.record_path)
+
+    def is_unchanged(self) -> bool:
+        """Returns True if the content matches the previous snapshot's hash."""
+        return self.record.get("content_hash") == self.content_hash
+
+    def record_hash(self, scan_time: str) -> None:
+        """Stores the content hash as that of the most recent snapshot.
+
+        Should be called once the snapshot for `scan_time` has been written.
+
+        Args:
+            scan_time (str): Scan time (folder name) of the written snapshot.
+        """
+        self.record.update({
+            "content_hash": self.content_hash,
+            "date_scraped": scan_time,
+        })
+        self.record.setdefault("seen_unchanged_dates", [])
+        self._dump_record()
+        logger.debug(f"Snapshot hash recorded for thread {self.thread_id}")
+
+    def record_unchanged(self, scan_time: str) -> None:
+        """Records that the thread was seen, unchanged, at `scan_time`.
+
+        The scan time is added to the hash record, and to the thread's master
+        meta (if one exists) under `seen_unchanged_dates`, without regenerating
+        anything else.
+
+        Args:
+            scan_time (str): Time of the scan that found the thread unchanged.
+        """
+        seen_unchanged_dates: list[str] = self.record.setdefault(
+            "seen_unchanged_dates", [])
+        if scan_time not in seen_unchanged_dates:
+            seen_unchanged_dates.append(scan_time)
+        self._dump_record()
+
+        master_meta_path: str = os.path.join(
+            self.thread_dir, f"thread_meta_{self.thread_id}.json")
+        if os.path.exists(master_meta_path):
+            master_meta: dict = codec.load(master_meta_path)
+            master_meta["seen_unchanged_dates"] = seen_unchanged_dates
+            codec.dump(master_meta, master_meta_path)
+
+        logger.info(
+            f"Thread {self.thread_id} unchanged since "
+            f"{self.record.get("date_scraped")}; skipping snapshot")
+
+    def record_archived(self, date_archived: str) -> None:
+        """Records that the thread has been archived, so it's final.
+
+        The date is kept in the hash record, and marked in the thread's
+        master meta (if one exists) under `archived` and `date_archived`,
+        without regenerating anything else. Archived threads aren't polled
+        again.
+
+        Args:
+            date_archived (str): When the thread was archived.
+        """
+        self.record["date_archived"] = date_archived
+        self._dump_record()
+
+        master_meta_path: str = os.path.join(
+            self.thread_dir, f"thread_meta_{self.thread_id}.json")
+        if os.path.exists(master_meta_path):
+            master_meta: dict = codec.load(master_meta_path)
+            master_meta["archived"] = True
+            master_meta["date_archived"] = date_archived
+            codec.dump(master_meta, master_meta_path)
+
+        logger.info(f"Thread {self.thread_id} archived on {date_archived}")
+
+    def _dump_record(self) -> None:
+        """Writes the hash record out to the thread folder."""
+        os.makedirs(self.thread_dir, exist_ok=True)
+        codec.dump(self.record, self.record_path, machine_only=True)
+
+
+def hash_content(content: dict) -> str:
+    """Returns a SHA-256 hash of snapshot content, ignoring the scrape date.
+
+    The content is normalised by serialising it with sorted keys, so two
+    snapshots with identical data hash identically regardless of key order.
+
+    Args:
+        content (dict): Snapshot content data.
+    """
+    normalised: dict = {
+        key: value for key, value in content.items()
+        if key not in SnapshotDeduplicator.IGNORED_KEYS}
+    serialised: str = json.dumps(
+        normalised, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(serialised.encode("utf-8")).hexdigest()
+
+
+def load_hash_record(record_path: str) -> dict:
+    """Loads a thread's snapshot hash record, or an empty dict if missing.
+
+    Args:
+        record_path (str): Path to a `snapshot_hash_{thread_id}.json` file.
+    """
+    if not os.path.exists(record_path):
+        return {}
+    try:
+        return codec.load(record_path)
+    except codec.DecodeError as error:
+        logger.warning(f"Unreadable snapshot hash record {record_path}: {error}")
+        return {}
+
+
+def load_date_archived(thread_dir: str, thread_id: str) -> str | None:
+    """Returns when a thread was archived, or None if it hasn't been.
+
+    Args:
+        thread_dir (str): Path to the thread folder.
+        thread_id (str): ID of the thread.
+    """
+    record: dict = load_hash_record(
+        os.path.join(thread_dir, f"snapshot_hash_{thread_id}.json"))
+    return record.get("date_archived")
+
+
+def load_seen_unchanged_dates(thread_dir: str, thread_id: str) -> list[str]:
+    """Returns the scan times a thread was seen unchanged at.
+
+    Args:
+        thread_dir (str): Path to the thread folder.
+        thread_id (str): ID of the thread.
+    """
+    record: dict = load_hash_record(
+        os.path.join(thread_dir, f"snapshot_hash_{thread_id}.json"))
+    return record.get("seen_unchanged_dates", [])
@@ -1,9 +1,11 @@
 from datetime import datetime
 
-import json
 import logging
 import os
 
+from . import codec
+from .snapshot_delta import load_full_content
+
 logger = logging.getLogger(__name__)
 
 class SnapshotMetaGenerator:
@@ -16,35 +18,41 @@ class SnapshotMetaGenerator:
 
         """
         # Opens file at designated path, loads it into data variable, and copies contents into a global var
-        with open(content_json_path, "r") as file:
-            data = json.load(file)
+        # (delta snapshots are rebuilt in full first)
+        data = load_full_content(content_json_path)
         self.content_json = data
         try:
             self.thread_id = self.content_json["thread_id"]
-            logger.debug(f"Thread ID located: {self.thread_id}")
+            logger.debug("Thread ID located: %s", self.thread_id)
         except Exception as error:
-            logger.error(f"Error finding 'thread_id' in {content_json_path}: {error}")
+            logger.error(
+                "Error finding 'thread_id' in %s: %s",
+                content_json_path, error)
             raise KeyError(f"Error finding 'thread_id' in {content_json_path}: {error}")
 
         # Pathing: Based on assumption that content and meta are stored in same directory
         file_name = f"meta_{self.thread_id}.json"
         thread_folder_path = os.path.dirname(content_json_path)
         self.meta_file_path = os.path.join(thread_folder_path, file_name)
-        logger.debug(f"File path for meta is denoted as: {self.meta_file_path}")
+        logger.debug(
+            "File path for meta is denoted as: %s", self.meta_file_path)
 
         # Posts
         try:
             self.original_post: dict = self.content_json["original_post"]
-            logger.info(f"Original post located.")
+            logger.info("Original post located.")
         except Exception as error:
-            logger.error(f"Error finding 'original_post' in {content_json_path}: {error}")
+            logger.error(
+                "Error finding 'original_post' in %s: %s",
+                content_json_path, error)
             raise KeyError(f"Error finding 'original_post' in {content_json_path}: {error}")
         
         try:
             self.replies: dict = self.content_json["replies"]
-            logger.info(f"Replies located.")
+            logger.info("Replies located.")
         except Exception as error:
-            logger.error(f"Error finding 'replies' in {content_json_path}: {error}")
+            logger.error(
+                "Error finding 'replies' in %s: %s", content_json_path, error)
             raise KeyError(f"Error finding 'replies' in {content_json_path}: {error}")
 
     # Helper functions:
@@ -65,13 +73,16 @@ class SnapshotMetaGenerator:
             original_post_content: str = self.original_post["post_content"]
             original_post_words: list[str] = original_post_content.split()
             original_post_word_count: int = len(original_post_words)
-            logger.debug(f"Word count for original post calculated: {original_post_word_count} word(s)")
+            logger.debug(
+                "Word count for original post calculated: %s word(s)",
+                original_post_word_count)
 
             # Adds word count of OP to total word count of thread
             num_words += original_post_word_count
 
         except Exception as error:
-            logger.error(f"Error finding 'post_content' in original post: {error}")
+            logger.error(
+                "Error finding 'post_content' in original post: %s", error)
             raise KeyError(f"Error finding 'post_content' in original post: {error}")
 
         
@@ -81,13 +92,16 @@ class SnapshotMetaGenerator:
                 reply_content: str = reply["post_content"]
                 reply_words: list[str] = reply_content.split()
                 reply_word_count: int = len(reply_words)
-                logger.debug(f"Word count for reply calculated: {reply_word_count} word(s)")
+                logger.debug(
+                    "Word count for reply calculated: %s word(s)",
+                    reply_word_count)
                 
                 # Adds word count of reply to total word count of thread
                 num_words += reply_word_count
             
             except Exception as error:
-                logger.error(f"Error finding 'post_content' in reply: {error}")
+                logger.error(
+                    "Error finding 'post_content' in reply: %s", error)
                 raise KeyError(f"Error finding 'post_content' in reply: {error}")
 
         return num_words
@@ -107,18 +121,21 @@ class SnapshotMetaGenerator:
         try:
             original_post_id: str = self.original_post["post_id"]
             all_post_ids.add(original_post_id)
-            logger.debug(f"Original post ID {original_post_id} added to all_post_ids set.")
+            logger.debug(
+                "Original post ID %s added to all_post_ids set.",
+                original_post_id)
         except Exception as error:
-            logger.error(f"Error finding 'post_id' in original post: {error}")
+            logger.error("Error finding 'post_id' in original post: %s", error)
             raise KeyError(f"Error finding 'post_id' in original post: {error}")
 
         for reply in self.replies.values():
             try:
                 reply_id: str = reply["post_id"]
                 all_post_ids.add(reply_id)
-                logger.debug(f"Reply ID {reply_id} added to all_post_ids set.")
+                logger.debug(
+                    "Reply ID %s added to all_post_ids set.", reply_id)
             except Exception as error:
-                logger.error(f"Error finding 'post_id' in reply: {error}")
+                logger.error("Error finding 'post_id' in reply: %s", error)
                 raise KeyError(f"Error finding 'post_id' in reply: {error}")
 
         return all_post_ids
@@ -137,9 +154,12 @@ class SnapshotMetaGenerator:
         try:
             original_post_date_posted = self.original_post["date_posted"]
             all_post_dates.add(original_post_date_posted)
-            logger.debug(f"OP post date {original_post_date_posted} added to all_post_dates set.")
+            logger.debug(
+                "OP post date %s added to all_post_dates set.",
+                original_post_date_posted)
         except Exception as error:
-            logger.error(f"Error finding 'date_posted' in original post: {error}")
+            logger.error(
+                "Error finding 'date_posted' in original post: %s", error)
             raise KeyError(f"Error finding 'date_posted' in original post: {error}")
 
         # Adds post date of all replies to all_post_dates set
@@ -148,7 +168,7 @@ class SnapshotMetaGenerator:
                 reply_date_posted = reply["date_posted"]
                 all_post_dates.add(reply_date_posted)
             except Exception as error:
-                logger.error(f"Error finding 'date_posted' in reply: {error}")
+                logger.error("Error finding 'date_posted' in reply: %s", error)
                 raise KeyError(f"Error finding 'date_posted' in reply: {error}")
         return all_post_dates
 
@@ -156,8 +176,8 @@ class SnapshotMetaGenerator:
         """Dumps thread metadata into a JSON file.
         """
         meta: dict = self._generate_meta()
-        with open(self.meta_file_path, "w", encoding="utf-8") as f:
-            json.dump(meta, f, indent=2, ensure_ascii=False)
+        self.metadata: dict = meta
+        codec.dump(meta, self.meta_file_path, machine_only=True)
     
     def get_path(self) -> str:
         """Currently unused."""
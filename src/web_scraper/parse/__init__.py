@@ -1,3 +1,27 @@
-from .HTMLToContent.ChanToContent import ChanToContent
-from .HTMLToContent.exceptions import *
-from .MasterTextGenerator import *
\ No newline at end of file
+"""Parsers and generators of the scraped data.
+
+The parsers (and their exceptions) are imported from here only once they're
+first used, so that importing a lightweight submodule (e.g. `codec`, or the
+site meta generator) doesn't load bs4 and the parsers along with it.
+"""
+import importlib
+
+# Names re-exported from here -> the submodule they're defined in
+_LAZY_IMPORTS: dict[str, str] = {
+    "ChanToContent": ".HTMLToContent.ChanToContent",
+    "BoardNameAndTitleNotFoundError": ".HTMLToContent.exceptions",
+    "BoardNameAndTitleUnsupportedError": ".HTMLToContent.exceptions",
+    "DateNotFoundError": ".HTMLToContent.exceptions",
+    "TagNotFoundError": ".HTMLToContent.exceptions",
+    "ContentInitError": ".HTMLToContent.exceptions",
+    "DataArrangementError": ".HTMLToContent.exceptions",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(
+        importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,102 @@
+"""JSON codec used to read and write the scraper's JSON files.
+
+The backend is chosen with the `WEB_SCRAPER_JSON_BACKEND` environment
+variable: `json` (the standard library, default), `orjson` or `msgspec`. If
+the chosen backend isn't installed, the standard library is used instead.
+
+Files only ever read by the scraper itself (snapshot content, snapshot meta
+and source JSONs) are written without indentation if
+`WEB_SCRAPER_COMPACT_JSON` is set to `1`. Master files, site meta and
+portioned token data are always indented, so they stay human-readable.
+
+Every backend writes UTF-8 without escaping non-ASCII characters. orjson can
+only indent by 2 spaces, so it does so whatever indent is asked for.
+"""
+# Imports
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+BACKEND_VARIABLE: str = "WEB_SCRAPER_JSON_BACKEND"
+COMPACT_VARIABLE: str = "WEB_SCRAPER_COMPACT_JSON"
+
+
+def _select_backend(name: str) -> str:
+    """Returns the name of the backend to use, if it can be imported."""
+    if name in ("orjson", "msgspec"):
+        try:
+            __import__(name)
+            return name
+        except ImportError:
+            logger.warning(
+                f"JSON backend {name} isn't installed; using json instead")
+    elif name != "json":
+        logger.warning(f"Unknown JSON backend {name}; using json instead")
+    return "json"
+
+
+BACKEND: str = _select_backend(os.environ.get(BACKEND_VARIABLE, "json"))
+COMPACT: bool = os.environ.get(COMPACT_VARIABLE, "0") == "1"
+
+# Errors raised when a file can't be decoded (orjson's subclass json's)
+DecodeError: tuple[type[Exception], ...] = (json.JSONDecodeError,)
+if BACKEND == "orjson":
+    import orjson
+elif BACKEND == "msgspec":
+    import msgspec
+    DecodeError += (msgspec.DecodeError,)
+
+
+def loads(data: bytes | str):
+    """Decodes JSON from bytes or a string."""
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent: int | None = 2) -> bytes:
+    """Encodes an object as UTF-8 JSON.
+
+    Args:
+        obj: Object to encode.
+        indent (int): Indentation, or None for compact JSON.
+    """
+    if BACKEND == "orjson":
+        return orjson.dumps(
+            obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if BACKEND == "msgspec":
+        encoded: bytes = msgspec.json.encode(obj)
+        if indent:
+            return msgspec.json.format(encoded, indent=indent)
+        return encoded
+    separators: tuple[str] | None = None if indent else (",", ":")
+    return json.dumps(
+        obj, indent=indent, ensure_ascii=False,
+        separators=separators).encode("utf-8")
+
+
+def load(file_path: str):
+    """Reads and decodes a JSON file."""
+    with open(file_path, "rb") as file:
+        return loads(file.read())
+
+
+def dump(
+        obj, file_path: str, indent: int = 2,
+        machine_only: bool = False) -> None:
+    """Encodes an object and writes it out to a JSON file.
+
+    Args:
+        obj: Object to encode.
+        file_path (str): Path to write to.
+        indent (int): Indentation used unless written compactly.
+        machine_only (bool): Whether the file is only read by the scraper
+            itself, in which case it's written compactly in compact mode.
+    """
+    encoded: bytes = dumps(obj, None if machine_only and COMPACT else indent)
+    with open(file_path, "wb") as file:
+        file.write(encoded)
@@ -0,0 +1,80 @@
+"""Append-only stream of newly seen posts, per site and per day.
+
+When `"post_stream": true` is set in a site's parameters file, the scrape
+drivers append every post first seen in a scan to
+`./data/streams/<site_name>/<scan date>.jsonl`, one JSON object per line:
+
+```
+{"post_id": ..., "thread_id": ..., "site": ..., "date_posted": ...,
+ "content": ..., "replied_to_ids": [...]}
+```
+
+A new file is started each day. With `"post_stream_compress": true`, files
+are gzipped (`<scan date>.jsonl.gz`); each append is its own gzip member,
+which `gzip`/`zcat` read back as a single stream.
+"""
+# Imports
+import gzip
+import os
+
+from . import codec
+
+STREAM_DIR: str = os.path.join("./data", "streams")
+
+
+def post_to_record(post: dict, thread_id: str, site_name: str) -> dict:
+    """Returns the stream record of a post.
+
+    Args:
+        post (dict): Post data, as in snapshot content.
+        thread_id (str): ID of the thread the post belongs to.
+        site_name (str): Name of the site data folder.
+    """
+    return {
+        "post_id": post.get("post_id"),
+        "thread_id": thread_id,
+        "site": site_name,
+        "date_posted": post.get("date_posted"),
+        "content": post.get("post_content"),
+        "replied_to_ids": post.get("replied_to_ids", []),
+    }
+
+
+def append_new_posts(
+        site_name: str, thread_id: str, posts: list[dict], scan_time: str,
+        compress: bool = False, stream_dir: str = STREAM_DIR) -> str | None:
+    """Appends newly seen posts to the site's stream for the scan's day.
+
+    The posts are written with a single append, so a reader tailing the
+    file never sees part of a thread's posts.
+
+    Args:
+        site_name (str): Name of the site data folder.
+        thread_id (str): ID of the thread the posts belong to.
+        posts (list[dict]): Posts first seen in this scan.
+        scan_time (str): ISO scan time; its date names the stream file.
+        compress (bool): Whether the stream file is gzipped.
+        stream_dir (str): Directory holding every site's stream.
+
+    Returns:
+        The path of the stream file appended to, or None if there were no
+        posts.
+    """
+    if not posts:
+        return None
+
+    site_stream_dir: str = os.path.join(stream_dir, site_name)
+    os.makedirs(site_stream_dir, exist_ok=True)
+    stream_path: str = os.path.join(site_stream_dir, f"{scan_time[:10]}.jsonl")
+    lines: bytes = b"".join(
+        codec.dumps(post_to_record(post, thread_id, site_name), None) + b"\n"
+        for post in posts)
+
+    if compress:
+        stream_path += ".gz"
+        with gzip.open(stream_path, "ab") as file:
+            file.write(lines)
+    else:
+        with open(stream_path, "ab") as file:
+            file.write(lines)
+    return stream_path
@@ -0,0 +1,392 @@
+"""Delta storage for snapshot content files.
+
+A full snapshot content file repeats every post seen in the thread at the time
+of the scan. A delta content file (`"snapshot_format": "delta"`) instead only
+stores the posts which were added or changed since the snapshots before it,
+along with the IDs of every post present at the time of the scan:
+
+```
+{
+    "board_name": ..., "thread_title": ..., "thread_id": ..., "url": ...,
+    "date_published": ..., "date_updated": ..., "date_scraped": ...,
+    "snapshot_format": "delta",
+    "base_snapshot": "<scan time of the previous snapshot>",
+    "original_post": {...},
+    "added_posts": {"reply_<id>": {...}, ...},
+    "changed_posts": {"reply_<id>": {...}, ...},
+    "present_post_ids": ["<op id>", "<reply id>", ...]
+}
+```
+
+Deltas are taken against the latest version of every post seen in the earlier
+snapshots of the thread, so a full snapshot can always be rebuilt by replaying
+the thread's snapshots in scan-time order. Delta content files keep the
+`content_{thread_id}.json` name, so nothing searching for content files needs
+to change.
+
+So that writing (and then reading back) a thread's latest snapshot doesn't
+mean replaying every snapshot before it, the latest version of every post as
+of the latest snapshot is kept in the thread folder as
+`delta_base_{thread_id}.json`:
+
+```
+{"snapshot": "<scan time>", "replies": {"reply_<id>": {...}, ...}}
+```
+
+It's only trusted if it was written after the content file of that snapshot;
+otherwise (e.g. once a reparse has rewritten the snapshot) the thread is
+replayed as before, and the base state is written afresh.
+"""
+# Imports
+import argparse
+import glob
+import logging
+import os
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+DELTA_FORMAT: str = "delta"
+
+# Keys shared between full and delta snapshot content files
+HEADER_KEYS: tuple[str] = (
+    "board_name",
+    "thread_title",
+    "thread_id",
+    "url",
+    "date_published",
+    "date_updated",
+    "date_scraped",
+)
+
+
+def is_delta(content: dict) -> bool:
+    """Returns True if the passed snapshot content is in delta format."""
+    return content.get("snapshot_format") == DELTA_FORMAT
+
+
+def make_delta(content: dict, seen_replies: dict, base_snapshot: str) -> dict:
+    """Converts full snapshot content into a delta.
+
+    Args:
+        content (dict): Full snapshot content.
+        seen_replies (dict): Latest version of every reply seen in the
+            earlier snapshots of the thread, keyed as in `content["replies"]`.
+        base_snapshot (str): Scan time of the previous snapshot.
+
+    Returns:
+        The snapshot content in delta format.
+    """
+    added_posts: dict = {}
+    changed_posts: dict = {}
+    for reply_key, reply in content["replies"].items():
+        if reply_key not in seen_replies:
+            added_posts[reply_key] = reply
+        elif seen_replies[reply_key] != reply:
+            changed_posts[reply_key] = reply
+
+    present_post_ids: list[str] = [content["original_post"]["post_id"]]
+    present_post_ids.extend(
+        reply["post_id"] for reply in content["replies"].values())
+
+    delta: dict = {key: content[key] for key in HEADER_KEYS}
+    delta.update({
+        "snapshot_format": DELTA_FORMAT,
+        "base_snapshot": base_snapshot,
+        "original_post": content["original_post"],
+        "added_posts": added_posts,
+        "changed_posts": changed_posts,
+        "present_post_ids": present_post_ids,
+    })
+    return delta
+
+
+def apply_snapshot(content: dict, seen_replies: dict) -> dict:
+    """Replays a (full or delta) snapshot, returning it in full.
+
+    `seen_replies` is updated in place with the snapshot's posts, so that
+    it can be passed along to the next snapshot of the thread.
+
+    Args:
+        content (dict): Snapshot content in either format.
+        seen_replies (dict): Latest version of every reply seen in the
+            earlier snapshots of the thread.
+
+    Returns:
+        The snapshot content in full format.
+    """
+    if not is_delta(content):
+        seen_replies.update(content["replies"])
+        return content
+
+    seen_replies.update(content["added_posts"])
+    seen_replies.update(content["changed_posts"])
+
+    # Rebuild replies in the order they were present in the snapshot
+    reply_keys_by_id: dict[str, str] = {
+        reply["post_id"]: reply_key
+        for reply_key, reply in seen_replies.items()}
+    replies: dict = {}
+    for post_id in content["present_post_ids"][1:]:
+        reply_key: str = reply_keys_by_id[post_id]
+        replies[reply_key] = seen_replies[reply_key]
+
+    full_content: dict = {key: content[key] for key in HEADER_KEYS}
+    full_content.update({
+        "original_post": content["original_post"],
+        "replies": replies,
+    })
+    return full_content
+
+
+def get_thread_content_paths(thread_dir: str) -> list[str]:
+    """Returns a thread's snapshot content paths in scan-time order.
+
+    Snapshot folders are named after their ISO scan time, so sorting by
+    folder name sorts by scan time.
+
+    Args:
+        thread_dir (str): Path to the thread folder.
+    """
+    content_pattern: str = os.path.join(thread_dir, "*", "content_*.json")
+    return sorted(
+        glob.glob(content_pattern),
+        key=lambda path: os.path.basename(os.path.dirname(path)))
+
+
+def replay_thread(content_paths: list[str]):
+    """Yields `(path, full content)` for each snapshot, replaying deltas.
+
+    Args:
+        content_paths (list[str]): Snapshot content paths in scan-time order.
+    """
+    seen_replies: dict = {}
+    for content_path in content_paths:
+        content: dict = codec.load(content_path)
+        yield content_path, apply_snapshot(content, seen_replies)
+
+
+def base_state_path(thread_dir: str, thread_id: str) -> str:
+    """Returns the path of a thread's delta base state."""
+    return os.path.join(thread_dir, f"delta_base_{thread_id}.json")
+
+
+def load_base_state(
+        thread_dir: str, thread_id: str, snapshot: str) -> dict | None:
+    """Returns the latest version of every reply as of a snapshot, if the
+    thread's delta base state holds them.
+
+    Args:
+        thread_dir (str): Path to the thread folder.
+        thread_id (str): Thread number.
+        snapshot (str): Scan time of the snapshot the state must be as of.
+
+    Returns:
+        The replies, keyed as in full snapshot content, or None if the base
+        state is missing, is of another snapshot, or is older than that
+        snapshot's content file.
+    """
+    state_path: str = base_state_path(thread_dir, thread_id)
+    content_path: str = os.path.join(
+        thread_dir, snapshot, f"content_{thread_id}.json")
+    try:
+        if os.path.getmtime(state_path) < os.path.getmtime(content_path):
+            return None
+        state: dict = codec.load(state_path)
+    except (OSError, *codec.DecodeError):
+        return None
+    if state.get("snapshot") != snapshot:
+        return None
+    return state["replies"]
+
+
+def save_base_state(
+        thread_dir: str, thread_id: str, snapshot: str,
+        seen_replies: dict) -> None:
+    """Stores the latest version of every reply as of a snapshot.
+
+    Should be called once the snapshot's content file has been written.
+
+    Args:
+        thread_dir (str): Path to the thread folder.
+        thread_id (str): Thread number.
+        snapshot (str): Scan time of the snapshot.
+        seen_replies (dict): Latest version of every reply seen up to and
+            including the snapshot.
+    """
+    codec.dump(
+        {"snapshot": snapshot, "replies": seen_replies},
+        base_state_path(thread_dir, thread_id),
+        machine_only=True)
+
+
+def load_full_content(content_path: str) -> dict:
+    """Loads a snapshot content file, rebuilding it in full if it's a delta.
+
+    Args:
+        content_path (str): Path to a snapshot content file.
+    """
+    content: dict = codec.load(content_path)
+    if not is_delta(content):
+        return content
+
+    snapshot_dir: str = os.path.dirname(content_path)
+    thread_dir: str = os.path.dirname(snapshot_dir)
+    scan_time: str = os.path.basename(snapshot_dir)
+    thread_id: str = str(content["thread_id"])
+
+    # The base state, as of either this snapshot or the one before it, is
+    # enough to rebuild this one
+    for snapshot in (scan_time, content["base_snapshot"]):
+        seen_replies: dict | None = load_base_state(
+            thread_dir, thread_id, snapshot)
+        if seen_replies is not None:
+            return apply_snapshot(content, seen_replies)
+
+    # Otherwise, replay every snapshot of the thread up to and including it
+    content_paths: list[str] = [
+        path for path in get_thread_content_paths(thread_dir)
+        if os.path.basename(os.path.dirname(path)) <= scan_time]
+    full_content: dict = content
+    for _, full_content in replay_thread(content_paths):
+        pass
+    return full_content
+
+
+def write_snapshot_content(
+        data: dict, date_scraped: str, thread_id: str, start_path: str,
+        delta: bool = False) -> str:
+    """Writes out snapshot content, in delta format if requested.
+
+    Files are written to the same path as `snapshot_dict_to_json()`:
+    `f"{start_path}/{thread_id}/{date_scraped}/content_{thread_id}.json"`.
+    The first snapshot of a thread is always written in full. Deltas are
+    taken against the thread's base state where it's up to date, so only
+    the thread's earlier snapshots are replayed otherwise.
+
+    Args:
+        data (dict): Full snapshot content.
+        date_scraped (str): Date scraped.
+        thread_id (str): Thread number.
+        start_path (str): The directory for the data.
+        delta (bool): Whether the content should be written as a delta.
+
+    Returns:
+        The path of the written content file.
+    """
+    thread_dir: str = os.path.join(start_path, str(thread_id))
+    snapshot_dir: str = os.path.join(thread_dir, date_scraped)
+    content_path: str = os.path.join(snapshot_dir, f"content_{thread_id}.json")
+
+    content: dict = data
+    seen_replies: dict | None = None
+    if delta:
+        earlier_paths: list[str] = [
+            path for path in get_thread_content_paths(thread_dir)
+            if os.path.basename(os.path.dirname(path)) < date_scraped]
+        if earlier_paths:
+            base_snapshot: str = os.path.basename(
+                os.path.dirname(earlier_paths[-1]))
+            seen_replies = load_base_state(
+                thread_dir, str(thread_id), base_snapshot)
+            if seen_replies is None:
+                seen_replies = {}
+                for path in earlier_paths:
+                    apply_snapshot(codec.load(path), seen_replies)
+            content = make_delta(data, seen_replies, base_snapshot)
+        else:
+            seen_replies = {}
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    codec.dump(content, content_path, indent=4, machine_only=True)
+    if seen_replies is not None:
+        seen_replies.update(data["replies"])
+        save_base_state(
+            thread_dir, str(thread_id), date_scraped, seen_replies)
+    return content_path
+
+
+def convert_thread(thread_dir: str, to_delta: bool = True) -> int:
+    """Converts every snapshot content file in a thread to/from deltas.
+
+    The first snapshot of a thread is always kept in full.
+
+    Args:
+        thread_dir (str): Path to the thread folder.
+        to_delta (bool): Convert to deltas if True, rebuild in full otherwise.
+
+    Returns:
+        The number of content files rewritten.
+    """
+    content_paths: list[str] = get_thread_content_paths(thread_dir)
+    # Every snapshot is rebuilt before any are rewritten
+    full_contents: list[tuple[str, dict]] = list(replay_thread(content_paths))
+
+    num_rewritten: int = 0
+    seen_replies: dict = {}
+    previous_scan_time: str = ""
+    for i, (content_path, full_content) in enumerate(full_contents):
+        stored_as_delta: bool = is_delta(codec.load(content_path))
+
+        content: dict | None = None
+        if to_delta and i > 0:
+            content = make_delta(
+                full_content, seen_replies, previous_scan_time)
+        elif stored_as_delta:
+            content = full_content
+
+        if content is not None:
+            codec.dump(content, content_path, indent=4, machine_only=True)
+            num_rewritten += 1
+
+        seen_replies.update(full_content["replies"])
+        previous_scan_time = os.path.basename(os.path.dirname(content_path))
+
+    # Rewritten snapshots may hold other versions of posts than the base state
+    if to_delta and full_contents:
+        save_base_state(
+            thread_dir, os.path.basename(thread_dir), previous_scan_time,
+            seen_replies)
+    return num_rewritten
+
+
+def convert_site(site_name: str, to_delta: bool = True) -> None:
+    """Converts every thread in a site's data subfolder to/from deltas.
+
+    Args:
+        site_name (str): Name of the site data folder.
+        to_delta (bool): Convert to deltas if True, rebuild in full otherwise.
+    """
+    site_dir: str = os.path.join("./data", site_name)
+    num_rewritten: int = 0
+    for thread_folder in os.listdir(site_dir):
+        thread_dir: str = os.path.join(site_dir, thread_folder)
+        if not os.path.isdir(thread_dir):
+            continue
+        try:
+            num_rewritten += convert_thread(thread_dir, to_delta)
+        except (KeyError, *codec.DecodeError) as error:
+            logger.error(f"Error while converting {thread_dir}: {error}")
+    logger.info(
+        f"{num_rewritten} snapshot content files rewritten for {site_name}")
+
+
+if __name__ == "__main__":  # used to run script as executable
+    parser = argparse.ArgumentParser(
+        description=(
+            "Converts a site's snapshot content files to delta format, "
+            "or rebuilds them in full."))
+    parser.add_argument(
+        "mode",
+        choices=["delta", "full"],
+        help="`delta` to convert to deltas, `full` to rebuild in full.",
+    )
+    parser.add_argument(
+        "site_name",
+        type=str,
+        help="Name of the site data folder",
+    )
+    args = parser.parse_args()
+
+    convert_site(args.site_name, to_delta=(args.mode == "delta"))
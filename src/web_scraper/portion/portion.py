@@ -7,12 +7,35 @@ import math  # Used to get ceiling of how many threads should be duplicated
 import os
 import random
 import shutil  # Used for copying
+import sys
 
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from web_scraper.parse import codec
+from web_scraper.parse.SiteIndex import SiteIndex, open_site_index
 from web_scraper.portion.token_data import TokenDataGenerator
+from web_scraper.profiling import profile_run
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where files are linked
+    fcntl = None
+
+# ioctl request cloning a file on Linux filesystems supporting reflinks
+FICLONE: int = 0x40049409
+# Number of threads linking/copying portioned text files at once
+MATERIALISE_WORKERS: int = 8
+
+STRATA: tuple[str] = ("board", "month", "posts")
 
 def random_portion_out(
-        site_params: list[dict], por_dir: str, percentage: int):
+        site_params: list[dict], por_dir: str, percentage: int,
+        seed: int | None = None, strata: list[str] | None = None,
+        min_posts: int | None = None, published_after: str | None = None,
+        published_before: str | None = None):
     """Portions out a random collection of TXT files from all sites passed.
     
     For every parameter file corresponding to a (scraped) site in 
@@ -21,13 +44,31 @@ def random_portion_out(
 
     The default percentage of threads portioned from each site is 10%.
 
+    If strata or filters are passed, threads are instead chosen from the
+    site index's thread summaries (see `SiteIndex.thread_summaries()`), so
+    no thread files are opened to pick them. Only threads matching the
+    filters are drawn, and the percentage is of those threads. Threads are
+    drawn from each stratum in turn, so every stratum is represented as
+    evenly as its threads allow.
+
     Args:
         site_params (list[dict]): List of parameter file dictionaries.
         por_dir (str): The directory portioned files should be copied into.
         percentage (int): Percentage of threads to portion out from each site.
+        seed (int): Seed for the random draw, so a portion can be reproduced
+            (given the same data and portion logs).
+        strata (list[str]): What to stratify threads by, out of `board`,
+            `month` (of publishing) and `posts` (an order-of-magnitude
+            bucket of their number of unique posts).
+        min_posts (int): Minimum number of unique posts of a thread.
+        published_after (str): Earliest publishing date of a thread, as an
+            ISO date or prefix of one (e.g. `2024-05`).
+        published_before (str): Latest publishing date of a thread, as an
+            ISO date or prefix of one (inclusive).
     """
     logger = logging.getLogger(__name__)
     portion_time: str = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")
+    rng: random.Random = random.Random(seed)
     try:
         # First create the directories for the all sites where duplicates will go
         _make_site_directories(site_params, por_dir)
@@ -48,65 +89,94 @@ def random_portion_out(
         logger.debug(
             "Thread IDs which have been used have been collected")
 
+        thread_filters: dict = {
+            "min_posts": min_posts,
+            "published_after": published_after,
+            "published_before": published_before,
+        }
+        stratified: bool = bool(strata) or any(
+            value is not None for value in thread_filters.values())
+
         # Get the number of threads that should be duplicated for each site
-        num_threads_to_duplicate: dict[str, int] = (
-            _get_num_threads_to_duplicate(
-                site_params, por_dir, percentage))
+        # (a stratified draw counts the threads matching its filters instead)
+        num_threads_to_duplicate: dict[str, int] = {}
+        if not stratified:
+            num_threads_to_duplicate = _get_num_threads_to_duplicate(
+                site_params, por_dir, percentage)
         # They are collected per site
         logger.debug(
             "Number of threads to duplicate per site have been collected")
 
         # Finally, for each site we're portioning from
         for params in site_params:
-            successful_duplications: int = 0
             duplicated_thread_ids: list[str] = []
-            while (  # While threads still need to be duplicated
-                successful_duplications < 
-                num_threads_to_duplicate[params["site_name"]]):
-                # Get a random thread folder from the site
-                random_thread_id = random.choice(
-                    os.listdir(params["site_dir"]))
+            master_text_paths: list[str] = []
+            if stratified:
+                num_to_duplicate, draw = _draw_stratified_thread_ids(
+                    params, threads_portioned_prior[params["site_name"]],
+                    percentage, rng, strata or [], thread_filters)
+            else:
+                num_to_duplicate = num_threads_to_duplicate[
+                    params["site_name"]]
+                # The site folder is listed once; threads portioned out
+                # before (and folders which aren't threads) are never drawn
+                draw = _draw_without_replacement(
+                    _get_eligible_thread_ids(
+                        params, threads_portioned_prior[params["site_name"]]),
+                    rng)
+            for random_thread_id in draw:
+                if len(duplicated_thread_ids) >= num_to_duplicate:
+                    break
                 random_thread_dir = os.path.join(
                     params["site_dir"], random_thread_id)
+                master_text_path: str = _get_a_master_text(random_thread_dir)
+                if master_text_path is None:
+                    continue #proceed to next random generated thread
+                # Its text would otherwise be portioned without token data
+                if not _has_token_data(random_thread_dir):
+                    logger.warning(
+                        f"Skipping {random_thread_dir}: no master content "
+                        "or board name for its token data")
+                    continue
+
+                logger.debug(f"Portioning {random_thread_dir}")
+                master_text_paths.append(master_text_path)
+                duplicated_thread_ids.append(random_thread_id)
+
+            # The original text files are linked (or copied) over to the
+            # directory for the current round of portioning
+            current_portion_site_path: str = (
+                current_directories[params["site_name"]])
+            with ThreadPoolExecutor(MATERIALISE_WORKERS) as executor:
+                methods: list[str] = list(executor.map(
+                    partial(
+                        _materialise,
+                        destination_dir=current_portion_site_path),
+                    master_text_paths))
+            logger.debug(
+                f"Text files portioned from {params["site_name"]} by: "
+                f"{dict(Counter(methods))}")
+
+            # The token data of every duplicated thread is built and
+            # written once, after the draw
+            if duplicated_thread_ids:
+                token_data_path: str = os.path.join(
+                    current_directories[params["site_name"]],
+                    f"{params["site_name"]}_token_data.json")
+                data_for_tokenization: TokenDataGenerator = TokenDataGenerator(
+                    params["site_dir"], 
+                    duplicated_thread_ids,
+                    token_data_path)
+                token_data: dict = data_for_tokenization.generate_portion_json()
                 
-                # TODO: Add behavior for when there are no more 
-                # TODO: new threads available. Current code
-                # TODO: results in endless loop
-
-                # If the thread ID hasn't been portioned before
-                if random_thread_id not in (
-                    threads_portioned_prior[params["site_name"]]) and (
-                        random_thread_id not in duplicated_thread_ids):
-                    # TODO: This should be a method...
-                    if ("meta" not in random_thread_id) and (  
-                        random_thread_id[0] != ".") and (
-                            "logs" not in random_thread_id) and (
-                                "processed" not in random_thread_id): 
-                        # Copy the file over
-                        print(random_thread_dir)
-                        master_text_path: str = _get_a_master_text(
-                            random_thread_dir)
-                        if master_text_path is None:
-                            continue #proceed to next random generated thread
-                        else: 
-                            current_portion_site_path: str = (
-                                current_directories[params["site_name"]])
-                            # The original text file to the directory 
-                            # for the current round of portioning
-                            shutil.copy(master_text_path, current_portion_site_path)
-
-                            duplicated_thread_ids.append(random_thread_id)
-                            successful_duplications += 1
-
-                            token_data_path: str = os.path.join(current_portion_site_path, f"{params["site_name"]}_token_data.json")
-                            data_for_tokenization: TokenDataGenerator = TokenDataGenerator(
-                                params["site_dir"], 
-                                duplicated_thread_ids,
-                                token_data_path)
-                            token_data: dict = data_for_tokenization.generate_portion_json()
-                            
-                            with open(token_data_path, "w") as json_file:
-                                json.dump(token_data, json_file, indent=4)
+                codec.dump(token_data, token_data_path, indent=4)
+
+            if len(duplicated_thread_ids) < num_to_duplicate:
+                logger.warning(
+                    f"Only {len(duplicated_thread_ids)} of "
+                    f"{num_to_duplicate} threads could be portioned out "
+                    f"from {params["site_name"]}; no other threads with a "
+                    "master text are left to portion")
 
             # And at last, write the duplicated IDs into site's portion log
             # "These thread IDs has now been duplicated for this site"
@@ -227,19 +297,175 @@ def _get_num_threads_to_duplicate(
             site_meta: str = f"{params["site_name"]}_meta.json"
             site_meta_path: str = os.path.join(params["site_dir"], site_meta)
             
-            with open(site_meta_path, "r") as file:
-                site_meta_data = json.load(file)
-                # Multiply the number of threads for a site by percentage
-                num_to_duplicate: int = math.ceil(
-                    site_meta_data["num_sitewide_threads"] * 
-                    (percentage / 100))
-                num_threads_to_duplicate[params["site_name"]] = (
-                    num_to_duplicate)
+            site_meta_data = codec.load(site_meta_path)
+            # Multiply the number of threads for a site by percentage
+            num_to_duplicate: int = math.ceil(
+                site_meta_data["num_sitewide_threads"] * 
+                (percentage / 100))
+            num_threads_to_duplicate[params["site_name"]] = (
+                num_to_duplicate)
         return num_threads_to_duplicate
     except Exception as error:
         raise Exception(
             f"Error while getting number of threads to duplicate: {error}")
 
+def _is_thread_folder(folder_name: str) -> bool:
+    """Returns False for site folder entries which aren't thread folders."""
+    return (
+        "meta" not in folder_name
+        and folder_name[0] != "."
+        and "logs" not in folder_name
+        and "processed" not in folder_name)
+
+def _get_eligible_thread_ids(
+        params: dict, thread_ids_portioned_prior: list[str]) -> list[str]:
+    """Lists a site's thread folders which haven't been portioned out yet.
+
+    Sorted, so that a seeded draw from them can be reproduced.
+    """
+    portioned_prior: set[str] = set(thread_ids_portioned_prior)
+    return sorted(
+        entry.name for entry in os.scandir(params["site_dir"])
+        if entry.is_dir() and _is_thread_folder(entry.name)
+        and entry.name not in portioned_prior)
+
+def _draw_without_replacement(population: list, rng: random.Random):
+    """Yields a population's items in random order, drawing them lazily.
+
+    A partial Fisher-Yates shuffle: each draw is O(1), so drawing k items
+    (plus any that get rejected) never touches the rest of the population.
+    """
+    pool: list = list(population)
+    for i in range(len(pool)):
+        j: int = rng.randrange(i, len(pool))
+        pool[i], pool[j] = pool[j], pool[i]
+        yield pool[i]
+
+def _post_count_bucket(num_posts: int) -> str:
+    """Returns the order-of-magnitude bucket of a number of posts."""
+    if num_posts < 1:
+        return "0"
+    lower: int = 10 ** (len(str(num_posts)) - 1)
+    return f"{lower}-{lower * 10 - 1}"
+
+def _stratum(summary: dict, strata: list[str]) -> tuple:
+    """Returns the stratum of a thread summary."""
+    values: dict[str, str] = {
+        "board": summary["board_name"] or "",
+        "month": (summary["date_published"] or "")[:7],
+        "posts": _post_count_bucket(summary["num_unique_post_ids"] or 0),
+    }
+    return tuple(values[stratum] for stratum in strata)
+
+def _matches_filters(
+        summary: dict, min_posts: int | None = None,
+        published_after: str | None = None,
+        published_before: str | None = None) -> bool:
+    """Returns True if a thread summary passes every filter set."""
+    num_posts: int = summary["num_unique_post_ids"] or 0
+    date_published: str = summary["date_published"] or ""
+    if min_posts is not None and num_posts < min_posts:
+        return False
+    if published_after is not None and date_published < published_after:
+        return False
+    # Compared by prefix, so the whole day/month passed is included
+    if (published_before is not None
+            and date_published[:len(published_before)] > published_before):
+        return False
+    return True
+
+def _draw_stratified_thread_ids(
+        params: dict, thread_ids_portioned_prior: list[str],
+        percentage: int, rng: random.Random, strata: list[str],
+        thread_filters: dict) -> tuple[int, Iterator[str]]:
+    """Draws a site's thread IDs from each of their strata in turn.
+
+    Returns:
+        The number of threads to duplicate (the percentage of threads
+        matching the filters) and the thread IDs in the order drawn.
+    """
+    site_index: SiteIndex = open_site_index(params["site_dir"])
+    matching: list[dict] = [
+        summary for summary in site_index.thread_summaries()
+        if _matches_filters(summary, **thread_filters)]
+    num_to_duplicate: int = math.ceil(len(matching) * (percentage / 100))
+
+    portioned_prior: set[str] = set(thread_ids_portioned_prior)
+    by_stratum: dict[tuple, list[str]] = {}
+    for summary in matching:
+        if summary["thread_id"] not in portioned_prior:
+            by_stratum.setdefault(
+                _stratum(summary, strata), []).append(summary["thread_id"])
+    logging.getLogger(__name__).info(
+        f"{len(matching)} threads of {params["site_name"]} match the "
+        f"filters, across {len(by_stratum)} strata")
+    return num_to_duplicate, _draw_round_robin(
+        [by_stratum[stratum] for stratum in sorted(by_stratum)], rng)
+
+def _draw_round_robin(
+        populations: list[list], rng: random.Random) -> Iterator:
+    """Yields an item drawn from each population in turn, at random.
+
+    The order the populations are visited in is random too, so none is
+    favoured when the draw stops partway through a round. Populations
+    drop out once every item has been drawn from them.
+    """
+    draws: list[Iterator] = [
+        _draw_without_replacement(population, rng)
+        for population in populations]
+    rng.shuffle(draws)
+    while draws:
+        remaining: list[Iterator] = []
+        for draw in draws:
+            item = next(draw, None)
+            if item is not None:
+                remaining.append(draw)
+                yield item
+        draws = remaining
+
+def _reflink(source: str, destination: str) -> bool:
+    """Clones a file copy-on-write, if the filesystem supports it.
+
+    Returns:
+        True if the file was cloned, False if it has to be copied instead.
+    """
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        with (open(source, "rb") as source_file,
+              open(destination, "wb") as destination_file):
+            fcntl.ioctl(
+                destination_file.fileno(), FICLONE, source_file.fileno())
+        return True
+    except OSError:
+        # Not supported (or across filesystems); the empty file is removed
+        try:
+            os.remove(destination)
+        except OSError:
+            pass
+        return False
+
+def _materialise(source: str, destination_dir: str) -> str:
+    """Puts a file into a directory without copying its data, if possible.
+
+    A reflink (a copy-on-write clone) is tried first, then a hardlink, and
+    the file is only copied if neither is possible. Master text files are
+    replaced rather than rewritten in place, so a hardlinked portion keeps
+    the text as it was when portioned.
+
+    Returns:
+        How the file was put there: `reflink`, `hardlink` or `copy`.
+    """
+    destination: str = os.path.join(destination_dir, os.path.basename(source))
+    if _reflink(source, destination):
+        return "reflink"
+    try:
+        os.link(source, destination)
+        return "hardlink"
+    except OSError:
+        shutil.copy(source, destination)
+        return "copy"
+
 def _get_a_master_text(random_thread_dir: str) -> str:
     """Gets a path for a unspecified master text file in a thread directory.
     
@@ -250,17 +476,24 @@ def _get_a_master_text(random_thread_dir: str) -> str:
         Exception: Generic exception for unanticipated errors.
     """
     try:
-        master_text_pattern: str = os.path.join(
-            random_thread_dir, "master_text_*.txt")  # Master text file
-        # Glob returns list, even though we only expect one
-        file = glob.glob(master_text_pattern)[0]
-        return os.path.abspath(file)
+        site_index: SiteIndex = open_site_index(
+            os.path.dirname(random_thread_dir))
+        file: str | None = site_index.master_text_path(random_thread_dir)
+        return os.path.abspath(file) if file is not None else None
             
     except Exception as error:
         return None
         # raise Exception(
         #     f"Error while getting a master text file: {error}")
 
+def _has_token_data(random_thread_dir: str) -> bool:
+    """Returns whether a thread has the master content and board name its
+    token data is built from (see `TokenDataGenerator`)."""
+    site_index: SiteIndex = open_site_index(os.path.dirname(random_thread_dir))
+    return bool(
+        glob.glob(os.path.join(random_thread_dir, "master_version_*.json"))
+        and site_index.board_name(random_thread_dir) is not None)
+
 def _write_thread_ids_to_log(
         specific_params: dict, por_dir: str, thread_ids: list[str]):
     """Writes the newly duplicated thread IDs to the appropriate log.
@@ -326,15 +559,18 @@ def _get_site_params(site_name: str, params_dir: str) -> list[dict]:
         raise Exception(
             F"Error while trying to load a single site's params: {error}")
 
-if __name__ == "__main__":
+
+def main(argv: list[str] | None = None, prog: str | None = None):
+    """Portions out threads, as run from the command line."""
     # The default behavior is to collect a 10% portion from all found
     # param files
     parser = argparse.ArgumentParser(
+        prog=prog,
         description="Generate a portion of threads.")
     parser.add_argument(
         "percentage", type=int, default=10,
         nargs='?',
-        help="Percentage of threads to portion out. E.g. `10` = 10%")
+        help="Percentage of threads to portion out. E.g. `10` = 10%%")
     parser.add_argument(
         "por_dir", type=str, default=os.path.join(".", "data", "portions"),
         nargs='?',
@@ -343,18 +579,55 @@ if __name__ == "__main__":
         "site_name", type=str, default="",
         nargs='?',
         help="Name of site to portion from.")
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Seed for the random draw, so a portion can be reproduced.")
+    parser.add_argument(
+        "--stratify", nargs="+", choices=STRATA, default=None,
+        help="Draw threads evenly across strata: board, month, posts.")
+    parser.add_argument(
+        "--min-posts", type=int, default=None,
+        help="Only portion threads with at least this many unique posts.")
+    parser.add_argument(
+        "--published-after", type=str, default=None,
+        help="Only portion threads published on/after this ISO date.")
+    parser.add_argument(
+        "--published-before", type=str, default=None,
+        help="Only portion threads published on/before this ISO date.")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help=(
+            "Profile the portioning, writing the profile and a summary of "
+            "the hottest functions to ./data/logs/."))
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    draw_options: dict = {
+        "strata": args.stratify,
+        "min_posts": args.min_posts,
+        "published_after": args.published_after,
+        "published_before": args.published_before,
+    }
 
     params_dir: str = os.path.join(".", "data", "params")
 
     if not args.por_dir:  # This will be the case if everything is default
-        random_portion_out(
-            _get_all_site_params(params_dir),
-            args.por_dir,
-            args.percentage)
+        site_params: list[dict] = _get_all_site_params(params_dir)
+    else:
+        site_params = _get_site_params(args.site_name, params_dir)
+
+    if args.profile:
+        profile_run(
+            "portion", datetime.today().strftime("%Y-%m-%dT%H:%M:%S"),
+            random_portion_out, site_params, args.por_dir, args.percentage,
+            args.seed, **draw_options)
     else:
         random_portion_out(
-            _get_site_params(args.site_name, params_dir),
+            site_params,
             args.por_dir,
-            args.percentage)
\ No newline at end of file
+            args.percentage,
+            args.seed,
+            **draw_options)
+
+
+if __name__ == "__main__":  # used to run script as executable
+    main()
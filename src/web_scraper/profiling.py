@@ -0,0 +1,217 @@
+"""Profiling of a whole run, or of a single thread's trip through the parsers.
+
+`profile_run()` runs a job under a sampling profiler (pyinstrument, from the
+optional `profile` extra) when one is installed, and under cProfile
+otherwise. `profile_thread()` profiles one saved thread being parsed and
+having its masters generated, in a scratch copy of its folder so the data
+itself is left untouched.
+
+Either way, the profile and a summary of the hottest functions (by time spent
+in the function itself) are written to `./data/logs/`, named after the scan
+time and what was profiled, so they can be attached to a performance report.
+"""
+# Imports
+import cProfile
+import glob
+import logging
+import os
+import pstats
+import shutil
+import tempfile
+
+from collections import defaultdict
+from collections.abc import Callable
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # Optional; cProfile is used instead
+    Profiler = None
+
+try:  # Imported as part of the package
+    from .parse import codec
+except ImportError:  # Imported by the drivers, from within the package
+    from parse import codec
+
+logger = logging.getLogger(__name__)
+
+LOG_DIR: str = os.path.join(".", "data", "logs")
+# Number of functions listed in a profile's summary
+TOP_N: int = 30
+# Seconds between samples of the sampling profiler
+SAMPLE_INTERVAL: float = 0.001
+
+
+def profile_run(
+        label: str, scan_time_str: str, function: Callable, *args,
+        sampling: bool = True, top_n: int = TOP_N, **kwargs):
+    """Runs a function under a profiler, writing out its profile.
+
+    Args:
+        label (str): What's being profiled, used in the file names.
+        scan_time_str (str): Time of the run, used in the file names.
+        function (Callable): Function to run, with `args` and `kwargs`.
+        sampling (bool): Use the sampling profiler, if it's installed.
+        top_n (int): Number of functions listed in the summary.
+
+    Returns:
+        Whatever the function returns.
+    """
+    profile_path: str = os.path.join(LOG_DIR, f"{scan_time_str}_{label}")
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    if sampling and Profiler is not None:
+        profiler = Profiler(interval=SAMPLE_INTERVAL)
+        profiler.start()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.stop()
+            profiler.last_session.save(f"{profile_path}.pyisession")
+            _write_summary(
+                f"{profile_path}.txt",
+                _sampled_hot_functions(profiler.last_session.root_frame()),
+                top_n)
+            logger.info(
+                f"Sampled profile written to {profile_path}.pyisession")
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{profile_path}.prof")
+        _write_summary(
+            f"{profile_path}.txt",
+            _cprofile_hot_functions(pstats.Stats(profiler)), top_n)
+        logger.info(f"Profile written to {profile_path}.prof")
+
+
+def profile_thread(
+        params: dict, thread_id: str, scan_time_str: str,
+        sampling: bool = True, top_n: int = TOP_N) -> None:
+    """Profiles a saved thread being parsed and having its masters generated.
+
+    Every snapshot of the thread (HTML, or source JSON for 4chan sites) is
+    parsed into content and snapshot meta, then the master content, text and
+    meta are generated from them, as a scrape or reparse would. This happens
+    in a scratch copy of the thread folder, so the profile can be rerun at
+    will.
+
+    Args:
+        params (dict): Parameters of the thread's site.
+        thread_id (str): ID of the thread (i.e. its folder name).
+        scan_time_str (str): Time of the run, used in the file names.
+        sampling (bool): Use the sampling profiler, if it's installed.
+        top_n (int): Number of functions listed in the summary.
+    """
+    thread_dir: str = os.path.join(
+        ".", "data", params["site_name"], str(thread_id))
+    if not os.path.isdir(thread_dir):
+        raise FileNotFoundError(f"No thread folder at {thread_dir}")
+
+    with tempfile.TemporaryDirectory(prefix="web_scraper_profile_") as scratch:
+        scratch_site_dir: str = os.path.join(scratch, params["site_name"])
+        scratch_thread_dir: str = os.path.join(
+            scratch_site_dir, str(thread_id))
+        shutil.copytree(thread_dir, scratch_thread_dir)
+        profile_run(
+            f"{params["site_name"]}_thread_{thread_id}", scan_time_str,
+            _process_thread, params, scratch_thread_dir, scratch_site_dir,
+            sampling=sampling, top_n=top_n)
+
+
+def _process_thread(
+        params: dict, thread_dir: str, site_dir: str) -> None:
+    """Parses a thread folder's snapshots and generates its masters."""
+    # The parsers are only loaded once a thread is profiled, so that the
+    # commands profiling a whole run (e.g. portioning) don't load bs4
+    from bs4 import BeautifulSoup
+    try:  # Imported as part of the package
+        from .parse.HTMLToContent.ChanToContent import ChanToContent
+        from .parse.JSONToContent.SourceToContent import SourceToContent
+        from .parse.MasterContentGenerator import MasterContentGenerator
+        from .parse.MasterMetaGenerator import MasterMetaGenerator
+        from .parse.MasterTextGenerator import MasterTextGenerator
+        from .parse.SnapshotMetaGenerator import SnapshotMetaGenerator
+    except ImportError:  # Imported by the drivers, from within the package
+        from parse.HTMLToContent.ChanToContent import ChanToContent
+        from parse.JSONToContent.SourceToContent import SourceToContent
+        from parse.MasterContentGenerator import MasterContentGenerator
+        from parse.MasterMetaGenerator import MasterMetaGenerator
+        from parse.MasterTextGenerator import MasterTextGenerator
+        from parse.SnapshotMetaGenerator import SnapshotMetaGenerator
+
+    fourchan: bool = "4chan_" in params["site_name"]
+    pattern: str = "source_*.json" if fourchan else "thread_*.html"
+    snapshot_paths: list[str] = sorted(
+        glob.glob(os.path.join(thread_dir, "*", pattern)))
+    if not snapshot_paths:
+        raise FileNotFoundError(f"No snapshots to parse in {thread_dir}")
+
+    content_paths: list[str] = []
+    meta_paths: list[str] = []
+    for snapshot_path in snapshot_paths:
+        snapshot_dir: str = os.path.dirname(snapshot_path)
+        scan_time: str = os.path.basename(snapshot_dir)
+        if fourchan:
+            content_parser = SourceToContent(
+                params["board_name"], codec.load(snapshot_path), scan_time)
+        else:
+            with open(snapshot_path, "r", encoding="utf-8") as file:
+                soup = BeautifulSoup(file.read(), features="html.parser")
+            content_parser = ChanToContent(
+                scan_time, soup, "", params["op_class"],
+                params["reply_class"], params["root_domain"])
+        content_path: str = os.path.join(
+            snapshot_dir, f"content_{content_parser.data["thread_id"]}.json")
+        codec.dump(content_parser.data, content_path)
+        snapshot_meta_generator = SnapshotMetaGenerator(content_path)
+        snapshot_meta_generator.meta_dump()
+        content_paths.append(content_path)
+        meta_paths.append(snapshot_meta_generator.get_path())
+
+    master_content_generator = MasterContentGenerator(content_paths)
+    master_content_generator.content_dump()
+    MasterTextGenerator(
+        master_content_generator.get_path(), site_dir).write_text()
+    MasterMetaGenerator(meta_paths).master_meta_dump()
+
+
+def _cprofile_hot_functions(stats: pstats.Stats) -> list[tuple[float, str]]:
+    """Returns (self time, function) of every function cProfile saw."""
+    return [
+        (total_time, f"{function_name} ({file_name}:{line_no})")
+        for (file_name, line_no, function_name), (_, _, total_time, _, _)
+        in stats.stats.items()]
+
+
+def _sampled_hot_functions(root_frame) -> list[tuple[float, str]]:
+    """Returns (self time, function) of every function sampled, summing the
+    time spent in each across the call tree."""
+    self_times: dict[str, float] = defaultdict(float)
+    frames: list = [root_frame] if root_frame is not None else []
+    while frames:
+        frame = frames.pop()
+        # Time spent in a function itself is sampled as synthetic children
+        # of its frame, which are counted towards the function
+        children: list = [
+            child for child in frame.children if not child.is_synthetic]
+        self_times[
+            f"{frame.function} ({frame.file_path}:{frame.line_no})"] += (
+            frame.time - sum(child.time for child in children))
+        frames.extend(children)
+    return [(self_time, function) for function, self_time
+            in self_times.items()]
+
+
+def _write_summary(
+        summary_path: str, hot_functions: list[tuple[float, str]],
+        top_n: int) -> None:
+    """Writes out the functions taking the most time in themselves."""
+    hot_functions = sorted(hot_functions, reverse=True)[:top_n]
+    with open(summary_path, "w", encoding="utf-8") as file:
+        file.write(f"Top {len(hot_functions)} functions by self time\n")
+        for self_time, function in hot_functions:
+            file.write(f"{self_time:>10.4f}s  {function}\n")
+    logger.info(f"Profile summary written to {summary_path}")
@@ -13,6 +13,9 @@ from .exceptions import SoupError, ContainerNotFoundError, NoListItemsFoundError
 
 logger = logging.getLogger(__name__)
 
+# Listing of a board's archived threads (not covered by basc_py4chan)
+ARCHIVE_URL: str = "https://a.4cdn.org/{board}/archive.json"
+
 
 class BoardScraper:
     """A tool to retrieve a list of threads that can be iterated over.
@@ -40,6 +43,55 @@ class BoardScraper:
         logger.info("Extraction complete!")
         return list_of_threads
 
+    def thread_ids(self) -> list[int]:
+        """Lists the ID of every thread on the board, without their posts.
+
+        Returns:
+            list[int]: IDs of the board's threads, from its threads endpoint.
+        """
+        logger.info("Listing the IDs of every thread on the board")
+        try:
+            thread_ids: list[int] = self.board.get_all_thread_ids()
+
+        except Exception as error:
+            logger.error(f"Error listing threads: {error}")
+            raise SoupError(f"Error listing threads: {error}")
+        logger.info(f"Listed {len(thread_ids)} threads")
+        return thread_ids
+
+    def archived_thread_ids(self) -> list[int]:
+        """Lists the IDs of the board's archived threads.
+
+        Returns:
+            list[int]: IDs of the threads in the board's archive.
+        """
+        logger.info("Listing the IDs of the board's archived threads")
+        try:
+            thread_ids: list[int] = self.board._get_json(
+                ARCHIVE_URL.format(board=self.board.name))
+
+        except Exception as error:
+            logger.error(f"Error listing archived threads: {error}")
+            raise SoupError(f"Error listing archived threads: {error}")
+        logger.info(f"Listed {len(thread_ids)} archived threads")
+        return thread_ids
+
+    def thread_api_url(self, thread_id: int) -> str:
+        """Returns the API URL of a thread on the board."""
+        return self.board._url.thread_api_url(thread_id)
+
+    def thread_from_json(self, api_data: dict, thread_id: int) -> Thread:
+        """Builds a thread from its API JSON, as already fetched.
+
+        Unlike `Board.get_thread()`, the thread isn't kept in the board's
+        cache, so it's released once it's been processed.
+
+        Args:
+            api_data (dict): The thread's JSON, from its API URL.
+            thread_id (int): ID of the thread.
+        """
+        return Thread._from_json(api_data, self.board, thread_id)
+
     def page_threads_to_list(self, page_number: int) -> list[Thread]:
         """Extracts threads from the specific page on a board.
 
@@ -11,17 +11,24 @@ from bs4 import BeautifulSoup
 from datetime import datetime
 from pathlib import Path
 
-from fourchan_scrape_and_parse import *
 from fetch import fetch_html_content
 from scrape.catalog_scraper import CatalogScraper
 from scrape import HomepageScraper
-from parse import MasterTextGenerator
+from parse.MasterTextGenerator import MasterTextGenerator
 from parse.HTMLToContent import ChanToContent
 from parse.MasterContentGenerator import MasterContentGenerator
 from parse.MasterMetaGenerator import MasterMetaGenerator
+from parse.SiteIndex import open_site_index
+from parse.SnapshotDeduplicator import SnapshotDeduplicator
 from parse.SnapshotMetaGenerator import SnapshotMetaGenerator
+from parse.post_stream import append_new_posts
+from parse.snapshot_delta import write_snapshot_content
 
 from write_out import *
+from metrics import (
+    BYTES_FETCHED, FETCH, MASTER_CONTENT, MASTER_META, MASTER_TEXT, PARSE,
+    POSTS, SKIPPED_THREADS, SNAPSHOT_WRITE, THREADS, get_run_metrics)
+from log_setup import set_log_context
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +44,8 @@ def catalog_scrape_all(scan_time_str: str) -> None:
         if "archive" in params_name:  # excludes archives and 4chan from scrape all
             continue
         elif "4chan_" in params_name:
+            # Only imported for 4chan sites, as basc_py4chan is slow to import
+            from fourchan_scrape_and_parse import fourchan_scrape
             fourchan_scrape(params_name, scan_time_str)
         else:
             catalog_scrape(params_name, scan_time_str)
@@ -110,28 +119,48 @@ def catalog_scrape(params_name: str, scan_time_str: str) -> None:
             homepage, params["domain"], params["board_list_container"])
         url_list = scraper.catalog_to_list()
 
+    run_metrics = get_run_metrics()
+    site_name: str = params["site_name"]
     for url in url_list:
+        # The thread's ID isn't known until it's parsed
+        set_log_context(site_name)
         try:
-            soup = BeautifulSoup(fetch_html_content(url),
-                                 features="html.parser")
+            with run_metrics.stage(site_name, FETCH):
+                html: bytes = fetch_html_content(url)
+            run_metrics.count(site_name, BYTES_FETCHED, len(html))
+            soup = BeautifulSoup(html, features="html.parser")
         except:
+            run_metrics.count(site_name, SKIPPED_THREADS)
             continue  # continue to next url if there is an exception
         try:
-            content_parser: ChanToContent = ChanToContent(
-                scan_time_str,
-                soup,
-                url,
-                params["op_class"],
-                params["reply_class"],
-                params["root_domain"],
-            )
+            with run_metrics.stage(site_name, PARSE):
+                content_parser: ChanToContent = ChanToContent(
+                    scan_time_str,
+                    soup,
+                    url,
+                    params["op_class"],
+                    params["reply_class"],
+                    params["root_domain"],
+                )
         except:
+            run_metrics.count(site_name, SKIPPED_THREADS)
             continue
 
+        set_log_context(site_name, content_parser.data["thread_id"])
+
         # Pathing:
         thread_dir: str = os.path.join(
             f"./data/{params["site_name"]}", content_parser.data["thread_id"]
         )
+
+        # Skip writing a snapshot if the thread hasn't changed since last scan
+        deduplicator: SnapshotDeduplicator = SnapshotDeduplicator(
+            thread_dir, content_parser.data)
+        if deduplicator.is_unchanged():
+            deduplicator.record_unchanged(scan_time_str)
+            run_metrics.count(site_name, SKIPPED_THREADS)
+            continue
+
         thread_snapshot_path: str = os.path.join(thread_dir, scan_time_str)
         os.makedirs(thread_snapshot_path, exist_ok=True)
 
@@ -142,52 +171,86 @@ def catalog_scrape(params_name: str, scan_time_str: str) -> None:
             thread_snapshot_path, f"thread_{content_parser.data["thread_id"]}.html"
         )
 
-        # Save HTML:
-        soup_to_html_file(soup, html_file_path)
+        with run_metrics.stage(site_name, SNAPSHOT_WRITE):
+            # Save HTML:
+            soup_to_html_file(soup, html_file_path)
 
-        # Content JSON creation:
-        snapshot_dict_to_json(
-            content_parser.data,
-            scan_time_str,
-            content_parser.data["thread_id"],
-            "content",
-            f"./data/{params["site_name"]}",
-        )
-        # TODO: Using the f-string for the data directory instead of
-        # params["site_dir"] for now for testing
+            # Content JSON creation (as a delta, if enabled in the params file):
+            write_snapshot_content(
+                content_parser.data,
+                scan_time_str,
+                content_parser.data["thread_id"],
+                f"./data/{params["site_name"]}",
+                params.get("delta_snapshots", False),
+            )
+            # TODO: Using the f-string for the data directory instead of
+            # params["site_dir"] for now for testing
 
-        # Snapshot meta creation:
-        snapshot_meta_generator: SnapshotMetaGenerator = SnapshotMetaGenerator(
-            content_file_path
-        )
-        snapshot_meta_generator.meta_dump()
+            # Snapshot meta creation:
+            snapshot_meta_generator: SnapshotMetaGenerator = SnapshotMetaGenerator(
+                content_file_path
+            )
+            snapshot_meta_generator.meta_dump()
+            site_index = open_site_index(os.path.dirname(thread_dir))
+            site_index.record_snapshot(
+                content_file_path,
+                snapshot_meta_generator.get_path(),
+                html_file_path,
+                snapshot_meta_generator.metadata,
+            )
 
-        # Master content creation:
-        candidate_content_files = os.path.join(
-            thread_dir, "**", "content_*.json")
-        list_of_snapshot_contents: list[str] = list(
-            glob.glob(candidate_content_files, recursive=True)
-        )
-        master_content_generator: MasterContentGenerator = MasterContentGenerator(
-            list_of_snapshot_contents,
-        )
-        master_content_generator.content_dump()
-
-        # Master text creation:
-        master_text_generator: MasterTextGenerator = MasterTextGenerator(
-            os.path.join(
-                thread_dir,
-                f"master_version_{content_parser.data["thread_id"]}.json"),
-            params["site_dir"]
-        )
-        master_text_generator.write_text()
+        with run_metrics.stage(site_name, MASTER_CONTENT):
+            # Master content creation:
+            list_of_snapshot_contents: list[str] = site_index.content_paths(
+                thread_dir)
+            master_content_generator: MasterContentGenerator = MasterContentGenerator(
+                list_of_snapshot_contents,
+            )
+            master_content_generator.content_dump()
 
-        # Master meta creation:
-        candidate_meta_files = os.path.join(thread_dir, "**", "meta_*.json")
-        list_of_snapshot_metas: list[str] = list(
-            glob.glob(candidate_meta_files, recursive=True)
-        )
-        master_meta_generator: MasterMetaGenerator = MasterMetaGenerator(
-            list_of_snapshot_metas
-        )
-        master_meta_generator.master_meta_dump()
+            # Newly seen posts (appended to the site's post stream, if enabled):
+            if params.get("post_stream", False):
+                append_new_posts(
+                    params["site_name"],
+                    str(content_parser.data["thread_id"]),
+                    master_content_generator.new_posts,
+                    scan_time_str,
+                    params.get("post_stream_compress", False),
+                )
+
+        with run_metrics.stage(site_name, MASTER_TEXT):
+            # Master text creation:
+            master_text_generator: MasterTextGenerator = MasterTextGenerator(
+                os.path.join(
+                    thread_dir,
+                    f"master_version_{content_parser.data["thread_id"]}.json"),
+                params["site_dir"]
+            )
+            master_text_generator.write_text()
+
+        with run_metrics.stage(site_name, MASTER_META):
+            # Master meta creation:
+            list_of_snapshot_metas: list[str] = site_index.meta_paths(thread_dir)
+            master_meta_generator: MasterMetaGenerator = MasterMetaGenerator(
+                list_of_snapshot_metas
+            )
+            master_meta_generator.master_meta_dump()
+            site_index.record_thread(
+                master_meta_generator.get_path(),
+                master_meta_generator.master_metadata,
+                master_content_generator.get_path(),
+                master_text_generator.master_text_path,
+            )
+
+        # Snapshot hash, for comparison against the next scan
+        deduplicator.record_hash(scan_time_str)
+
+        run_metrics.count(site_name, THREADS)
+        run_metrics.count(
+            site_name, POSTS, 1 + len(content_parser.data["replies"]))
+        run_metrics.count_written(
+            site_name, html_file_path, content_file_path,
+            snapshot_meta_generator.get_path(),
+            master_content_generator.get_path(),
+            master_text_generator.master_text_path,
+            master_meta_generator.get_path())
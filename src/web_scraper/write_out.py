@@ -2,12 +2,22 @@
 import json
 import os
 
-from bs4 import BeautifulSoup
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:  # bs4 is only loaded by the modules parsing HTML
+    from bs4 import BeautifulSoup
 
-def soup_to_html_file(source_soup: BeautifulSoup, html_file_path: str):
+# Drivers import this module (and `parse`) as top-level modules, while the
+# Reparser imports it as part of the `web_scraper` package
+try:
+    from .parse import codec
+except ImportError:
+    from parse import codec
+
+
+def soup_to_html_file(source_soup: "BeautifulSoup", html_file_path: str):
     """
     A soup object, made using a thread snapshot, is used to
     write out the snapshot's HTML after being prettified. The file
@@ -43,8 +53,7 @@ def snapshot_dict_to_json(
     os.makedirs(thread_data_path, exist_ok=True)
     individual_file_path: str = f"{thread_data_path}{name}_{thread_id}.json"
     if os.path.exists(thread_data_path):
-        with open(individual_file_path, "w") as json_file:
-            json.dump(data_dict, json_file, indent=4)
+        codec.dump(data_dict, individual_file_path, indent=4, machine_only=True)
 
 def format_date(date: datetime) -> str:
         """Formats datetime object to %Y-%m-%dT%H:%M:%S
@@ -0,0 +1,78 @@
+# Imports
+import json
+import os
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.dataset
+
+from web_scraper.export.columnar import export_site, master_content_to_rows
+
+def _master_content(thread_id: str, replies: dict) -> dict:
+    """Returns master content for the fixtures below."""
+    return {
+        "thread_id": thread_id,
+        "original_post": {
+            "date_posted": "2025-06-16T10:00:01",
+            "post_id": thread_id,
+            "post_content": "The quick brown fox.",
+            "img_links": [],
+            "username": "Anonymous",
+            "replied_to_ids": []},
+        "replies": replies}
+
+def _write_thread(site_dir: str, thread_id: str, master_content: dict):
+    """Writes out a thread's master content and master meta."""
+    thread_dir = os.path.join(site_dir, thread_id)
+    os.makedirs(thread_dir, exist_ok=True)
+    with open(os.path.join(
+            thread_dir, f"master_version_{thread_id}.json"), "w") as file:
+        json.dump(master_content, file)
+    with open(os.path.join(
+            thread_dir, f"thread_meta_{thread_id}.json"), "w") as file:
+        json.dump({"board_name": "Test"}, file)
+
+@pytest.fixture
+def faux_site_dir(tmp_path, monkeypatch):
+    """Custom fixture to create a site folder of two threads."""
+    # SQLite and pyarrow write through their own file handles, so this uses
+    # a real temporary directory rather than pyfakefs
+    monkeypatch.chdir(tmp_path)
+    faux_site_dir = os.path.join("./data", "faux_site")
+    _write_thread(faux_site_dir, "00", _master_content("00", {}))
+    _write_thread(faux_site_dir, "01", _master_content("01", {
+        "reply_02": {
+            "date_posted": "2025-06-16T10:00:02",
+            "post_id": "02",
+            "post_content": "Sphinx of black quartz, judge my vow.",
+            "img_links": [],
+            "username": "Anonymous",
+            "replied_to_ids": ["01"]}}))
+    yield faux_site_dir
+
+def test_master_content_to_rows():
+    """Test every post becomes a row, with its word count."""
+    rows = master_content_to_rows(_master_content("00", {}), "now")
+
+    assert len(rows) == 1
+    assert rows[0]["is_original_post"]
+    assert rows[0]["num_words"] == 4
+
+def test_export_site_incremental(faux_site_dir, tmp_path):
+    """Test rerunning an export only appends the changed thread."""
+    # Arrange
+    export_dir = str(tmp_path / "exports")
+    assert export_site("faux_site", export_dir=export_dir) == 2
+    assert export_site("faux_site", export_dir=export_dir) == 0
+
+    # Act
+    _write_thread(faux_site_dir, "00", _master_content("00", {
+        "reply_03": _master_content("03", {})["original_post"]}))
+    num_exported: int = export_site("faux_site", export_dir=export_dir)
+
+    # Assert
+    assert num_exported == 1
+    table = pyarrow.dataset.dataset(
+        export_dir, format="parquet", partitioning="hive").to_table()
+    assert table.num_rows == 3 + 2
+    assert set(table.column("board").to_pylist()) == {"Test"}
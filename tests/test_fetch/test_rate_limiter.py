@@ -0,0 +1,46 @@
+# Imports
+import threading
+import time
+
+from web_scraper.fetch.rate_limiter import RateLimiter
+
+def test_wait_spaces_requests_out():
+    """Test that consecutive requests are spaced out by the interval, the
+    first being made at once."""
+    # Arrange
+    rate_limiter = RateLimiter(0.05)
+    times = []
+
+    # Act
+    for _ in range(3):
+        rate_limiter.wait()
+        times.append(time.monotonic())
+
+    # Assert
+    assert times[1] - times[0] >= 0.045
+    assert times[2] - times[1] >= 0.045
+
+def test_wait_spaces_requests_out_across_threads():
+    """Test that requests made from several threads at once still keep to
+    the interval between them."""
+    # Arrange
+    rate_limiter = RateLimiter(0.05)
+    times = []
+    lock = threading.Lock()
+
+    def request():
+        rate_limiter.wait()
+        with lock:
+            times.append(time.monotonic())
+
+    # Act
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    times.sort()
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
@@ -0,0 +1,249 @@
+# Imports
+import json
+import os
+import random
+import sys
+import threading
+import time
+import pytest
+
+# The drivers import the package's modules as top-level modules
+sys.path.insert(0, os.path.join(
+    os.path.dirname(__file__), "..", "..", "src", "web_scraper"))
+
+import fourchan_scrape_and_parse
+
+from fetch.rate_limiter import RateLimiter
+from parse import SiteIndex
+from parse.JSONToContent.SourceToContent import SourceToContent
+from parse.SiteIndex import open_site_index
+from parse.SnapshotDeduplicator import load_date_archived
+from write_out import format_date, unix_to_datetime
+
+SCAN_TIMES: list[str] = ["2025-06-16T10:00:04", "2025-06-16T10:00:05"]
+# When the faux threads were archived, as a UNIX timestamp
+ARCHIVED_ON: int = 1750068000
+
+class FauxBoardScraper:
+    """Stands in for `BoardScraper`, listing the given thread IDs."""
+
+    def __init__(
+            self, board_name: str, thread_ids: list[int] = (),
+            archived_thread_ids: list[int] = ()):
+        self.board_name: str = board_name
+        self._thread_ids: list[int] = list(thread_ids)
+        self._archived_thread_ids: list[int] = list(archived_thread_ids)
+
+    def thread_ids(self) -> list[int]:
+        return self._thread_ids
+
+    def archived_thread_ids(self) -> list[int]:
+        return self._archived_thread_ids
+
+    def thread_api_url(self, thread_id: int) -> str:
+        return f"https://a.4cdn.org/{self.board_name}/thread/{thread_id}.json"
+
+    def thread_from_json(self, api_data: dict, thread_id: int) -> dict:
+        return api_data
+
+def _thread_id_of(url: str) -> int:
+    """Returns the thread ID in a faux thread API URL."""
+    return int(os.path.basename(url).removesuffix(".json"))
+
+def _api_data(thread_id: int) -> dict:
+    """Returns the API JSON of an archived thread with one reply."""
+    return {"posts": [
+        {"no": thread_id, "time": ARCHIVED_ON - 60, "resto": 0,
+         "name": "Anonymous", "sub": "Scraper",
+         "com": "The quick brown fox.", "archived": 1,
+         "archived_on": ARCHIVED_ON},
+        {"no": thread_id + 1, "time": ARCHIVED_ON - 30, "resto": thread_id,
+         "name": "Anonymous", "com": "Sphinx of black quartz judge my vow."},
+    ]}
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    """Fixture to make requests without waiting between them."""
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "rate_limiter", RateLimiter(0))
+
+@pytest.fixture
+def faux_params(tmp_path, monkeypatch) -> dict:
+    """Custom fixture to create a board's params file in a data folder."""
+    monkeypatch.chdir(tmp_path)
+    # Open site indexes are kept by relative path, which is now elsewhere
+    monkeypatch.setattr(SiteIndex, "_open_indexes", {})
+    params: dict = {
+        "site_name": "4chan_test",
+        "board_name": "test",
+        "site_dir": "./data/4chan_test",
+    }
+    os.makedirs("./data/params")
+    with open("./data/params/4chan_test_params.json", "w") as file:
+        json.dump(params, file)
+    yield params
+
+def test_fetch_ahead_yields_in_order(monkeypatch):
+    """Test threads are handed back in order, whichever fetch ends first."""
+    # Arrange
+    rng = random.Random(0)
+
+    def fetch(url: str) -> dict:
+        time.sleep(rng.random() / 100)
+        return {"thread_id": _thread_id_of(url)}
+
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "fetch_fourchan_json_content", fetch)
+    thread_ids: list[int] = list(range(1, 21))
+
+    # Act
+    fetched: list[tuple[int, int]] = [
+        (thread_id, future.result()["thread_id"])
+        for thread_id, future in fourchan_scrape_and_parse.fetch_ahead(
+            FauxBoardScraper("test"), thread_ids, workers=4)]
+
+    # Assert
+    assert fetched == [(thread_id, thread_id) for thread_id in thread_ids]
+
+def test_fetch_ahead_bounds_fetches_in_flight(monkeypatch):
+    """Test no more than `workers` threads are fetched at once, or fetched
+    ahead of the one being processed."""
+    # Arrange
+    lock = threading.Lock()
+    started: list[int] = []
+    in_flight: list[int] = [0]
+    max_in_flight: list[int] = [0]
+
+    def fetch(url: str) -> dict:
+        with lock:
+            started.append(_thread_id_of(url))
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+        time.sleep(0.005)
+        with lock:
+            in_flight[0] -= 1
+        return {}
+
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "fetch_fourchan_json_content", fetch)
+    workers: int = 3
+
+    # Act
+    for i, (_, future) in enumerate(fourchan_scrape_and_parse.fetch_ahead(
+            FauxBoardScraper("test"), list(range(1, 13)), workers)):
+        future.result()
+        # Slow processing gives fetches ahead every chance to pile up
+        time.sleep(0.01)
+        with lock:
+            assert len(started) <= i + 1 + workers
+
+    # Assert
+    assert max_in_flight[0] <= workers
+    assert len(started) == 12
+
+def test_backlog_skips_failed_fetch(faux_params, monkeypatch):
+    """Test a thread which can't be fetched is counted as skipped, and the
+    rest of the backlog is still processed."""
+    # Arrange
+    def fetch(url: str) -> dict:
+        if _thread_id_of(url) == 2:
+            raise ConnectionError("404 Client Error: Not Found")
+        return {"posts": []}
+
+    processed: list[int] = []
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "fetch_fourchan_json_content", fetch)
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "BoardScraper",
+        lambda board_name: FauxBoardScraper(board_name, [1, 2, 3]))
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "process",
+        lambda params, scan_time_str, thread, thread_id, api_data:
+            processed.append(thread_id))
+    run_metrics = fourchan_scrape_and_parse.get_run_metrics()
+    skipped_before: int = run_metrics.counters["4chan_test"][
+        fourchan_scrape_and_parse.SKIPPED_THREADS]
+
+    # Act
+    fourchan_scrape_and_parse.fourchan_backlog_scrape(
+        "4chan_test", "2025-06-16T10:00:04", workers=2)
+
+    # Assert
+    assert processed == [1, 3]
+    assert run_metrics.counters["4chan_test"][
+        fourchan_scrape_and_parse.SKIPPED_THREADS] == skipped_before + 1
+
+def test_archive_backfill_writes_final_snapshots(faux_params, monkeypatch):
+    """Test only archived threads with a thread folder which aren't yet
+    marked archived are fetched, and each is marked with the API's archive
+    date in its master meta and the site index."""
+    # Arrange
+    site_dir: str = "./data/4chan_test"
+    os.makedirs(os.path.join(site_dir, "100"))
+    # Already marked as archived, so not fetched again
+    os.makedirs(os.path.join(site_dir, "200"))
+    with open(os.path.join(site_dir, "200", "snapshot_hash_200.json"),
+              "w") as file:
+        json.dump({"date_archived": SCAN_TIMES[0]}, file)
+    # 300 was never scraped, so has no folder
+
+    fetched: list[int] = []
+
+    def fetch(url: str) -> dict:
+        fetched.append(_thread_id_of(url))
+        return _api_data(_thread_id_of(url))
+
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "fetch_fourchan_json_content", fetch)
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "BoardScraper",
+        lambda board_name: FauxBoardScraper(
+            board_name, archived_thread_ids=[100, 200, 300]))
+
+    # Act
+    fourchan_scrape_and_parse.fourchan_archive_backfill(
+        "4chan_test", SCAN_TIMES[1])
+
+    # Assert
+    date_archived: str = format_date(unix_to_datetime(ARCHIVED_ON))
+    thread_dir: str = os.path.join(site_dir, "100")
+    assert fetched == [100]
+    assert os.path.exists(
+        os.path.join(thread_dir, SCAN_TIMES[1], "source_100.json"))
+    assert load_date_archived(thread_dir, "100") == date_archived
+    with open(os.path.join(thread_dir, "thread_meta_100.json")) as file:
+        master_meta: dict = json.load(file)
+    assert master_meta["archived"] is True
+    assert master_meta["date_archived"] == date_archived
+    assert open_site_index(site_dir).date_archived(thread_dir) == date_archived
+
+def test_archive_backfill_marks_unchanged_thread(faux_params, monkeypatch):
+    """Test a thread unchanged since it was last scraped is marked as
+    archived without a new snapshot being written."""
+    # Arrange
+    site_dir: str = "./data/4chan_test"
+    thread_dir: str = os.path.join(site_dir, "100")
+    content: dict = SourceToContent("test", _api_data(100), SCAN_TIMES[0]).data
+    fourchan_scrape_and_parse.write_thread(
+        faux_params, SCAN_TIMES[0], 100, _api_data(100), content)
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "fetch_fourchan_json_content",
+        lambda url: _api_data(_thread_id_of(url)))
+    monkeypatch.setattr(
+        fourchan_scrape_and_parse, "BoardScraper",
+        lambda board_name: FauxBoardScraper(
+            board_name, archived_thread_ids=[100]))
+
+    # Act
+    fourchan_scrape_and_parse.fourchan_archive_backfill(
+        "4chan_test", SCAN_TIMES[1])
+
+    # Assert
+    date_archived: str = format_date(unix_to_datetime(ARCHIVED_ON))
+    assert not os.path.exists(os.path.join(thread_dir, SCAN_TIMES[1]))
+    assert load_date_archived(thread_dir, "100") == date_archived
+    with open(os.path.join(thread_dir, "thread_meta_100.json")) as file:
+        master_meta: dict = json.load(file)
+    assert master_meta["archived"] is True
+    assert master_meta["date_archived"] == date_archived
+    assert open_site_index(site_dir).date_archived(thread_dir) == date_archived
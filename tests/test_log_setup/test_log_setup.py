@@ -0,0 +1,56 @@
+# Imports
+import json
+import logging
+import os
+import pytest
+
+from web_scraper import log_setup
+
+@pytest.fixture
+def root_logger():
+    """Custom fixture restoring the root logger's handlers and level."""
+    root_logger = logging.getLogger()
+    handlers, level = root_logger.handlers[:], root_logger.level
+    yield root_logger
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    for handler in handlers:
+        root_logger.addHandler(handler)
+    root_logger.setLevel(level)
+    log_setup.set_log_context()
+
+def test_json_log_tagged_with_context(tmp_path, root_logger):
+    """Test that records are written as JSON lines, tagged with the site and
+    thread being processed."""
+    # Arrange
+    log_path = os.path.join(tmp_path, "logs", "run.log")
+    log_setup.configure_logging(log_path, structured=True)
+
+    # Act
+    log_setup.set_log_context("faux_site", 1234)
+    logging.getLogger("web_scraper.test").info("Post %s of %s", 1, 2)
+    logging.getLogger("web_scraper.test").debug("Not logged: %s", 3)
+    log_setup.stop_logging()
+
+    # Assert
+    with open(log_path, "r") as file:
+        records = [json.loads(line) for line in file]
+    assert len(records) == 1
+    assert records[0]["message"] == "Post 1 of 2"
+    assert records[0]["level"] == "INFO"
+    assert records[0]["site_name"] == "faux_site"
+    assert records[0]["thread_id"] == "1234"
+
+def test_text_log(tmp_path, root_logger):
+    """Test that records are written as text by default."""
+    # Arrange
+    log_path = os.path.join(tmp_path, "run.log")
+    log_setup.configure_logging(log_path)
+
+    # Act
+    logging.getLogger("web_scraper.test").warning("Thread %s skipped", 7)
+    log_setup.stop_logging()
+
+    # Assert
+    with open(log_path, "r") as file:
+        assert file.read().rstrip().endswith("WARNING : Thread 7 skipped")
@@ -0,0 +1,100 @@
+# Imports
+import json
+import os
+import pytest
+
+from web_scraper import memtrace
+from web_scraper.log_setup import set_log_context
+from web_scraper.metrics import FETCH, PARSE, RunMetrics
+
+@pytest.fixture
+def memory_tracer():
+    """Starts tracing memory, stopping once the test is done."""
+    tracer = memtrace.start_memtrace(max_frames=5, top_n=5)
+    yield tracer
+    memtrace.stop_memtrace()
+    set_log_context()
+
+def test_stage_records_peak_and_retained(memory_tracer):
+    """Test that a stage records the peak memory allocated within it, and
+    what's still held once it's done."""
+    # Arrange
+    held = []
+
+    # Act
+    with memory_tracer.stage("faux_site", PARSE):
+        freed = bytearray(4 * 1024 * 1024)
+        del freed
+        held.append(bytearray(1024 * 1024))
+
+    # Assert
+    peaks = memory_tracer.stages["faux_site"][PARSE]
+    assert peaks["count"] == 1
+    assert peaks["peak_traced_bytes"] >= 4 * 1024 * 1024
+    assert 1024 * 1024 <= peaks["retained_bytes"] < 4 * 1024 * 1024
+    assert peaks["peak_rss_bytes"] >= 0
+
+def test_nested_stage_peak_counts_towards_outer(memory_tracer):
+    """Test that the peak of a stage includes the stages within it."""
+    # Act
+    with memory_tracer.stage("faux_site", FETCH):
+        with memory_tracer.stage("faux_site", PARSE):
+            freed = bytearray(4 * 1024 * 1024)
+            del freed
+
+    # Assert
+    stages = memory_tracer.stages["faux_site"]
+    assert stages[FETCH]["peak_traced_bytes"] >= 4 * 1024 * 1024
+    assert stages[PARSE]["peak_traced_bytes"] >= 4 * 1024 * 1024
+
+def test_metrics_stages_traced_per_thread(memory_tracer):
+    """Test that stages timed by the run's metrics are traced, and that peaks
+    are kept per thread of the log context."""
+    # Arrange
+    run_metrics = RunMetrics()
+    set_log_context("faux_site", 12345)
+
+    # Act
+    with run_metrics.stage("faux_site", PARSE):
+        freed = bytearray(2 * 1024 * 1024)
+        del freed
+
+    # Assert
+    assert memory_tracer.stages["faux_site"][PARSE]["count"] == 1
+    thread_peaks = memory_tracer.threads["faux_site"]["12345"]
+    assert thread_peaks["peak_traced_bytes"] >= 2 * 1024 * 1024
+
+def test_write_json_names_allocation_sites(memory_tracer, tmp_path):
+    """Test that the report names where the memory still held was allocated,
+    within the package where possible."""
+    # Arrange
+    held = []
+    report_path = memtrace.memtrace_path(
+        os.path.join(tmp_path, "logs", "run.log"))
+
+    # Act
+    with memory_tracer.stage("faux_site", PARSE):
+        held.append([str(i) * 8 for i in range(50000)])
+    memory_tracer.write_json(report_path)
+    with open(report_path, "r", encoding="utf-8") as file:
+        report = json.load(file)
+
+    # Assert
+    assert report_path.endswith("run.memtrace.json")
+    assert report["most_held"]["stage"] == PARSE
+    assert report["most_held"]["held_bytes"] >= memtrace.SNAPSHOT_STEP
+    frames = [
+        allocation["frame"]
+        for allocation in report["most_held"]["allocations"]]
+    assert any("test_memtrace.py" in frame for frame in frames)
+    assert report["most_grown"]
+    assert report["peak_traced_bytes"] >= report["traced_bytes"]
+
+def test_traced_without_tracer():
+    """Test that stages aren't traced unless memory tracing was started."""
+    # Act
+    with memtrace.traced("faux_site", PARSE):
+        pass
+
+    # Assert
+    assert memtrace.get_memory_tracer() is None
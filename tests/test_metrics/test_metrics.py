@@ -0,0 +1,74 @@
+# Imports
+import json
+import os
+import pytest
+
+from web_scraper.metrics import (
+    FETCH, POSTS, THREADS, RunMetrics, metrics_path)
+
+def test_stage_times_and_counts():
+    """Test that stages are timed and counted per site."""
+    # Arrange
+    run_metrics = RunMetrics()
+
+    # Act
+    for _ in range(2):
+        with run_metrics.stage("faux_site", FETCH):
+            pass
+    run_metrics.count("faux_site", THREADS)
+    run_metrics.count("faux_site", POSTS, 5)
+    metrics = run_metrics.to_dict()
+
+    # Assert
+    site = metrics["sites"]["faux_site"]
+    assert site["stages"][FETCH]["count"] == 2
+    assert site["stages"][FETCH]["wall_seconds"] >= 0
+    assert site["counters"] == {THREADS: 1, POSTS: 5}
+    assert site["errors"] == {}
+
+def test_stage_counts_errors():
+    """Test that an exception escaping a stage is counted by its type, and
+    raised on."""
+    # Arrange
+    run_metrics = RunMetrics()
+
+    # Act
+    with pytest.raises(KeyError):
+        with run_metrics.stage("faux_site", FETCH):
+            raise KeyError("missing")
+
+    # Assert
+    site = run_metrics.to_dict()["sites"]["faux_site"]
+    assert site["errors"] == {"KeyError": 1}
+    assert site["stages"][FETCH]["count"] == 1
+
+def test_write_json_and_prometheus(tmp_path):
+    """Test that metrics are written out as JSON and as a Prometheus
+    textfile."""
+    # Arrange
+    run_metrics = RunMetrics()
+    with run_metrics.stage("faux_site", FETCH):
+        pass
+    run_metrics.count("faux_site", THREADS, 3)
+    run_metrics.error("faux_site", "ValueError")
+    json_path = metrics_path(os.path.join(tmp_path, "logs", "run.log"))
+    prometheus_path = os.path.join(tmp_path, "web_scraper.prom")
+
+    # Act
+    run_metrics.write_json(json_path)
+    run_metrics.write_prometheus(prometheus_path)
+
+    # Assert
+    assert json_path == os.path.join(tmp_path, "logs", "run.metrics.json")
+    with open(json_path, "r") as file:
+        metrics = json.load(file)
+    assert metrics["sites"]["faux_site"]["counters"][THREADS] == 3
+    with open(prometheus_path, "r") as file:
+        textfile = file.read()
+    assert 'web_scraper_threads_total{site="faux_site"} 3' in textfile
+    assert (
+        'web_scraper_stage_count{site="faux_site",stage="fetch"} 1'
+        in textfile)
+    assert (
+        'web_scraper_errors_total{site="faux_site",type="ValueError"} 1'
+        in textfile)
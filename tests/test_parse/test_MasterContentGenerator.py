@@ -402,4 +402,20 @@ def test__generate_master_content_key_error_op(mocker, faux_content_dir):
           "KeyError ('original_post') while generating master content from "
           f"list of paths: {paths}"))
     
-    assert isinstance(excinfo.value, KeyError)
\ No newline at end of file
+    assert isinstance(excinfo.value, KeyError)
+
+def test__generate_master_content_new_posts(faux_content_dir):
+    """Test only posts first seen in the last snapshot are new."""
+    # Arrange
+    snapshot_one = os.path.join(faux_content_dir, "snapshot_01.json")
+    snapshot_three = os.path.join(faux_content_dir, "snapshot_03.json")
+    snapshot_four = os.path.join(faux_content_dir, "snapshot_04.json")
+    master_content_generator = MasterContentGenerator(
+        [snapshot_one, snapshot_three, snapshot_four])
+
+    # Act
+    master_content_generator._generate_master_content()
+
+    # Assert
+    assert [post["post_id"] for post in (
+        master_content_generator.new_posts)] == ["03"]
@@ -0,0 +1,75 @@
+# Imports
+import os
+import pytest
+
+from web_scraper.parse.ReparseManifest import ReparseManifest
+
+@pytest.fixture
+def faux_thread_dir(fs):
+    """Custom fixture to create a fake thread directory with one snapshot."""
+    faux_thread_dir = "/faux_site/00"
+    snapshot_dir = os.path.join(faux_thread_dir, "2025-06-16T10:00:04")
+    fs.create_file(
+        os.path.join(snapshot_dir, "thread_00.html"), contents="<html></html>")
+    fs.create_file(
+        os.path.join(snapshot_dir, "content_00.json"), contents="{}")
+    fs.create_file(
+        os.path.join(snapshot_dir, "meta_00.json"), contents="{}")
+    yield faux_thread_dir
+
+def _paths(faux_thread_dir: str) -> tuple[str, list[str]]:
+    """Returns the faux snapshot's input path and output paths."""
+    snapshot_dir = os.path.join(faux_thread_dir, "2025-06-16T10:00:04")
+    return (
+        os.path.join(snapshot_dir, "thread_00.html"),
+        [os.path.join(snapshot_dir, "content_00.json"),
+         os.path.join(snapshot_dir, "meta_00.json")])
+
+def test_is_current_after_save(faux_thread_dir):
+    """Test a recorded snapshot is current once the manifest is reloaded."""
+    # Arrange
+    input_path, output_paths = _paths(faux_thread_dir)
+    manifest = ReparseManifest(faux_thread_dir)
+    assert not manifest.is_current(input_path, "1")
+
+    # Act
+    manifest.record(input_path, "1", output_paths)
+    manifest.save()
+
+    # Assert
+    assert ReparseManifest(faux_thread_dir).is_current(input_path, "1")
+
+def test_is_current_parser_version_changed(faux_thread_dir):
+    """Test a snapshot recorded with an older parser isn't current."""
+    input_path, output_paths = _paths(faux_thread_dir)
+    manifest = ReparseManifest(faux_thread_dir)
+    manifest.record(input_path, "1", output_paths)
+
+    assert not manifest.is_current(input_path, "2")
+
+def test_is_current_input_changed(faux_thread_dir):
+    """Test a snapshot whose HTML was changed isn't current."""
+    # Arrange
+    input_path, output_paths = _paths(faux_thread_dir)
+    manifest = ReparseManifest(faux_thread_dir)
+    manifest.record(input_path, "1", output_paths)
+
+    # Act
+    with open(input_path, "w") as file:
+        file.write("<html><body></body></html>")
+
+    # Assert
+    assert not manifest.is_current(input_path, "1")
+
+def test_is_current_output_removed(faux_thread_dir):
+    """Test a snapshot missing a generated file isn't current."""
+    # Arrange
+    input_path, output_paths = _paths(faux_thread_dir)
+    manifest = ReparseManifest(faux_thread_dir)
+    manifest.record(input_path, "1", output_paths)
+
+    # Act
+    os.remove(output_paths[1])
+
+    # Assert
+    assert not manifest.is_current(input_path, "1")
@@ -0,0 +1,27 @@
+# Imports
+import json
+import os
+import pytest
+
+from web_scraper.parse.Reparser import Reparser
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch) -> str:
+    """Fixture to create a data folder with a site, and the params of a
+    site whose data folder is missing."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("./data/params")
+    os.makedirs("./data/present")
+    for site_name in ["ghost", "present"]:
+        with open(f"./data/params/{site_name}_params.json", "w") as file:
+            json.dump({"site_name": site_name}, file)
+    return str(tmp_path)
+
+def test_missing_site_folder_returns_none(data_dir):
+    """Tests that a site without a data folder is skipped, not raised."""
+    assert Reparser().reparse_site("ghost") is None
+
+def test_reparse_all_skips_missing_site_folder(data_dir):
+    """Tests that a site without a data folder doesn't stop the rest."""
+    summaries: list[dict] = Reparser().reparse_all()
+    assert [summary["site_name"] for summary in summaries] == ["present"]
@@ -0,0 +1,175 @@
+# Imports
+import json
+import os
+import pytest
+
+from web_scraper.parse.SiteIndex import SiteIndex
+
+# SQLite writes through its own file handles, so these tests use a real
+# temporary directory rather than pyfakefs
+
+SCAN_TIMES: list[str] = ["2025-06-16T10:00:04", "2025-06-16T10:00:05"]
+
+def _write_json(file_path: str, data: dict) -> None:
+    """Writes out a JSON file, creating its folder."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+
+@pytest.fixture
+def faux_site_dir(tmp_path):
+    """Custom fixture to create a site folder with one two-snapshot thread."""
+    faux_site_dir = str(tmp_path / "faux_site")
+    thread_dir = os.path.join(faux_site_dir, "00")
+    for i, scan_time in enumerate(SCAN_TIMES):
+        snapshot_dir = os.path.join(thread_dir, scan_time)
+        _write_json(os.path.join(snapshot_dir, "content_00.json"), {})
+        _write_json(
+            os.path.join(snapshot_dir, "meta_00.json"),
+            {"date_updated": scan_time, "num_all_post_ids": i + 1,
+             "num_all_words": 10 * (i + 1)})
+        with open(os.path.join(snapshot_dir, "thread_00.html"), "w") as file:
+            file.write("<html></html>")
+    _write_json(
+        os.path.join(thread_dir, "thread_meta_00.json"),
+        {"board_name": "Test", "num_unique_post_ids": 2})
+    with open(os.path.join(thread_dir, "master_text_00.txt"), "w") as file:
+        file.write("The quick brown fox.")
+    yield faux_site_dir
+
+def test_readers_fall_back_before_rebuild(faux_site_dir):
+    """Test an incomplete index still finds files by searching for them."""
+    # Arrange
+    thread_dir = os.path.join(faux_site_dir, "00")
+
+    # Act
+    with SiteIndex(faux_site_dir) as site_index:
+        complete: bool = site_index.is_complete()
+        content_paths: list[str] = site_index.content_paths(thread_dir)
+
+    # Assert
+    assert not complete
+    assert [os.path.basename(os.path.dirname(path))
+            for path in content_paths] == SCAN_TIMES
+
+def test_rebuild(faux_site_dir):
+    """Test rebuilding the index from disk records every file."""
+    # Arrange
+    thread_dir = os.path.join(faux_site_dir, "00")
+
+    # Act
+    with SiteIndex(faux_site_dir) as site_index:
+        site_index.rebuild()
+
+    # Assert
+    with SiteIndex(faux_site_dir) as site_index:
+        assert site_index.is_complete()
+        assert site_index.meta_paths(thread_dir) == [
+            os.path.join(thread_dir, scan_time, "meta_00.json")
+            for scan_time in SCAN_TIMES]
+        assert len(site_index.html_paths(thread_dir)) == 2
+        assert site_index.source_paths(thread_dir) == []
+        assert site_index.master_meta_paths() == [
+            os.path.join(thread_dir, "thread_meta_00.json")]
+        assert site_index.master_text_path(thread_dir) == (
+            os.path.join(thread_dir, "master_text_00.txt"))
+        assert site_index.connection.execute(
+            "SELECT num_all_words FROM snapshots ORDER BY scan_time"
+        ).fetchall() == [(10,), (20,)]
+
+def test_record_snapshot_after_rebuild(faux_site_dir):
+    """Test a snapshot written after a rebuild is found through the index."""
+    # Arrange
+    thread_dir = os.path.join(faux_site_dir, "00")
+    snapshot_dir = os.path.join(thread_dir, "2025-06-16T10:00:06")
+    content_path = os.path.join(snapshot_dir, "content_00.json")
+    meta_path = os.path.join(snapshot_dir, "meta_00.json")
+
+    with SiteIndex(faux_site_dir) as site_index:
+        site_index.rebuild()
+        _write_json(content_path, {})
+        _write_json(meta_path, {})
+
+        # Act
+        site_index.record_snapshot(content_path, meta_path)
+
+        # Assert
+        assert site_index.content_paths(thread_dir)[-1] == content_path
+        assert len(site_index.meta_paths(thread_dir)) == 3
+
+def test_totals_updated_by_difference(faux_site_dir):
+    """Test rewriting a thread's master meta only adds its difference."""
+    # Arrange
+    master_meta_path = os.path.join(
+        faux_site_dir, "01", "thread_meta_01.json")
+
+    with SiteIndex(faux_site_dir) as site_index:
+        site_index.rebuild()
+
+        # Act
+        site_index.record_thread(
+            master_meta_path,
+            {"num_aggregate_post_ids": 3, "num_unique_post_ids": 3,
+             "num_aggregate_words": 30})
+        site_index.record_thread(
+            master_meta_path,
+            {"num_aggregate_post_ids": 7, "num_unique_post_ids": 5,
+             "num_aggregate_words": 50})
+
+        # Assert
+        assert site_index.get_totals() == {
+            "num_sitewide_threads": 2,
+            "num_sitewide_total_posts": 7,
+            "num_sitewide_dist_posts": 7,
+            "num_sitewide_aggregate_words": 50,
+        }
+
+def test_thread_summaries(faux_site_dir):
+    """Test thread summaries match before and after rebuilding the index."""
+    # Arrange
+    expected = [{
+        "thread_id": "00", "board_name": "Test", "date_published": None,
+        "num_unique_post_ids": 2}]
+
+    # Act/Assert
+    with SiteIndex(faux_site_dir) as site_index:
+        assert site_index.thread_summaries() == expected
+        site_index.rebuild()
+        assert site_index.thread_summaries() == expected
+
+def test_date_archived_added_to_old_index(faux_site_dir):
+    """Test an index made before archive dates were kept gains the column,
+    and archive dates are recorded from master metas or on their own."""
+    # Arrange
+    thread_dir = os.path.join(faux_site_dir, "00")
+    with SiteIndex(faux_site_dir) as site_index:
+        site_index.connection.execute(
+            "ALTER TABLE threads DROP COLUMN date_archived")
+
+    with SiteIndex(faux_site_dir) as site_index:
+        # Act
+        site_index.record_thread(
+            os.path.join(thread_dir, "thread_meta_00.json"),
+            {"num_unique_post_ids": 2})
+        not_archived = site_index.date_archived(thread_dir)
+        site_index.record_archived(thread_dir, SCAN_TIMES[1])
+
+        # Assert
+        assert not_archived is None
+        assert site_index.date_archived(thread_dir) == SCAN_TIMES[1]
+        # A later master meta without the date keeps it
+        site_index.record_thread(
+            os.path.join(thread_dir, "thread_meta_00.json"),
+            {"num_unique_post_ids": 2, "date_archived": None})
+        assert site_index.date_archived(thread_dir) == SCAN_TIMES[1]
+
+def test_board_name_falls_back_before_rebuild(faux_site_dir):
+    """Test a thread's board name is read from its master meta until the
+    index is complete."""
+    thread_dir = os.path.join(faux_site_dir, "00")
+    with SiteIndex(faux_site_dir) as site_index:
+        assert site_index.board_name(thread_dir) == "Test"
+        assert site_index.board_name(
+            os.path.join(faux_site_dir, "missing")) is None
+        site_index.rebuild()
+        assert site_index.board_name(thread_dir) == "Test"
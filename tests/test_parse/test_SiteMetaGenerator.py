@@ -0,0 +1,75 @@
+# Imports
+import json
+import multiprocessing
+import os
+import pytest
+
+from concurrent.futures import ProcessPoolExecutor
+
+from web_scraper.parse.SiteMetaGenerator import (
+    calculate_stats, dump_all, read_master_meta_counts)
+
+@pytest.fixture
+def faux_master_metas(fs) -> list[str]:
+    """Custom fixture to create a current and an old-style master meta."""
+    current_path = "/faux_site/00/thread_meta_00.json"
+    fs.create_file(current_path, contents=json.dumps({
+        # A count inside a string value shouldn't be picked up
+        "thread_title": 'Re: "num_aggregate_words": 999',
+        "snapshot_history": {"2025-06-16T10:00:04": ["00", "01"]},
+        "num_aggregate_post_ids": 4,
+        "num_unique_post_ids": 2,
+        "num_aggregate_words": 12,
+    }, indent=2))
+    old_path = "/faux_site/01/thread_meta_01.json"
+    fs.create_file(old_path, contents=json.dumps({
+        "num_total_posts": 3,
+        "num_dist_posts": 3,
+    }))
+    yield [current_path, old_path]
+
+def test_read_master_meta_counts(faux_master_metas):
+    """Test counts are read from current and old master meta keys."""
+    assert read_master_meta_counts(faux_master_metas[0]) == (4, 2, 12)
+    assert read_master_meta_counts(faux_master_metas[1]) == (3, 3, 0)
+
+def test_calculate_stats(faux_master_metas):
+    """Test sitewide stats are summed over every master meta."""
+    assert calculate_stats(faux_master_metas) == {
+        "num_sitewide_threads": 2,
+        "num_sitewide_total_posts": 7,
+        "num_sitewide_dist_posts": 5,
+        "num_sitewide_aggregate_words": 12,
+    }
+
+def test_dump_all_across_pool(tmp_path, monkeypatch):
+    """Test every site's stats are written when sites share a pool."""
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    site_names: list[str] = [f"site_{i}" for i in range(4)]
+    os.makedirs("./data/params")
+    for i, site_name in enumerate(site_names):
+        with open(f"./data/params/{site_name}_params.json", "w") as file:
+            json.dump({"hp_url": f"https://{site_name}.example"}, file)
+        for thread_id in range(i + 1):
+            os.makedirs(f"./data/{site_name}/{thread_id}")
+            with open(
+                    f"./data/{site_name}/{thread_id}/"
+                    f"thread_meta_{thread_id}.json", "w") as file:
+                json.dump({
+                    "num_aggregate_post_ids": 2,
+                    "num_unique_post_ids": 1,
+                    "num_aggregate_words": 5}, file)
+
+    # Act
+    with ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=multiprocessing.get_context("spawn")) as executor:
+        dump_all(executor=executor)
+
+    # Assert
+    for i, site_name in enumerate(site_names):
+        with open(f"./data/{site_name}/{site_name}_meta.json") as file:
+            site_meta: dict = json.load(file)
+        assert site_meta["num_sitewide_threads"] == i + 1
+        assert site_meta["num_sitewide_total_posts"] == 2 * (i + 1)
@@ -0,0 +1,121 @@
+# Imports
+import json
+import os
+import pytest
+
+from web_scraper.parse.SnapshotDeduplicator import (
+    SnapshotDeduplicator, hash_content, load_date_archived,
+    load_seen_unchanged_dates)
+
+@pytest.fixture
+def faux_content() -> dict:
+    """Fixture to create snapshot content data."""
+    content: dict = {
+        "board_name": "Test",
+        "thread_title": "Scraper",
+        "thread_id": "00",
+        "url": "example.com",
+        "date_published": "2025-06-16T10:00:01",
+        "date_updated": "2025-06-16T10:00:02",
+        "date_scraped": "2025-06-16T10:00:04",
+        "original_post": {
+            "date_posted": "2025-06-16T10:00:01",
+            "post_id": "00",
+            "post_content": "The quick brown fox jumps over the lazy dog.",
+            "img_links": [],
+            "username": "Dorothy Ashby",
+            "replied_to_ids": []},
+        "replies": {
+            "reply_01": {
+                "date_posted": "2025-06-16T10:00:02",
+                "post_id": "01",
+                "post_content": "Sphinx of black quartz judge my vow.",
+                "img_links": [],
+                "username": "Alice Coltrane",
+                "replied_to_ids": ["00"]}}}
+    return content
+
+@pytest.fixture
+def faux_thread_dir(fs):
+    """Custom fixture to create a fake thread directory with a master meta."""
+    faux_thread_dir = "/faux_thread/00"
+    master_meta: dict = {"thread_id": "00", "num_unique_post_ids": 2}
+    fs.create_file(
+        os.path.join(faux_thread_dir, "thread_meta_00.json"),
+        contents=json.dumps(master_meta).encode("utf-8"))
+    yield faux_thread_dir
+
+def test_hash_content_ignores_date_scraped(faux_content):
+    """Test hash_content() is the same for snapshots scraped at other times."""
+    # Arrange
+    rescraped: dict = dict(faux_content)
+    rescraped["date_scraped"] = "2025-06-17T10:00:00"
+
+    # Act & Assert
+    assert hash_content(faux_content) == hash_content(rescraped)
+
+def test_hash_content_detects_new_reply(faux_content):
+    """Test hash_content() changes when a reply is added."""
+    # Arrange
+    updated: dict = json.loads(json.dumps(faux_content))
+    updated["replies"]["reply_02"] = {
+        "date_posted": "2025-06-16T10:00:03",
+        "post_id": "02",
+        "post_content": "The five boxing wizards jump quickly.",
+        "img_links": [],
+        "username": "Brandee Younger",
+        "replied_to_ids": []}
+
+    # Act & Assert
+    assert hash_content(faux_content) != hash_content(updated)
+
+def test_is_unchanged_without_record(faux_thread_dir, faux_content):
+    """Test a thread with no hash record is never considered unchanged."""
+    deduplicator = SnapshotDeduplicator(faux_thread_dir, faux_content)
+
+    assert not deduplicator.is_unchanged()
+
+def test_record_unchanged(faux_thread_dir, faux_content):
+    """Test a rescraped, unchanged thread is recorded in the master meta."""
+    # Arrange
+    SnapshotDeduplicator(
+        faux_thread_dir, faux_content).record_hash("2025-06-16T10:00:04")
+    rescraped: dict = dict(faux_content)
+    rescraped["date_scraped"] = "2025-06-17T10:00:00"
+
+    # Act
+    deduplicator = SnapshotDeduplicator(faux_thread_dir, rescraped)
+    unchanged: bool = deduplicator.is_unchanged()
+    deduplicator.record_unchanged("2025-06-17T10:00:00")
+
+    # Assert
+    assert unchanged
+    with open(os.path.join(faux_thread_dir, "thread_meta_00.json")) as file:
+        master_meta: dict = json.load(file)
+    assert master_meta["seen_unchanged_dates"] == ["2025-06-17T10:00:00"]
+    assert master_meta["num_unique_post_ids"] == 2
+    assert load_seen_unchanged_dates(faux_thread_dir, "00") == [
+        "2025-06-17T10:00:00"]
+
+def test_record_archived(faux_thread_dir, faux_content):
+    """Test an archived thread is marked as such in the master meta, and
+    stays marked once its hash is recorded again."""
+    # Arrange
+    deduplicator = SnapshotDeduplicator(faux_thread_dir, faux_content)
+    deduplicator.record_hash("2025-06-16T10:00:04")
+
+    # Act
+    deduplicator.record_archived("2025-06-18T10:00:00")
+    SnapshotDeduplicator(
+        faux_thread_dir, faux_content).record_hash("2025-06-19T10:00:00")
+
+    # Assert
+    with open(os.path.join(faux_thread_dir, "thread_meta_00.json")) as file:
+        master_meta: dict = json.load(file)
+    assert master_meta["archived"]
+    assert master_meta["date_archived"] == "2025-06-18T10:00:00"
+    assert load_date_archived(faux_thread_dir, "00") == "2025-06-18T10:00:00"
+
+def test_load_date_archived_without_record(faux_thread_dir):
+    """Test a thread with no hash record isn't considered archived."""
+    assert load_date_archived(faux_thread_dir, "00") is None
@@ -0,0 +1,36 @@
+# Imports
+import json
+
+from web_scraper.parse import codec
+
+def test_dump_round_trip(fs):
+    """Test a dumped file loads back to the same data."""
+    # Arrange
+    data: dict = {"post_content": "Sphinx of black quartz — judge my vow.",
+                  "replied_to_ids": ["00"]}
+    fs.create_dir("/faux_thread")
+
+    # Act
+    codec.dump(data, "/faux_thread/master_version_00.json")
+
+    # Assert
+    assert codec.load("/faux_thread/master_version_00.json") == data
+
+def test_dump_compact_machine_only(fs, monkeypatch):
+    """Test only machine-only files are written compactly in compact mode."""
+    # Arrange
+    monkeypatch.setattr(codec, "COMPACT", True)
+    data: dict = {"thread_id": "00", "replies": {}}
+    fs.create_dir("/faux_thread")
+
+    # Act
+    codec.dump(data, "/faux_thread/content_00.json", machine_only=True)
+    codec.dump(data, "/faux_thread/thread_meta_00.json")
+
+    # Assert
+    with open("/faux_thread/content_00.json", "r", encoding="utf-8") as file:
+        assert "\n" not in file.read()
+    with open("/faux_thread/thread_meta_00.json", "r", encoding="utf-8") as file:
+        compact_meta: str = file.read()
+    assert "\n" in compact_meta
+    assert json.loads(compact_meta) == data
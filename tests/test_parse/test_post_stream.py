@@ -0,0 +1,47 @@
+# Imports
+import gzip
+import json
+import os
+
+from web_scraper.parse.post_stream import append_new_posts
+
+POSTS: list[dict] = [
+    {"date_posted": "2025-06-16T10:00:01", "post_id": "00",
+     "post_content": "The quick brown fox.", "replied_to_ids": []},
+    {"date_posted": "2025-06-16T10:00:02", "post_id": "01",
+     "post_content": "Sphinx of black quartz.", "replied_to_ids": ["00"]},
+]
+
+def test_append_new_posts(fs):
+    """Test posts are appended to the scan day's stream, one per line."""
+    # Act
+    append_new_posts("faux_site", "00", POSTS[:1], "2025-06-16T10:00:04",
+                     stream_dir="/streams")
+    stream_path = append_new_posts(
+        "faux_site", "00", POSTS[1:], "2025-06-16T11:00:04",
+        stream_dir="/streams")
+
+    # Assert
+    assert stream_path == os.path.join("/streams", "faux_site", "2025-06-16.jsonl")
+    with open(stream_path, "r", encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert [record["post_id"] for record in records] == ["00", "01"]
+    assert records[1] == {
+        "post_id": "01", "thread_id": "00", "site": "faux_site",
+        "date_posted": "2025-06-16T10:00:02",
+        "content": "Sphinx of black quartz.", "replied_to_ids": ["00"]}
+
+def test_append_new_posts_compressed(fs):
+    """Test compressed appends read back as a single gzip stream."""
+    # Act
+    for post in POSTS:
+        stream_path = append_new_posts(
+            "faux_site", "00", [post], "2025-06-16T10:00:04", compress=True,
+            stream_dir="/streams")
+
+    # Assert
+    with gzip.open(stream_path, "rt", encoding="utf-8") as file:
+        assert len(file.readlines()) == 2
+    assert append_new_posts(
+        "faux_site", "00", [], "2025-06-16T10:00:04",
+        stream_dir="/streams") is None
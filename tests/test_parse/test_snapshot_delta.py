@@ -0,0 +1,180 @@
+# Imports
+import json
+import os
+import pytest
+
+from web_scraper.parse import codec
+from web_scraper.parse.MasterContentGenerator import MasterContentGenerator
+from web_scraper.parse.snapshot_delta import (
+    apply_snapshot, base_state_path, convert_thread, get_thread_content_paths,
+    is_delta, load_full_content, make_delta, write_snapshot_content)
+
+def _post(post_id: str, post_content: str) -> dict:
+    """Returns post data for the fixtures below."""
+    return {
+        "date_posted": "2025-06-16T10:00:01",
+        "post_id": post_id,
+        "post_content": post_content,
+        "img_links": [],
+        "username": "Anonymous",
+        "replied_to_ids": []}
+
+def _content(date_scraped: str, replies: dict) -> dict:
+    """Returns full snapshot content for the fixtures below."""
+    return {
+        "board_name": "Test",
+        "thread_title": "Scraper",
+        "thread_id": "00",
+        "url": "example.com",
+        "date_published": "2025-06-16T10:00:01",
+        "date_updated": "2025-06-16T10:00:03",
+        "date_scraped": date_scraped,
+        "original_post": _post("00", "The quick brown fox."),
+        "replies": replies}
+
+@pytest.fixture
+def faux_snapshots() -> list[dict]:
+    """Fixture to create three full snapshots of the same thread.
+
+    The second adds two replies, the third edits one and loses the other.
+    """
+    first_reply: dict = _post("01", "Sphinx of black quartz judge my vow.")
+    second_reply: dict = _post("02", "The five boxing wizards jump quickly.")
+    edited_reply: dict = _post("01", "Sphinx of black quartz, judge my vow!")
+    return [
+        _content("2025-06-16T10:00:04", {}),
+        _content("2025-06-16T10:00:05", {
+            "reply_01": first_reply, "reply_02": second_reply}),
+        _content("2025-06-16T10:00:06", {"reply_01": edited_reply})]
+
+@pytest.fixture
+def faux_thread_dir(fs, faux_snapshots):
+    """Custom fixture to create a fake thread directory of full snapshots."""
+    faux_thread_dir = "/faux_site/00"
+    for snapshot in faux_snapshots:
+        fs.create_file(
+            os.path.join(
+                faux_thread_dir, snapshot["date_scraped"], "content_00.json"),
+            contents=json.dumps(snapshot).encode("utf-8"))
+    yield faux_thread_dir
+
+def test_make_delta(faux_snapshots):
+    """Test make_delta() only keeps added and changed replies."""
+    # Arrange
+    seen_replies: dict = {}
+    apply_snapshot(faux_snapshots[0], seen_replies)
+    apply_snapshot(faux_snapshots[1], seen_replies)
+
+    # Act
+    delta: dict = make_delta(
+        faux_snapshots[2], seen_replies, "2025-06-16T10:00:05")
+
+    # Assert
+    assert is_delta(delta)
+    assert delta["added_posts"] == {}
+    assert list(delta["changed_posts"]) == ["reply_01"]
+    assert delta["present_post_ids"] == ["00", "01"]
+
+def test_apply_snapshot_round_trip(faux_snapshots):
+    """Test replaying deltas gives back every full snapshot."""
+    # Arrange
+    seen_replies: dict = {}
+    deltas: list[dict] = [faux_snapshots[0]]
+    apply_snapshot(faux_snapshots[0], seen_replies)
+    for previous, snapshot in zip(faux_snapshots, faux_snapshots[1:]):
+        deltas.append(
+            make_delta(snapshot, seen_replies, previous["date_scraped"]))
+        apply_snapshot(snapshot, seen_replies)
+
+    # Act
+    replayed_replies: dict = {}
+    rebuilt: list[dict] = [
+        apply_snapshot(delta, replayed_replies) for delta in deltas]
+
+    # Assert
+    assert rebuilt == faux_snapshots
+
+def test_convert_thread(faux_thread_dir, faux_snapshots):
+    """Test converting a thread to deltas and rebuilding a snapshot."""
+    # Act
+    num_rewritten: int = convert_thread(faux_thread_dir, to_delta=True)
+    content_paths: list[str] = get_thread_content_paths(faux_thread_dir)
+
+    # Assert
+    assert num_rewritten == 2
+    with open(content_paths[1], "r", encoding="utf-8") as file:
+        assert is_delta(json.load(file))
+    assert load_full_content(content_paths[1]) == faux_snapshots[1]
+    assert load_full_content(content_paths[2]) == faux_snapshots[2]
+
+    # Converting back rewrites the deltas in full
+    assert convert_thread(faux_thread_dir, to_delta=False) == 2
+    with open(content_paths[2], "r", encoding="utf-8") as file:
+        assert json.load(file) == faux_snapshots[2]
+
+def test_master_content_from_deltas(faux_thread_dir):
+    """Test deltas produce the same master content as full snapshots."""
+    # Arrange
+    content_paths: list[str] = get_thread_content_paths(faux_thread_dir)
+    full_master: dict = MasterContentGenerator(
+        content_paths)._generate_master_content()
+    convert_thread(faux_thread_dir, to_delta=True)
+
+    # Act
+    delta_master: dict = MasterContentGenerator(
+        content_paths)._generate_master_content()
+
+    # Assert
+    assert delta_master == full_master
+    assert delta_master["replies"]["reply_01"]["post_content"] == (
+        "Sphinx of black quartz, judge my vow!")
+    assert "reply_02" in delta_master["replies"]
+
+def test_write_delta_reads_base_state_only(fs, mocker, faux_snapshots):
+    """Test writing and rebuilding a delta doesn't reread earlier snapshots."""
+    # Arrange
+    for snapshot in faux_snapshots[:2]:
+        write_snapshot_content(
+            snapshot, snapshot["date_scraped"], "00", "/faux_site", delta=True)
+    earlier_paths: list[str] = get_thread_content_paths("/faux_site/00")
+    load_spy = mocker.spy(codec, "load")
+
+    # Act
+    content_path: str = write_snapshot_content(
+        faux_snapshots[2], faux_snapshots[2]["date_scraped"], "00",
+        "/faux_site", delta=True)
+    full_content: dict = load_full_content(content_path)
+
+    # Assert
+    loaded_paths: list[str] = [
+        call.args[0] for call in load_spy.call_args_list]
+    assert not set(loaded_paths) & set(earlier_paths)
+    assert base_state_path("/faux_site/00", "00") in loaded_paths
+    assert full_content == faux_snapshots[2]
+
+def test_write_delta_ignores_stale_base_state(fs, faux_snapshots):
+    """Test a snapshot rewritten after the base state is replayed instead."""
+    # Arrange
+    for snapshot in faux_snapshots[:2]:
+        write_snapshot_content(
+            snapshot, snapshot["date_scraped"], "00", "/faux_site", delta=True)
+    # A reparse rewrites the second snapshot in full, without its second reply
+    rewritten: dict = _content(
+        "2025-06-16T10:00:05",
+        {"reply_01": faux_snapshots[1]["replies"]["reply_01"]})
+    rewritten_path: str = get_thread_content_paths("/faux_site/00")[1]
+    state_mtime: float = os.path.getmtime(
+        base_state_path("/faux_site/00", "00"))
+    with open(rewritten_path, "w", encoding="utf-8") as file:
+        json.dump(rewritten, file)
+    os.utime(rewritten_path, (state_mtime + 1, state_mtime + 1))
+    later: dict = _content("2025-06-16T10:00:06", faux_snapshots[1]["replies"])
+
+    # Act
+    content_path: str = write_snapshot_content(
+        later, later["date_scraped"], "00", "/faux_site", delta=True)
+
+    # Assert
+    with open(content_path, "r", encoding="utf-8") as file:
+        assert list(json.load(file)["added_posts"]) == ["reply_02"]
+    assert load_full_content(content_path) == later
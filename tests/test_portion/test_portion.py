@@ -0,0 +1,189 @@
+# Imports
+import json
+import os
+import pytest
+import random
+
+from web_scraper.portion.portion import (
+    _draw_round_robin, _draw_without_replacement, _matches_filters,
+    _materialise, _post_count_bucket, random_portion_out)
+from web_scraper.portion.token_data import TokenDataGenerator
+
+@pytest.fixture
+def faux_site_params(tmp_path, monkeypatch) -> dict:
+    """Custom fixture to create a site of three threads, one without text."""
+    # The site index is SQLite, so this uses a real temporary directory
+    # rather than pyfakefs
+    monkeypatch.chdir(tmp_path)
+    site_dir = os.path.join("data", "faux_site")
+    for thread_id in ["00", "01", "02"]:
+        os.makedirs(os.path.join(site_dir, thread_id))
+        if thread_id != "02":
+            master_text_path = os.path.join(
+                site_dir, thread_id, f"master_text_{thread_id}.txt")
+            with open(master_text_path, "w") as file:
+                file.write("The quick brown fox.")
+        thread_dir = os.path.join(site_dir, thread_id)
+        with open(os.path.join(
+                thread_dir, f"master_version_{thread_id}.json"), "w") as file:
+            json.dump({
+                "thread_id": thread_id,
+                "original_post": {
+                    "post_id": thread_id,
+                    "post_content": "The quick brown fox."},
+                "replies": {}}, file)
+        with open(os.path.join(
+                thread_dir, f"thread_meta_{thread_id}.json"), "w") as file:
+            json.dump({"board_name": "Test"}, file)
+    os.makedirs(os.path.join(site_dir, "logs"))
+    with open(os.path.join(site_dir, "faux_site_meta.json"), "w") as file:
+        json.dump({"num_sitewide_threads": 3}, file)
+    yield {"site_name": "faux_site", "site_dir": site_dir}
+
+def test_draw_without_replacement():
+    """Test every item is drawn exactly once, reproducibly with a seed."""
+    population = list(range(100))
+    first_draw = list(_draw_without_replacement(population, random.Random(1)))
+    second_draw = list(_draw_without_replacement(population, random.Random(1)))
+
+    assert sorted(first_draw) == population
+    assert first_draw == second_draw
+
+def test_random_portion_out_shortfall(faux_site_params, caplog):
+    """Test portioning stops with a warning once no threads are left."""
+    # Act
+    random_portion_out([faux_site_params], "portions", 100, seed=0)
+
+    # Assert
+    log_path = os.path.join(
+        "portions", "faux_site", "faux_site_portioned_threads_log.txt")
+    with open(log_path, "r") as file:
+        assert sorted(file.read().split()) == ["00", "01"]
+    assert "Only 2 of 3 threads" in caplog.text
+
+    # Nothing is left to portion on the next run, which still terminates
+    random_portion_out([faux_site_params], "portions", 100, seed=0)
+    with open(log_path, "r") as file:
+        assert len(file.read().split()) == 2
+
+def test_random_portion_out_token_data(faux_site_params):
+    """Test the token data of every portioned thread is written once."""
+    # Act
+    random_portion_out([faux_site_params], "portions", 100, seed=0)
+
+    # Assert
+    (portion_dir,) = [
+        entry.path for entry in os.scandir(os.path.join("portions", "faux_site"))
+        if entry.is_dir()]
+    with open(os.path.join(portion_dir, "faux_site_token_data.json")) as file:
+        token_data = json.load(file)
+    assert token_data == {
+        "Test": {
+            "00": {"00": "The quick brown fox."},
+            "01": {"01": "The quick brown fox."}}}
+
+def test_random_portion_out_skips_thread_without_token_data(
+        faux_site_params, caplog):
+    """Test a thread without master content isn't portioned, so its text,
+    the portion log and the token data agree."""
+    # Arrange
+    os.remove(os.path.join(
+        faux_site_params["site_dir"], "01", "master_version_01.json"))
+
+    # Act
+    random_portion_out([faux_site_params], "portions", 100, seed=0)
+
+    # Assert
+    site_portion_dir = os.path.join("portions", "faux_site")
+    with open(os.path.join(
+            site_portion_dir, "faux_site_portioned_threads_log.txt")) as file:
+        assert file.read().split() == ["00"]
+    (portion_dir,) = [
+        entry.path for entry in os.scandir(site_portion_dir) if entry.is_dir()]
+    assert sorted(
+        name for name in os.listdir(portion_dir) if name.endswith(".txt")) == [
+        "master_text_00.txt"]
+    with open(os.path.join(portion_dir, "faux_site_token_data.json")) as file:
+        assert list(json.load(file)["Test"]) == ["00"]
+    assert "no master content or board name" in caplog.text
+
+def test_token_data_merges_existing(faux_site_params):
+    """Test threads are added next to those already in the token data."""
+    # Arrange
+    token_data_path = "token_data.json"
+    with open(token_data_path, "w") as file:
+        json.dump({"Test": {"09": {"09": "Hello."}}, "Other": {}}, file)
+
+    # Act
+    token_data = TokenDataGenerator(
+        faux_site_params["site_dir"], ["00"],
+        token_data_path).generate_portion_json()
+
+    # Assert
+    assert token_data == {
+        "Test": {
+            "09": {"09": "Hello."},
+            "00": {"00": "The quick brown fox."}},
+        "Other": {}}
+
+def test_draw_round_robin():
+    """Test strata are drawn from in turn until each runs out."""
+    # Act
+    draw = list(_draw_round_robin([["a1", "a2", "a3"], ["b1"]], random.Random(0)))
+
+    # Assert
+    assert sorted(draw) == ["a1", "a2", "a3", "b1"]
+    assert "b1" in draw[:2]
+
+def test_matches_filters():
+    """Test thread summaries are filtered by posts and publishing date."""
+    summary = {"num_unique_post_ids": 12, "date_published": "2024-05-17T10:00:00"}
+
+    assert _matches_filters(summary, min_posts=12)
+    assert not _matches_filters(summary, min_posts=13)
+    assert _matches_filters(summary, published_after="2024-05")
+    assert _matches_filters(summary, published_before="2024-05")
+    assert not _matches_filters(summary, published_before="2024-04-30")
+    assert _post_count_bucket(12) == "10-99"
+    assert _post_count_bucket(0) == "0"
+
+def test_random_portion_out_stratified(faux_site_params):
+    """Test a filtered portion only draws threads matching the filters."""
+    # Arrange
+    for thread_id, num_posts in [("00", 1), ("01", 20)]:
+        with open(os.path.join(
+                faux_site_params["site_dir"], thread_id,
+                f"thread_meta_{thread_id}.json"), "w") as file:
+            json.dump({
+                "board_name": "Test",
+                "date_published": "2024-05-17T10:00:00",
+                "num_unique_post_ids": num_posts}, file)
+
+    # Act
+    random_portion_out(
+        [faux_site_params], "portions", 100, seed=0,
+        strata=["board", "month"], min_posts=10)
+
+    # Assert
+    log_path = os.path.join(
+        "portions", "faux_site", "faux_site_portioned_threads_log.txt")
+    with open(log_path, "r") as file:
+        assert file.read().split() == ["01"]
+
+def test_materialise(tmp_path):
+    """Test a materialised file keeps its text once the original's replaced."""
+    # Arrange
+    source = tmp_path / "master_text_00.txt"
+    source.write_text("The quick brown fox.")
+    destination_dir = tmp_path / "portion"
+    destination_dir.mkdir()
+
+    # Act
+    method = _materialise(str(source), str(destination_dir))
+    (tmp_path / "new.txt").write_text("Jumps over the lazy dog.")
+    os.replace(tmp_path / "new.txt", source)
+
+    # Assert
+    assert method in ("reflink", "hardlink", "copy")
+    assert (destination_dir / "master_text_00.txt").read_text() == (
+        "The quick brown fox.")
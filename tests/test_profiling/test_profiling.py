@@ -0,0 +1,44 @@
+# Imports
+import os
+
+from web_scraper import profiling
+
+def _busy(n: int) -> int:
+    """Sums squares, to have something to profile."""
+    return sum(i * i for i in range(n))
+
+def test_profile_run_cprofile(tmp_path, monkeypatch):
+    """Test that a cProfile run returns the function's result and writes
+    the profile and its summary."""
+    # Arrange
+    monkeypatch.setattr(profiling, "LOG_DIR", str(tmp_path))
+
+    # Act
+    result = profiling.profile_run(
+        "test", "2025-06-16T10:00:00", _busy, 1000, sampling=False, top_n=2)
+
+    # Assert
+    assert result == _busy(1000)
+    assert os.path.exists(
+        os.path.join(tmp_path, "2025-06-16T10:00:00_test.prof"))
+    with open(os.path.join(
+            tmp_path, "2025-06-16T10:00:00_test.txt"), "r") as file:
+        lines = file.read().splitlines()
+    assert lines[0] == "Top 2 functions by self time"
+    assert len(lines) == 3
+
+def test_write_summary_orders_by_self_time(tmp_path):
+    """Test that the summary lists the slowest functions first, up to N."""
+    # Arrange
+    summary_path = os.path.join(tmp_path, "summary.txt")
+    hot_functions = [(0.5, "b"), (2.0, "a"), (0.1, "c")]
+
+    # Act
+    profiling._write_summary(summary_path, hot_functions, 2)
+
+    # Assert
+    with open(summary_path, "r") as file:
+        lines = file.read().splitlines()
+    assert lines[1].endswith("  a")
+    assert lines[2].endswith("  b")
+    assert len(lines) == 3